@@ -0,0 +1,253 @@
+"""
+Analytics module for SpeedRunner X.
+Records what happens in every attempt as columnar event chunks for level tuning.
+"""
+import array
+import atexit
+import os
+import sys
+import time
+import zipfile
+from src.settings import *
+from src.io_worker import io_worker
+
+# Import numpy conditionally, only the loader needs it
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Event codes stored in the event column
+EVENT_START = 0
+EVENT_FINISH = 1
+EVENT_GAME_OVER = 2
+EVENT_ABANDON = 3
+EVENT_DEATH_ENEMY = 4
+EVENT_DEATH_HAZARD = 5
+EVENT_RESPAWN = 6
+EVENT_CHECKPOINT = 7
+EVENT_POWERUP_SPEED = 8
+EVENT_POWERUP_INVINCIBILITY = 9
+EVENT_POWERUP_EXTRA_LIFE = 10
+EVENT_ENEMY_DEFEATED = 11
+
+EVENT_NAMES = ["start", "finish", "game_over", "abandon", "death_enemy", "death_hazard", "respawn",
+               "checkpoint", "powerup_speed", "powerup_invincibility", "powerup_extra_life", "enemy_defeated"]
+
+POWERUP_EVENTS = {'speed': EVENT_POWERUP_SPEED, 'invincibility': EVENT_POWERUP_INVINCIBILITY,
+                  'extra_life': EVENT_POWERUP_EXTRA_LIFE}
+
+# Column name -> (array typecode, npy dtype)
+COLUMNS = {
+    'attempt': ('I', '<u4'),
+    'level': ('H', '<u2'),
+    'event': ('B', '|u1'),
+    'time': ('I', '<u4'),
+    'x': ('i', '<i4'),
+    'y': ('i', '<i4'),
+    'value': ('i', '<i4'),
+}
+
+def npy_bytes(dtype, shape, data):
+    """Wrap raw little-endian array data in a .npy version 1.0 header"""
+    header = f"{{'descr': '{dtype}', 'fortran_order': False, 'shape': {shape}, }}"
+
+    # Magic, version and header length take 10 bytes, the whole header is padded to 64
+    padding = 64 - (10 + len(header) + 1) % 64
+    header = (header + " " * padding + "\n").encode('latin-1')
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, 'little') + header + data
+
+
+class AnalyticsRecorder:
+    def __init__(self, directory=ANALYTICS_PATH, chunk_size=ANALYTICS_CHUNK_SIZE):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.enabled = ANALYTICS_ENABLED
+
+        # Columns of the chunk being filled, attempt ids and level indexes are local to the chunk
+        self.columns = {name: array.array(typecode) for name, (typecode, dtype) in COLUMNS.items()}
+        self.levels = []
+        self.attempts = 0
+        self.chunks_written = 0
+
+        # The attempt in progress
+        self.attempt = None
+        self.level = None
+        self.last_time = 0
+
+        # Write whatever is buffered when the game exits
+        atexit.register(self.close)
+
+    def start_attempt(self, level_name):
+        """Begin a new attempt, abandoning the previous one if it never ended"""
+        if not self.enabled:
+            return
+        if self.attempt is not None:
+            self.end_attempt(EVENT_ABANDON, self.last_time)
+
+        if level_name not in self.levels:
+            self.levels.append(level_name)
+        self.level = self.levels.index(level_name)
+        self.attempt = self.attempts
+        self.attempts += 1
+        self.log(EVENT_START, 0)
+
+    def log(self, event, time_ms, x=0, y=0, value=0):
+        """Append one event to the attempt in progress"""
+        if self.attempt is None:
+            return
+        self.last_time = int(time_ms)
+        columns = self.columns
+        columns['attempt'].append(self.attempt)
+        columns['level'].append(self.level)
+        columns['event'].append(event)
+        columns['time'].append(self.last_time)
+        columns['x'].append(int(x))
+        columns['y'].append(int(y))
+        columns['value'].append(int(value))
+
+    def end_attempt(self, event, time_ms, x=0, y=0, value=0):
+        """Close the attempt in progress with a finish, game over or abandon event"""
+        if self.attempt is None:
+            return
+        self.log(event, time_ms, x, y, value)
+        self.attempt = None
+
+        # Chunks are only cut between attempts, so an attempt never spans two files
+        if len(self.columns['event']) >= self.chunk_size:
+            self.write_chunk()
+
+    def write_chunk(self):
+        """Hand the buffered columns to the I/O worker and start a new chunk"""
+        if not self.columns['event']:
+            return
+        path = os.path.join(self.directory, f"attempts_{int(time.time() * 1000)}_{self.chunks_written:04d}.npz")
+        io_worker.submit(self.save_chunk, path, self.columns, self.levels)
+        self.chunks_written += 1
+
+        self.columns = {name: array.array(typecode) for name, (typecode, dtype) in COLUMNS.items()}
+        self.levels = []
+        self.attempts = 0
+
+    @staticmethod
+    def save_chunk(path, columns, levels):
+        """Write one chunk as an uncompressed .npz archive (I/O worker thread)"""
+        temp_path = path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_STORED) as archive:
+                for name, (typecode, dtype) in COLUMNS.items():
+                    column = columns[name]
+                    if sys.byteorder == 'big':
+                        column = array.array(typecode, column)
+                        column.byteswap()
+                    archive.writestr(f"{name}.npy", npy_bytes(dtype, (len(column),), column.tobytes()))
+
+                # Level names as a fixed-width unicode column
+                width = max(len(name) for name in levels) if levels else 1
+                data = b"".join(name.ljust(width, "\0").encode('utf-32-le') for name in levels)
+                archive.writestr("levels.npy", npy_bytes(f"<U{width}", (len(levels),), data))
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error writing analytics: {e}")
+
+    def close(self):
+        """Abandon the attempt in progress and write the last chunk"""
+        if self.attempt is not None:
+            self.end_attempt(EVENT_ABANDON, self.last_time)
+        self.write_chunk()
+
+
+def load_analytics(directory=ANALYTICS_PATH):
+    """Load every chunk into one set of numpy columns with globally unique attempt ids and level indexes"""
+    if not NUMPY_AVAILABLE:
+        print("numpy not available, cannot load analytics")
+        return None
+
+    levels = []
+    parts = {name: [] for name in COLUMNS}
+    attempt_offset = 0
+    filenames = sorted(f for f in os.listdir(directory) if f.endswith(".npz")) if os.path.isdir(directory) else []
+    for filename in filenames:
+        try:
+            with np.load(os.path.join(directory, filename)) as chunk:
+                columns = {name: chunk[name] for name in COLUMNS}
+                chunk_levels = [str(name) for name in chunk['levels']]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Skipping analytics chunk {filename}: {e}")
+            continue
+        if not len(columns['event']):
+            continue
+
+        # Map the chunk's level indexes and attempt ids onto the combined ones
+        for name in chunk_levels:
+            if name not in levels:
+                levels.append(name)
+        level_map = np.array([levels.index(name) for name in chunk_levels], dtype=np.uint16)
+        columns['level'] = level_map[columns['level']]
+        columns['attempt'] = columns['attempt'].astype(np.int64) + attempt_offset
+        attempt_offset = int(columns['attempt'].max()) + 1
+
+        for name in COLUMNS:
+            parts[name].append(columns[name])
+
+    events = {name: np.concatenate(arrays) if arrays else np.zeros(0, dtype=COLUMNS[name][1])
+              for name, arrays in parts.items()}
+    events['levels'] = levels
+    return events
+
+
+def summarize(events):
+    """Aggregate loaded events into per-level statistics"""
+    level_count = len(events['levels'])
+    level = events['level'].astype(np.int64)
+    event = events['event']
+
+    def count(code):
+        return np.bincount(level[event == code], minlength=level_count)
+
+    starts = count(EVENT_START)
+    finishes = count(EVENT_FINISH)
+    deaths = count(EVENT_DEATH_ENEMY) + count(EVENT_DEATH_HAZARD)
+    game_overs = count(EVENT_GAME_OVER)
+    checkpoints = count(EVENT_CHECKPOINT)
+
+    # Finishing times sorted per level, so medians come from one lexsort
+    finished = event == EVENT_FINISH
+    finish_levels = level[finished]
+    finish_times = events['time'][finished]
+    order = np.lexsort((finish_times, finish_levels))
+    finish_levels, finish_times = finish_levels[order], finish_times[order]
+    bounds = np.searchsorted(finish_levels, np.arange(level_count + 1))
+
+    summary = {}
+    for i, level_name in enumerate(events['levels']):
+        times = finish_times[bounds[i]:bounds[i + 1]]
+        summary[level_name] = {
+            'attempts': int(starts[i]),
+            'finishes': int(finishes[i]),
+            'completion_rate': float(finishes[i] / starts[i]) if starts[i] else 0.0,
+            'deaths': int(deaths[i]),
+            'deaths_per_attempt': float(deaths[i] / starts[i]) if starts[i] else 0.0,
+            'game_overs': int(game_overs[i]),
+            'checkpoints': int(checkpoints[i]),
+            'best_time': int(times[0]) if len(times) else None,
+            'median_time': int(np.median(times)) if len(times) else None,
+        }
+    return summary
+
+
+def death_hotspots(events, level_name, bin_width=TILE_SIZE * 4, count=5):
+    """Get the x ranges of a level where players die most, as (start x, deaths)"""
+    if level_name not in events['levels']:
+        return []
+    level_index = events['levels'].index(level_name)
+    died = (events['level'] == level_index) & np.isin(events['event'], (EVENT_DEATH_ENEMY, EVENT_DEATH_HAZARD))
+    bins = np.bincount(np.maximum(events['x'][died], 0) // bin_width)
+    worst = np.argsort(bins)[::-1][:count]
+    return [(int(b) * bin_width, int(bins[b])) for b in worst if bins[b]]
+
+
+# Shared by the level and the game loop
+run_analytics = AnalyticsRecorder()
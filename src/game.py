@@ -9,18 +9,28 @@ import math
 from src.settings import *
 from src.level import Level
 from src.ui import UI
-from src.leaderboard import Leaderboard
-from src.ghost import Ghost
+from src.leaderboard import create_leaderboard
+from src.leaderboard_screen import LeaderboardScreen
+from src.splits import SplitTracker
+from src.ghost import Ghost, GhostRace
+from src.ghost_stream import GhostStream
+from src.ghost_library import GhostLibrary
+from src.io_worker import io_worker
+from src.analytics import run_analytics, EVENT_FINISH, EVENT_GAME_OVER
 from src.menu_effects import MenuEffects
+from src.render_backend import create_backend
 
 class Game:
-    def __init__(self):
+    def __init__(self, render_backend=RENDER_BACKEND):
         # Initialize pygame
         pygame.init()
         
         # Create the game window
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        self.fullscreen = FULLSCREEN
+        self.backend = create_backend(render_backend, self.fullscreen)
+        self.screen = self.backend.screen
         pygame.display.set_caption(TITLE)
+        print(f"Using {self.backend.name} renderer")
         
         # Clock for controlling frame rate
         self.clock = pygame.time.Clock()
@@ -31,10 +41,20 @@ class Game:
         self.countdown = 3
         self.countdown_timer = 0
         
+        # Presentation - static screens only push the rects that changed
+        self.rendered_state = None
+        self.full_redraw = True
+        self.dirty_rects = []
+        
+        # Frozen copy of the last gameplay frame shown behind overlay screens
+        self.backdrop = None
+        self.countdown_backdrop = None
+        
         # Ensure directories exist
         os.makedirs(os.path.dirname(LEADERBOARD_PATH), exist_ok=True)
         os.makedirs(GHOST_RUNS_PATH, exist_ok=True)
         os.makedirs(MAPS_PATH, exist_ok=True)
+        io_worker.submit(GhostStream.remove_stale_recordings)
         
         # Create UI
         self.ui = UI(self.screen)
@@ -44,12 +64,30 @@ class Game:
         self.menu_effects = MenuEffects(self.screen)
         
         # Create leaderboard
-        self.leaderboard = Leaderboard()
+        self.leaderboard = create_leaderboard()
+        self.leaderboard_screen = LeaderboardScreen(self.leaderboard)
+        
+        # Create split timing
+        self.splits = SplitTracker()
+        
+        # Create the ghost library, it keeps the ghosts of leaderboard runs and personal bests
+        self.ghost_library = GhostLibrary()
+        io_worker.submit(self.ghost_library.read_manifest, callback=self.ghost_library.apply_manifest)
+        io_worker.submit(GhostRace.import_ghost_files, self.ghost_library, callback=self.ghost_library.apply_entries)
         
-        # Create level
+        # Create level, with the debug heatmap shown if configured
+        self.show_heatmap = HEATMAP_OVERLAY
         self.level = None
         self.load_level(f"level{self.current_level}")
     
+    def toggle_fullscreen(self):
+        """Switch between windowed and fullscreen mode"""
+        self.fullscreen = not self.fullscreen
+        
+        # pygame keeps the same display surface object, so UI and level references stay valid
+        self.backend.set_fullscreen(self.fullscreen)
+        self.full_redraw = True
+    
     def setup_ui_callbacks(self):
         """Set up UI menu callbacks"""
         # Main menu callbacks
@@ -66,9 +104,14 @@ class Game:
     
     def load_level(self, level_name):
         """Load a level"""
-        self.level = Level(level_name, self.screen)
+        if self.level:
+            self.level.discard_recording()
+            self.level.abandon_attempt()
+        self.level = Level(level_name, self.screen, self.backend if self.backend.hardware else None, self.ghost_library)
         # Pass UI reference to level for powerup notifications
         self.level.ui = self.ui
+        self.level.splits = self.splits
+        self.level.show_heatmap = self.show_heatmap
     
     def start_game(self):
         """Start the game"""
@@ -77,6 +120,7 @@ class Game:
         self.countdown = 3
         self.countdown_timer = pygame.time.get_ticks()
         self.level.reset()
+        self.start_countdown()
         
         # Ensure the level is properly initialized
         self.level.active = False  # Will be set to True after countdown
@@ -85,6 +129,11 @@ class Game:
         # Reset UI timer
         self.ui.reset_timer()
     
+    def start_countdown(self):
+        """Prepare the cached countdown graphics for a fresh countdown"""
+        self.ui.prepare_countdown()
+        self.countdown_backdrop = None
+    
     def show_leaderboard(self):
         """Show the leaderboard screen"""
         self.state = STATE_LEADERBOARD
@@ -101,6 +150,7 @@ class Game:
         self.state = STATE_PLAYING
         self.countdown = 3
         self.countdown_timer = pygame.time.get_ticks()
+        self.start_countdown()
         
         # Reset UI timer
         self.ui.reset_timer()
@@ -131,14 +181,15 @@ class Game:
         self.state = STATE_PLAYING
         self.countdown = 3
         self.countdown_timer = pygame.time.get_ticks()
+        self.start_countdown()
         
         # Reset UI timer
         self.ui.reset_timer()
     
     def handle_events(self):
         """Handle pygame events"""
-        # Don't get events here for the menu state, as we handle them in render()
-        if self.state != STATE_MENU and self.state != STATE_VICTORY and self.state != STATE_GAME_OVER:
+        # Don't get events here for the menu and leaderboard states, as we handle them in render()
+        if self.state not in (STATE_MENU, STATE_VICTORY, STATE_GAME_OVER, STATE_LEADERBOARD):
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     pygame.quit()
@@ -150,9 +201,17 @@ class Game:
                         self.ui.pause_timer()
                     elif event.key == pygame.K_r and self.state == STATE_PLAYING:
                         self.restart_level()
+                    elif event.key == pygame.K_f:
+                        self.toggle_fullscreen()
+                    elif event.key == pygame.K_F3 and self.state == STATE_PLAYING:
+                        self.show_heatmap = not self.show_heatmap
+                        self.level.show_heatmap = self.show_heatmap
     
     def update(self):
         """Update game state"""
+        # Finish loads and saves that completed on the I/O worker
+        io_worker.poll()
+        
         if self.state == STATE_PLAYING:
             # Handle countdown
             if self.countdown > 0:
@@ -174,21 +233,32 @@ class Game:
                 
                 # Check if level is completed
                 if self.level.completed:
-                    # Save ghost data if it's a new record
+                    # Save ghost data if the run makes the leaderboard
                     final_time = self.ui.get_elapsed_time()
                     level_name = f"level{self.current_level}"
+                    player = self.level.player
+                    run_analytics.end_attempt(EVENT_FINISH, final_time, player.rect.x, player.rect.y, player.lives)
+                    self.splits.finish(final_time)
                     
                     try:
-                        if self.leaderboard.is_new_record(level_name, final_time):
+                        ghost_id = None
+                        if self.leaderboard.is_top_time(level_name, final_time):
+                            # Personal bests stay in the ghost library after they drop off the leaderboard
                             ghost_data = self.level.get_player_position_history()
-                            self.level.ghost.save_ghost_data(level_name, ghost_data)
+                            record = self.leaderboard.is_new_record(level_name, final_time)
+                            ghost_id = self.level.ghosts.save_ghost_data(level_name, ghost_data, final_time, record)
+                        else:
+                            self.level.discard_recording()
                         
-                        # Add time to leaderboard
-                        self.leaderboard.add_time(level_name, final_time)
+                        # Add time to leaderboard, linked to its ghost library entry, and drop ghosts of runs that fell off it
+                        self.leaderboard.add_time(level_name, final_time, ghost=ghost_id)
+                        self.level.ghosts.prune(level_name, self.leaderboard.get_times(level_name))
                         
                         # Show victory menu
                         best_time = self.leaderboard.get_best_time(level_name)
-                        self.ui.update_victory_menu(final_time, best_time)
+                        percentile = self.leaderboard.get_percentile(level_name, final_time)
+                        median_time = self.leaderboard.get_median(level_name)
+                        self.ui.update_victory_menu(final_time, best_time, percentile, median_time)
                         self.state = STATE_VICTORY
                     except Exception as e:
                         print(f"Error handling level completion: {e}")
@@ -198,12 +268,62 @@ class Game:
                 
                 # Check if player is dead
                 if self.level.player.lives <= 0:
+                    player = self.level.player
+                    run_analytics.end_attempt(EVENT_GAME_OVER, elapsed_time, player.rect.x, player.rect.y)
                     self.state = STATE_GAME_OVER
     
+    def capture_backdrop(self):
+        """Freeze the last gameplay frame once for the overlay screens"""
+        if self.rendered_state != STATE_PLAYING or self.backend.hardware:
+            # The level isn't on screen (or in the renderer) yet, so draw it a single time
+            self.level.draw()
+        
+        backdrop = self.backend.snapshot()
+        size = backdrop.get_size()
+        
+        # Blur by scaling down and back up
+        if OVERLAY_BLUR:
+            small_size = (size[0] // OVERLAY_BLUR_FACTOR, size[1] // OVERLAY_BLUR_FACTOR)
+            backdrop = pygame.transform.smoothscale(pygame.transform.smoothscale(backdrop, small_size), size)
+        
+        # Tint towards the screen's own background color
+        if OVERLAY_DIM_ALPHA:
+            tints = {STATE_PAUSED: BLACK, STATE_GAME_OVER: (20, 20, 20), STATE_VICTORY: (20, 50, 20)}
+            dim = pygame.Surface(size)
+            dim.fill(tints[self.state])
+            dim.set_alpha(OVERLAY_DIM_ALPHA)
+            backdrop.blit(dim, (0, 0))
+        
+        self.backdrop = backdrop
+    
+    def present(self):
+        """Push the finished frame to the display"""
+        if self.full_redraw:
+            self.backend.present()
+        elif self.dirty_rects or self.backend.hardware:
+            # The hardware renderer redraws the world every frame, even when no overlay area changed
+            self.backend.present(self.dirty_rects)
+        
+        self.dirty_rects = []
+        self.full_redraw = False
+    
     def render(self):
         """Render the game"""
+        self.backend.begin_frame()
+        
+        # Animated states repaint every frame, static screens only when entered.
+        # With the hardware renderer the world is drawn as textures each frame and the overlay surface
+        # keeps its contents, so gameplay only repaints the overlay when entered.
+        state_changed = self.state != self.rendered_state
+        if state_changed or self.state == STATE_MENU or (self.state == STATE_PLAYING and not self.backend.hardware):
+            if state_changed and self.state in (STATE_PAUSED, STATE_GAME_OVER, STATE_VICTORY):
+                self.capture_backdrop()
+            self.full_redraw = True
+            self.rendered_state = self.state
+        
         # Clear the screen first
-        self.screen.fill(BLACK)
+        if self.full_redraw:
+            self.screen.fill(self.backend.clear_color)
         
         if self.state == STATE_MENU:
             # Draw animated menu background
@@ -223,26 +343,39 @@ class Game:
                         print("Enter key pressed on main menu, starting game...")
                         self.start_game()
                         return
+                    elif event.key == pygame.K_f:
+                        self.toggle_fullscreen()
             
             # Update and draw the menu
             self.ui.main_menu.update(events)
             self.ui.main_menu.draw(self.screen)
         
         elif self.state == STATE_PLAYING:
-            # Draw level
-            self.level.draw()
+            # Clear what the HUD covered last frame from the hardware overlay, only those areas are uploaded
+            if self.backend.hardware and not self.full_redraw:
+                for rect in self.ui.hud_rects:
+                    self.screen.fill(self.backend.clear_color, rect)
+                self.dirty_rects += self.ui.hud_rects
+            
+            # Draw level - it doesn't move during the countdown, so draw it once and reuse it
+            if self.countdown > 0 and self.countdown_backdrop is not None:
+                self.screen.blit(self.countdown_backdrop, (0, 0))
+            else:
+                self.level.draw()
+                if self.countdown > 0 and not self.backend.hardware:
+                    self.countdown_backdrop = self.screen.copy()
             
             # Draw HUD
-            self.ui.draw_hud(self.level.player.lives, self.current_level)
+            self.ui.draw_hud(self.level.player.lives, self.current_level,
+                             self.splits.current_split(self.ui.get_elapsed_time()))
             
             # Draw countdown if active
             if self.countdown > 0:
                 self.ui.draw_countdown(self.countdown)
+            if self.backend.hardware and not self.full_redraw:
+                self.dirty_rects += [rect for rect in self.ui.hud_rects if rect not in self.dirty_rects]
         
         elif self.state == STATE_PAUSED:
-            # Draw level in background
-            self.level.draw()
-            
             # Handle pause menu events
             events = pygame.event.get()
             
@@ -252,9 +385,8 @@ class Game:
                     pygame.quit()
                     sys.exit()
             
-            # Update and draw the pause menu
-            self.ui.pause_menu.update(events)
-            self.ui.pause_menu.draw(self.screen)
+            # Update the pause menu
+            menu_changed = self.ui.pause_menu.update(events)
             
             # Handle menu selection
             for event in events:
@@ -277,16 +409,24 @@ class Game:
                     elif event.key == pygame.K_UP:
                         print("UP key pressed in pause menu")
                         # Move selection up (previous widget)
-                        self.ui.pause_menu.update([pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP)])
+                        menu_changed |= self.ui.pause_menu.update([pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP)])
                     elif event.key == pygame.K_DOWN:
                         print("DOWN key pressed in pause menu")
                         # Move selection down (next widget)
-                        self.ui.pause_menu.update([pygame.event.Event(pygame.KEYDOWN, key=pygame.K_DOWN)])
+                        menu_changed |= self.ui.pause_menu.update([pygame.event.Event(pygame.KEYDOWN, key=pygame.K_DOWN)])
+            
+            if self.full_redraw:
+                # Draw the frozen level in background
+                self.screen.blit(self.backdrop, (0, 0))
+                self.ui.pause_menu.draw(self.screen)
+            elif menu_changed:
+                # Only the menu area needs to reach the display
+                menu_rect = self.ui.pause_menu.get_rect()
+                self.screen.blit(self.backdrop, menu_rect, menu_rect)
+                self.ui.pause_menu.draw(self.screen)
+                self.dirty_rects.append(menu_rect)
         
         elif self.state == STATE_GAME_OVER:
-            # Fill with dark background
-            self.screen.fill((20, 20, 20))
-            
             # Handle game over menu events
             events = pygame.event.get()
             
@@ -309,19 +449,26 @@ class Game:
                         print("ENTER key pressed in game over menu - restarting level")
                         self.restart_level()
                         return
+                    elif event.key == pygame.K_f:
+                        self.toggle_fullscreen()
             
             # Update and draw the game over menu
-            self.ui.game_over_menu.update(events)
-            self.ui.game_over_menu.draw(self.screen)
-            
-            # Draw additional instructions
-            instructions_text = self.ui.font_small.render("Press R to restart or ESC to quit to menu", True, WHITE)
-            self.screen.blit(instructions_text, (WIDTH/2 - instructions_text.get_width()/2, HEIGHT - 50))
+            menu_changed = self.ui.game_over_menu.update(events)
+            if self.full_redraw:
+                # Show the frozen level behind the menu
+                self.screen.blit(self.backdrop, (0, 0))
+                self.ui.game_over_menu.draw(self.screen)
+                
+                # Draw additional instructions
+                instructions_text = self.ui.font_small.render("Press R to restart or ESC to quit to menu", True, WHITE)
+                self.screen.blit(instructions_text, (WIDTH/2 - instructions_text.get_width()/2, HEIGHT - 50))
+            elif menu_changed:
+                menu_rect = self.ui.game_over_menu.get_rect()
+                self.screen.blit(self.backdrop, menu_rect, menu_rect)
+                self.ui.game_over_menu.draw(self.screen)
+                self.dirty_rects.append(menu_rect)
         
         elif self.state == STATE_VICTORY:
-            # Fill with victory background
-            self.screen.fill((20, 50, 20))
-            
             # Handle victory menu events
             events = pygame.event.get()
             
@@ -349,23 +496,29 @@ class Game:
                         print("ENTER key pressed in victory menu - next level")
                         self.next_level()
                         return
+                    elif event.key == pygame.K_f:
+                        self.toggle_fullscreen()
             
             # Update and draw the victory menu
-            self.ui.victory_menu.update(events)
-            self.ui.victory_menu.draw(self.screen)
-            
-            # Draw additional instructions
-            instructions_text = self.ui.font_small.render("Press N for next level, R to restart, or ESC to quit", True, WHITE)
-            self.screen.blit(instructions_text, (WIDTH/2 - instructions_text.get_width()/2, HEIGHT - 50))
+            menu_changed = self.ui.victory_menu.update(events)
+            if self.full_redraw:
+                # Show the frozen level behind the menu
+                self.screen.blit(self.backdrop, (0, 0))
+                self.ui.victory_menu.draw(self.screen)
+                
+                # Draw additional instructions
+                instructions_text = self.ui.font_small.render("Press N for next level, R to restart, or ESC to quit", True, WHITE)
+                self.screen.blit(instructions_text, (WIDTH/2 - instructions_text.get_width()/2, HEIGHT - 50))
+            elif menu_changed:
+                menu_rect = self.ui.victory_menu.get_rect()
+                self.screen.blit(self.backdrop, menu_rect, menu_rect)
+                self.ui.victory_menu.draw(self.screen)
+                self.dirty_rects.append(menu_rect)
         
         elif self.state == STATE_LEADERBOARD:
-            # Draw leaderboard
-            self.screen.fill(BLACK)
-            self.leaderboard.render(self.screen)
-            
-            # Draw back button
-            back_text = self.ui.font_medium.render("Press ESC to return to menu", True, WHITE)
-            self.screen.blit(back_text, (WIDTH/2 - back_text.get_width()/2, HEIGHT - 50))
+            # The screen is cached and only repainted when the data changes or the list scrolls
+            if self.leaderboard_screen.draw(self.screen, force=self.full_redraw) and not self.full_redraw:
+                self.dirty_rects.append(self.leaderboard_screen.list_rect)
             
             # Handle leaderboard events
             events = pygame.event.get()
@@ -377,9 +530,11 @@ class Game:
                     sys.exit()
                 elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                     self.state = STATE_MENU
+                else:
+                    self.leaderboard_screen.handle_event(event)
         
         # Update display
-        pygame.display.flip()
+        self.present()
     
     def run(self):
         """Main game loop"""
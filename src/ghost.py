@@ -5,14 +5,35 @@ Handles ghost replay functionality.
 import pygame
 import json
 import os
+import re
+import struct
+import uuid
+import zlib
+from bisect import bisect_right
 from src.settings import *
+from src.ghost_format import encode_ghost, read_ghost_file
+from src.ghost_library import GhostLibrary
+from src.ghost_stream import StreamingRecorder
+from src.io_worker import io_worker
+from src.recorder import (PositionRecorder, FLAG_FACING_RIGHT, FLAG_RUNNING,
+                          FLAG_JUMPING, FLAG_FALLING)
+
+# Import numpy conditionally, without it every ghost seeks on its own
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 class Ghost(pygame.sprite.Sprite):
-    def __init__(self, groups):
+    # Animation frames shared by every ghost with the same tint
+    frame_sets = {}
+    
+    def __init__(self, groups, tint=None):
         super().__init__(groups)
         
         # Create ghost animations
-        self.load_ghost_sprites()
+        self.load_ghost_sprites(tint)
         
         # Animation variables
         self.frame_index = 0
@@ -23,7 +44,7 @@ class Ghost(pygame.sprite.Sprite):
         self.image = self.current_animation[self.frame_index]
         self.rect = self.image.get_rect()
         
-        self.position_data = []
+        self.position_data = PositionRecorder()
         self.current_index = 0
         self.active = False
         self.facing_right = True
@@ -31,8 +52,34 @@ class Ghost(pygame.sprite.Sprite):
         self.is_jumping = False
         self.is_falling = False
     
-    def load_ghost_sprites(self):
-        """Load ghost sprite images - similar to player but semi-transparent"""
+    def load_ghost_sprites(self, tint=None):
+        """Load ghost sprite images, drawing and tinting each set only once"""
+        if tint not in Ghost.frame_sets:
+            if None not in Ghost.frame_sets:
+                self.draw_ghost_sprites()
+                Ghost.frame_sets[None] = (self.idle_frames_right, self.idle_frames_left,
+                                          self.run_frames_right, self.run_frames_left,
+                                          self.jump_frame_right, self.jump_frame_left,
+                                          self.fall_frame_right, self.fall_frame_left)
+            
+            # Tinted copies keep the ghost's transparency
+            def tinted(image):
+                image = image.copy()
+                image.fill((*tint, 255), special_flags=pygame.BLEND_RGBA_MULT)
+                return image
+            
+            frames = []
+            for frame in Ghost.frame_sets[None]:
+                frames.append([tinted(f) for f in frame] if isinstance(frame, list) else tinted(frame))
+            Ghost.frame_sets[tint] = tuple(frames)
+        
+        (self.idle_frames_right, self.idle_frames_left,
+         self.run_frames_right, self.run_frames_left,
+         self.jump_frame_right, self.jump_frame_left,
+         self.fall_frame_right, self.fall_frame_left) = Ghost.frame_sets[tint]
+    
+    def draw_ghost_sprites(self):
+        """Draw ghost sprite images - similar to player but semi-transparent"""
         # Create base images for different states
         self.idle_frames_right = []
         self.idle_frames_left = []
@@ -170,64 +217,62 @@ class Ghost(pygame.sprite.Sprite):
         self.fall_frame_right = fall_surf
         self.fall_frame_left = pygame.transform.flip(fall_surf, True, False)
     
-    def load_ghost_data(self, level_name):
-        """Load ghost data from file for the specified level"""
-        ghost_file = os.path.join(GHOST_RUNS_PATH, f"{level_name}_ghost.json")
+    def set_ghost_data(self, position_data):
+        """Start replaying loaded ghost data"""
+        self.position_data = position_data
+        self.active = True
+        self.current_index = 0
         
-        if os.path.exists(ghost_file):
-            try:
-                with open(ghost_file, 'r') as f:
-                    self.position_data = json.load(f)
-                self.active = True
-                self.current_index = 0
-                return True
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Error loading ghost data: {e}")
-                self.active = False
-                return False
-        else:
-            self.active = False
-            return False
+        # Wait at the start position until the run begins
+        self.update(0)
     
-    def save_ghost_data(self, level_name, position_history):
-        """Save ghost data to file for the specified level"""
-        ghost_file = os.path.join(GHOST_RUNS_PATH, f"{level_name}_ghost.json")
+    def seek(self, elapsed_time):
+        """Find the sample at or before elapsed_time, starting from the cached cursor"""
+        data = self.position_data
+        index = self.current_index
+        last = len(data) - 1
         
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(ghost_file), exist_ok=True)
+        # Normal playback moves forward by at most a sample per frame
+        if index <= last and data.times[index] <= elapsed_time:
+            if index == last or elapsed_time < data.times[index + 1]:
+                return index
+            if index + 1 == last or elapsed_time < data.times[index + 2]:
+                return index + 1
         
-        try:
-            with open(ghost_file, 'w') as f:
-                json.dump(position_history, f)
-            return True
-        except IOError as e:
-            print(f"Error saving ghost data: {e}")
-            return False
+        # Restarts and other jumps in time fall back to a binary search
+        return max(bisect_right(data.times, elapsed_time, 0, len(data)) - 1, 0)
     
     def update(self, elapsed_time):
         """Update ghost position based on elapsed time"""
         if not self.active or not self.position_data:
             return
         
-        # Find the appropriate position data for the current time
-        while (self.current_index < len(self.position_data) - 1 and 
-               self.position_data[self.current_index]['time'] < elapsed_time):
-            self.current_index += 1
+        data = self.position_data
+        index = self.current_index = self.seek(elapsed_time)
         
-        # Set ghost position
-        if self.current_index < len(self.position_data):
-            pos_data = self.position_data[self.current_index]
-            self.rect.x = pos_data['x']
-            self.rect.y = pos_data['y']
-            
-            # Update facing direction and animation states
-            self.facing_right = pos_data.get('facing_right', True)
-            self.is_running = pos_data.get('is_running', False)
-            self.is_jumping = pos_data.get('is_jumping', False)
-            self.is_falling = pos_data.get('is_falling', False)
-            
-            # Update animation
-            self.animate()
+        # Interpolate between the surrounding samples for smooth motion
+        x, y = data.xs[index], data.ys[index]
+        if index < len(data) - 1 and data.times[index] <= elapsed_time:
+            span = data.times[index + 1] - data.times[index]
+            if span > 0:
+                t = (elapsed_time - data.times[index]) / span
+                x += (data.xs[index + 1] - x) * t
+                y += (data.ys[index + 1] - y) * t
+        self.show_sample(x, y, data.flags[index])
+    
+    def show_sample(self, x, y, flags):
+        """Move the ghost and set its animation from a played sample"""
+        self.rect.x = round(x)
+        self.rect.y = round(y)
+        
+        # Animation state comes from the flags of the sample being played
+        self.facing_right = bool(flags & FLAG_FACING_RIGHT)
+        self.is_running = bool(flags & FLAG_RUNNING)
+        self.is_jumping = bool(flags & FLAG_JUMPING)
+        self.is_falling = bool(flags & FLAG_FALLING)
+        
+        # Update animation
+        self.animate()
     
     def animate(self):
         """Update ghost animation based on state"""
@@ -264,3 +309,208 @@ class Ghost(pygame.sprite.Sprite):
                 self.image = self.idle_frames_right[int(self.frame_index)]
             else:
                 self.image = self.idle_frames_left[int(self.frame_index)]
+
+
+class GhostRace:
+    def __init__(self, groups, level_name, library=None, count=GHOST_RACE_COUNT):
+        self.groups = groups
+        self.level_name = level_name
+        self.count = count
+        self.ghosts = []
+        self.timeline = None
+        
+        # The runs raced against are picked from the library manifest
+        if library is None:
+            library = GhostLibrary()
+            io_worker.submit(library.read_manifest, callback=library.apply_manifest)
+        self.library = library
+        
+        # Bumped on every load so ghosts read for an earlier load are ignored
+        self.generation = 0
+        self.load()
+    
+    def __len__(self):
+        return len(self.ghosts)
+    
+    @staticmethod
+    def ghost_file_path(level_name, time):
+        """Get the ghost file path for one leaderboard entry"""
+        return os.path.join(GHOST_RUNS_PATH, f"{level_name}_{int(time)}.ghost")
+    
+    @staticmethod
+    def import_ghost_files(library):
+        """Move ghost files left in the runs directory into the library (I/O worker thread)"""
+        if not os.path.isdir(GHOST_RUNS_PATH):
+            return []
+        
+        entries = []
+        for filename in sorted(os.listdir(GHOST_RUNS_PATH)):
+            path = os.path.join(GHOST_RUNS_PATH, filename)
+            run_match = re.match(r"(.+)_(\d+)\.ghost$", filename)
+            legacy_match = re.match(r"(.+)_ghost\.(ghost|json)$", filename)
+            try:
+                if run_match:
+                    entry = library.add_file(path, run_match.group(1), int(run_match.group(2)))
+                elif legacy_match:
+                    # The single ghost of older versions was the record run, it ends at the finish time
+                    position_data = read_ghost_file(path)
+                    if not position_data:
+                        continue
+                    entry = library.append(encode_ghost(position_data, GHOST_COMPRESSION), legacy_match.group(1),
+                                           position_data.times[len(position_data) - 1], record=True)
+                else:
+                    continue
+                if entry is not None:
+                    entries.append(entry)
+                    os.remove(path)
+            except (json.JSONDecodeError, zlib.error, ValueError, IOError) as e:
+                print(f"Error importing ghost file {filename}: {e}")
+        return entries
+    
+    @staticmethod
+    def read_ghosts(library, entries):
+        """Read the ghost data of the selected runs (I/O worker thread)"""
+        ghost_data = []
+        for entry in entries:
+            try:
+                position_data = library.read(entry)
+                if position_data:
+                    ghost_data.append(position_data)
+            except (zlib.error, struct.error, ValueError, IOError) as e:
+                print(f"Error loading ghost data: {e}")
+        return ghost_data
+    
+    def load(self):
+        """Load the ghosts of the fastest runs in the background"""
+        for ghost in self.ghosts:
+            ghost.kill()
+        self.ghosts = []
+        self.timeline = None
+        
+        # Runs are picked once everything queued before has reached the manifest, so a just-finished run is included
+        self.generation += 1
+        generation = self.generation
+        io_worker.submit(lambda: None, callback=lambda result: self.select_ghosts(generation))
+    
+    def select_ghosts(self, generation):
+        """Pick the fastest runs from the manifest and read only their ghost data (game loop)"""
+        if generation != self.generation:
+            return
+        
+        entries = self.library.runs(self.level_name, source="local", limit=self.count)
+        if entries:
+            io_worker.submit(self.read_ghosts, self.library, entries,
+                             callback=lambda ghost_data: self.add_ghosts(generation, ghost_data))
+    
+    def add_ghosts(self, generation, ghost_data):
+        """Create a tinted ghost for each loaded run (game loop)"""
+        if generation != self.generation:
+            return
+        
+        for position_data in ghost_data:
+            ghost = Ghost(self.groups, GHOST_TINTS[len(self.ghosts) % len(GHOST_TINTS)])
+            ghost.set_ghost_data(position_data)
+            self.ghosts.append(ghost)
+        
+        self.build_timeline()
+    
+    def save_ghost_data(self, level_name, position_history, time, record=False):
+        """Add the ghost of a leaderboard entry to the library in the background, returning its library id"""
+        # The id is picked here so the leaderboard can store it before the ghost is written
+        entry_id = uuid.uuid4().hex
+        
+        # A streamed recording is already on disk and only needs to be completed
+        if isinstance(position_history, StreamingRecorder):
+            ghost_file = self.ghost_file_path(level_name, time)
+            position_history.finish(ghost_file)
+            io_worker.submit(self.store_ghost_file, self.library, ghost_file, level_name, time, record, entry_id,
+                             callback=self.library.apply_entry)
+        else:
+            io_worker.submit(self.store_ghost, self.library, position_history, level_name, time, record, entry_id,
+                             callback=self.library.apply_entry)
+        return entry_id
+    
+    @staticmethod
+    def store_ghost(library, position_history, level_name, time, record, entry_id=None):
+        """Encode a recorded ghost into the library (I/O worker thread)"""
+        try:
+            data = encode_ghost(position_history, GHOST_COMPRESSION)
+        except ValueError as e:
+            print(f"Error saving ghost data: {e}")
+            return None
+        return library.append(data, level_name, time, "Player", "local", record, entry_id)
+    
+    @staticmethod
+    def store_ghost_file(library, ghost_file, level_name, time, record, entry_id=None):
+        """Move a finished ghost file into the library (I/O worker thread)"""
+        if not os.path.exists(ghost_file):
+            return None
+        entry = library.add_file(ghost_file, level_name, time, "Player", "local", record, entry_id)
+        if entry is not None:
+            try:
+                os.remove(ghost_file)
+            except OSError as e:
+                print(f"Error removing ghost file: {e}")
+        return entry
+    
+    def prune(self, level_name, kept_times):
+        """Drop the ghosts of runs that fell off the leaderboard, personal bests stay in the library"""
+        kept_times = {int(time) for time in kept_times}
+        dropped = [entry['id'] for entry in self.library.runs(level_name, source="local")
+                   if entry['time'] not in kept_times and not entry.get('record')]
+        if dropped:
+            self.library.forget(set(dropped))
+            io_worker.submit(self.library.write_removals, dropped)
+    
+    def build_timeline(self):
+        """Stack every ghost's samples into one sorted timeline for vectorized seeking"""
+        self.timeline = None
+        if not NUMPY_AVAILABLE or not self.ghosts:
+            return
+        
+        # Shift each ghost's times into its own range so the whole timeline stays sorted
+        stride = max(g.position_data.times[len(g.position_data) - 1] for g in self.ghosts) + 1
+        times, xs, ys, flags, starts, ends = [], [], [], [], [], []
+        start = 0
+        for i, ghost in enumerate(self.ghosts):
+            ghost_times, ghost_xs, ghost_ys, ghost_flags = ghost.position_data.columns()
+            times.append(np.asarray(ghost_times, dtype=np.float64) + i * stride)
+            xs.append(np.asarray(ghost_xs, dtype=np.float64))
+            ys.append(np.asarray(ghost_ys, dtype=np.float64))
+            flags.append(np.asarray(ghost_flags))
+            starts.append(start)
+            start += len(ghost.position_data)
+            ends.append(start - 1)
+        
+        self.timeline = {
+            'times': np.concatenate(times),
+            'xs': np.concatenate(xs),
+            'ys': np.concatenate(ys),
+            'flags': np.concatenate(flags),
+            'shifts': np.arange(len(self.ghosts)) * float(stride),
+            'starts': np.array(starts),
+            'ends': np.array(ends)
+        }
+    
+    def update(self, elapsed_time):
+        """Advance every ghost to elapsed_time"""
+        if self.timeline is None:
+            for ghost in self.ghosts:
+                ghost.update(elapsed_time)
+            return
+        
+        # One search finds the current sample of every ghost
+        tl = self.timeline
+        keys = tl['shifts'] + elapsed_time
+        index = np.clip(np.searchsorted(tl['times'], keys, side='right') - 1, tl['starts'], tl['ends'])
+        following = np.minimum(index + 1, tl['ends'])
+        
+        # Interpolate towards the next sample, holding still before the first and after the last
+        span = tl['times'][following] - tl['times'][index]
+        t = np.clip((keys - tl['times'][index]) / np.where(span > 0, span, 1), 0, 1)
+        xs = tl['xs'][index] + (tl['xs'][following] - tl['xs'][index]) * t
+        ys = tl['ys'][index] + (tl['ys'][following] - tl['ys'][index]) * t
+        flags = tl['flags'][index]
+        
+        for ghost, x, y, f in zip(self.ghosts, xs.tolist(), ys.tolist(), flags.tolist()):
+            ghost.show_sample(x, y, f)
@@ -0,0 +1,78 @@
+"""
+Ghost comparison module for SpeedRunner X.
+Lines ghost runs up by position to compare them section by section.
+"""
+import os
+from src.settings import *
+
+# Import numpy conditionally, only the comparison tools need it
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+def arrival_times(times, xs, positions):
+    """Get when a run first reached each x position, NaN for positions it never reached"""
+    # Furthest x so far, so running back doesn't count as reaching a position twice
+    progress = np.maximum.accumulate(xs.astype(np.float64))
+    times = times.astype(np.float64)
+    positions = np.asarray(positions, dtype=np.float64)
+
+    # First sample at or past each position, interpolated with the sample before it
+    after = np.searchsorted(progress, positions, side='left')
+    reached = after < len(progress)
+    after = np.minimum(after, len(progress) - 1)
+    before = np.maximum(after - 1, 0)
+    span = progress[after] - progress[before]
+    fraction = np.divide(positions - progress[before], span, out=np.zeros_like(span), where=span > 0)
+    arrival = times[before] + np.clip(fraction, 0, 1) * (times[after] - times[before])
+    arrival[positions <= progress[0]] = times[0]
+    arrival[~reached] = np.nan
+    return arrival
+
+
+def arrival_matrix(ghosts, positions):
+    """Stack the arrival times of many runs into a (runs, positions) matrix"""
+    return np.array([arrival_times(times, xs, positions) for times, xs, ys in ghosts])
+
+
+def split_times(ghosts, boundaries):
+    """Get each run's section times between the boundary x positions, ending at the run's final time"""
+    arrivals = arrival_matrix(ghosts, boundaries)
+    finish = np.array([times[-1] for times, xs, ys in ghosts], dtype=np.float64)
+    starts = np.concatenate([np.zeros((len(ghosts), 1)), arrivals], axis=1)
+    ends = np.concatenate([arrivals, finish[:, None]], axis=1)
+    return ends - starts
+
+
+def sum_of_best(splits):
+    """Get the fastest time of every section, which run set it and their total"""
+    # A section no run reached has no best, it is NaN with holder -1 and left out of the total
+    reached = ~np.isnan(splits).all(axis=0)
+    best = np.full(splits.shape[1], np.nan)
+    holders = np.full(splits.shape[1], -1, dtype=np.int64)
+    if reached.any():
+        best[reached] = np.nanmin(splits[:, reached], axis=0)
+        holders[reached] = np.nanargmin(splits[:, reached], axis=0)
+    return best, holders, float(best[reached].sum())
+
+
+def checkpoint_boundaries(level_name):
+    """Get the x positions where a level's checkpoints are reached, from the level itself"""
+    # Import here so the comparison functions work without building a level
+    import pygame
+    from src.level import Level
+
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((WIDTH, HEIGHT))
+    level = Level(level_name, pygame.Surface((WIDTH, HEIGHT)))
+
+    # Ghosts record the player's left edge, and a checkpoint counts as soon as the player touches it
+    width = level.player.rect.width if level.player else TILE_SIZE
+    return sorted(x - width for x, y in level.checkpoint_positions)
+
+
+def ghost_label(path):
+    """Get a short name for a ghost file"""
+    return os.path.splitext(os.path.basename(path))[0]
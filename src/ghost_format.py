@@ -0,0 +1,127 @@
+"""
+Ghost format module for SpeedRunner X.
+Reads and writes the compact binary ghost replay format.
+"""
+import io
+import json
+import struct
+import zlib
+from src.recorder import PositionRecorder
+
+# File layout: header, then one fixed-width record per sample (optionally zlib compressed)
+GHOST_MAGIC = b'SRXG'
+GHOST_VERSION = 1
+HEADER = struct.Struct('<4sBBI')   # magic, version, header flags, sample count
+RECORD = struct.Struct('<HhhB')    # time delta (ms), x delta, y delta, state flags
+
+# Header flags
+HEADER_ZLIB = 0x01
+
+# Record flag: the delta didn't fit in one record, keep adding the following records
+# into the same sample (the low bits hold the recorder's state flags)
+FLAG_CONTINUED = 0x80
+
+DELTA_MIN, DELTA_MAX = -32768, 32767
+TIME_DELTA_MAX = 65535
+
+def clamp(value, low, high):
+    """Clamp a value to a range"""
+    return max(low, min(high, value))
+
+class GhostEncoder:
+    def __init__(self, f, compress=True):
+        # The sample count in the header is filled in when the encoder is closed
+        self.file = f
+        self.compressor = zlib.compressobj() if compress else None
+        self.header_flags = HEADER_ZLIB if compress else 0
+        self.count = 0
+        self.last_time, self.last_x, self.last_y = 0, 0, 0
+        self.file.write(HEADER.pack(GHOST_MAGIC, GHOST_VERSION, self.header_flags, 0))
+
+    def write(self, times, xs, ys, state_flags):
+        """Encode a chunk of samples, continuing the deltas of the previous chunk"""
+        records = bytearray()
+        last_time, last_x, last_y = self.last_time, self.last_x, self.last_y
+
+        for time, x, y, flags in zip(times, xs, ys, state_flags):
+            dt = time - last_time
+            dx = x - last_x
+            dy = y - last_y
+            last_time, last_x, last_y = time, x, y
+
+            # Continuation records only add time, so going back in time can't be encoded
+            if dt < 0:
+                raise ValueError(f"Ghost sample times must not decrease ({time} ms after {time - dt} ms)")
+
+            # Split deltas that don't fit a record over continuation records
+            while not (0 <= dt <= TIME_DELTA_MAX and DELTA_MIN <= dx <= DELTA_MAX
+                       and DELTA_MIN <= dy <= DELTA_MAX):
+                step_t = clamp(dt, 0, TIME_DELTA_MAX)
+                step_x = clamp(dx, DELTA_MIN, DELTA_MAX)
+                step_y = clamp(dy, DELTA_MIN, DELTA_MAX)
+                records += RECORD.pack(step_t, step_x, step_y, flags | FLAG_CONTINUED)
+                dt, dx, dy = dt - step_t, dx - step_x, dy - step_y
+
+            records += RECORD.pack(dt, dx, dy, flags)
+
+        self.last_time, self.last_x, self.last_y = last_time, last_x, last_y
+        self.count += len(times)
+        self.file.write(self.compressor.compress(records) if self.compressor else records)
+
+    def close(self):
+        """Finish the payload and write the final sample count into the header"""
+        if self.compressor:
+            self.file.write(self.compressor.flush())
+        self.file.seek(0)
+        self.file.write(HEADER.pack(GHOST_MAGIC, GHOST_VERSION, self.header_flags, self.count))
+        self.file.seek(0, io.SEEK_END)
+
+def encode_ghost(recorder, compress=True):
+    """Encode a position recorder into the binary ghost format"""
+    buffer = io.BytesIO()
+    encoder = GhostEncoder(buffer, compress)
+    encoder.write(*recorder.columns())
+    encoder.close()
+    return buffer.getvalue()
+
+def decode_ghost(data):
+    """Decode binary ghost data into a position recorder"""
+    magic, version, header_flags, count = HEADER.unpack_from(data)
+    if magic != GHOST_MAGIC:
+        raise ValueError("Not a ghost replay file")
+    if version > GHOST_VERSION:
+        raise ValueError(f"Unsupported ghost format version {version}")
+
+    payload = data[HEADER.size:]
+    if header_flags & HEADER_ZLIB:
+        payload = zlib.decompress(payload)
+
+    recorder = PositionRecorder(max(count, 1))
+    time, x, y = 0, 0, 0
+    for dt, dx, dy, flags in RECORD.iter_unpack(payload):
+        time += dt
+        x += dx
+        y += dy
+        if flags & FLAG_CONTINUED:
+            continue
+        recorder.append(time, x, y, flags)
+
+    if len(recorder) != count:
+        raise ValueError(f"Ghost data is truncated ({len(recorder)} of {count} samples)")
+    return recorder
+
+def read_ghost_file(path):
+    """Read a ghost file, accepting both the binary format and old JSON ghosts"""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if data.startswith(GHOST_MAGIC):
+        return decode_ghost(data)
+    return PositionRecorder.from_samples(json.loads(data))
+
+def write_ghost_file(path, recorder, compress=True):
+    """Write a position recorder to a binary ghost file"""
+    with open(path, 'wb') as f:
+        encoder = GhostEncoder(f, compress)
+        encoder.write(*recorder.columns())
+        encoder.close()
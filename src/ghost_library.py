@@ -0,0 +1,173 @@
+"""
+Ghost library module for SpeedRunner X.
+Keeps any number of ghost runs in one pack file with a small manifest to list them from.
+"""
+import json
+import os
+import time
+import uuid
+from src.settings import *
+from src.json_lines import read_json_lines
+from src.ghost_format import GHOST_MAGIC, decode_ghost, encode_ghost, read_ghost_file
+
+def filter_runs(entries, level_name=None, player_name=None, source=None, limit=None):
+    """Pick the manifest entries matching the filters, fastest first"""
+    runs = [entry for entry in entries
+            if (level_name is None or entry['level'] == level_name)
+            and (player_name is None or entry['player'] == player_name)
+            and (source is None or entry['source'] == source)]
+    runs.sort(key=lambda entry: entry['time'])
+    return runs[:limit] if limit is not None else runs
+
+
+class GhostLibrary:
+    def __init__(self, directory=GHOST_LIBRARY_PATH):
+        # Ghost data is appended to the pack, the manifest has one JSON line per added or removed run
+        self.directory = directory
+        self.pack_path = os.path.join(directory, "ghosts.pack")
+        self.manifest_path = os.path.join(directory, "manifest.jsonl")
+        self.entries = []
+        self.loaded = False
+
+    def read_manifest(self):
+        """Read the manifest, returning the entries of every run still in the library"""
+        entries = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                for record in read_json_lines(self.manifest_path):
+                    # Compaction starts a new manifest naming the pack it wrote
+                    if 'pack' in record:
+                        self.pack_path = os.path.join(self.directory, record['pack'])
+                    elif record.get('removed'):
+                        entries.pop(record['id'], None)
+                    else:
+                        entries[record['id']] = record
+            except IOError as e:
+                print(f"Error reading ghost library: {e}")
+        return list(entries.values())
+
+    def apply_manifest(self, entries):
+        """Take over entries read by read_manifest"""
+        self.entries = entries + [entry for entry in self.entries if entry not in entries]
+        self.loaded = True
+
+    def load_manifest(self):
+        """Read the manifest right away, for tools"""
+        self.apply_manifest(self.read_manifest())
+
+    def apply_entry(self, entry):
+        """Take over the entry of a run added on the I/O worker"""
+        if entry is not None:
+            self.entries.append(entry)
+
+    def apply_entries(self, entries):
+        """Take over the entries of several runs added on the I/O worker"""
+        self.entries += [entry for entry in entries if entry is not None]
+
+    def runs(self, level_name=None, player_name=None, source=None, limit=None):
+        """List runs from the manifest, fastest first, without opening any ghost data"""
+        return filter_runs(self.entries, level_name, player_name, source, limit)
+
+    def write_manifest_line(self, record):
+        """Append one record to the manifest"""
+        with open(self.manifest_path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, data, level_name, run_time, player_name="Player", source="local", record=False, entry_id=None):
+        """Add encoded ghost data to the library, returning its entry (I/O worker thread or tools)"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            # The data goes in first, a crash before the manifest line only leaves unreferenced bytes
+            with open(self.pack_path, 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # The id stays the same through compaction, so leaderboards can refer to the run by it
+            entry = {'id': entry_id or uuid.uuid4().hex, 'level': level_name, 'time': int(run_time), 'player': player_name,
+                     'date': time.time(), 'source': source, 'record': record, 'offset': offset, 'size': len(data)}
+            self.write_manifest_line(entry)
+            return entry
+        except IOError as e:
+            print(f"Error adding to ghost library: {e}")
+            return None
+
+    def add_file(self, path, level_name, run_time, player_name="Player", source="local", record=False, entry_id=None):
+        """Add a ghost file to the library, converting old JSON ghosts (I/O worker thread or tools)"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if not data.startswith(GHOST_MAGIC):
+                data = encode_ghost(read_ghost_file(path), GHOST_COMPRESSION)
+        except (IOError, ValueError) as e:
+            print(f"Error reading ghost file {path}: {e}")
+            return None
+        return self.append(data, level_name, run_time, player_name, source, record, entry_id)
+
+    def read_data(self, entry):
+        """Read the encoded ghost data of one run"""
+        with open(self.pack_path, 'rb') as f:
+            f.seek(entry['offset'])
+            return f.read(entry['size'])
+
+    def read(self, entry):
+        """Load one run's ghost as a position recorder"""
+        return decode_ghost(self.read_data(entry))
+
+    def write_removals(self, entry_ids):
+        """Mark runs as removed in the manifest (I/O worker thread or tools)"""
+        try:
+            with open(self.manifest_path, 'a') as f:
+                for entry_id in entry_ids:
+                    f.write(json.dumps({'id': entry_id, 'removed': True}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except IOError as e:
+            print(f"Error removing from ghost library: {e}")
+
+    def forget(self, entry_ids):
+        """Drop runs from the listed entries"""
+        self.entries = [entry for entry in self.entries if entry['id'] not in entry_ids]
+
+    def remove(self, entry):
+        """Drop a run from the library, its data stays in the pack until it is compacted"""
+        self.write_removals([entry['id']])
+        self.forget({entry['id']})
+
+    def compact(self):
+        """Rewrite the library into a new pack with only the runs still in it (I/O worker thread or tools)"""
+        if not os.path.exists(self.pack_path):
+            return
+        generation = 1
+        while os.path.exists(os.path.join(self.directory, f"ghosts-{generation}.pack")):
+            generation += 1
+        pack_name = f"ghosts-{generation}.pack"
+        pack_path = os.path.join(self.directory, pack_name)
+        manifest_temp = self.manifest_path + ".tmp"
+
+        entries = []
+        with open(self.pack_path, 'rb') as source, open(pack_path, 'wb') as pack:
+            for entry in sorted(self.entries, key=lambda entry: entry['offset']):
+                source.seek(entry['offset'])
+                data = source.read(entry['size'])
+                entries.append(dict(entry, offset=pack.tell()))
+                pack.write(data)
+            pack.flush()
+            os.fsync(pack.fileno())
+        with open(manifest_temp, 'w') as manifest:
+            manifest.write(json.dumps({'pack': pack_name}) + "\n")
+            for entry in entries:
+                manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            os.fsync(manifest.fileno())
+
+        # Replacing the manifest switches to the new pack in one step, the old pack is only removed after
+        old_pack_path = self.pack_path
+        os.replace(manifest_temp, self.manifest_path)
+        self.pack_path = pack_path
+        self.entries = entries
+        os.remove(old_pack_path)
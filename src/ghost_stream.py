@@ -0,0 +1,138 @@
+"""
+Ghost stream module for SpeedRunner X.
+Streams a ghost recording to disk through the I/O worker while the run is played.
+"""
+import os
+import tempfile
+from src.settings import *
+from src.ghost_format import GhostEncoder
+from src.recorder import AdaptiveRecorder
+from src.io_worker import io_worker
+
+class GhostStream:
+    def __init__(self, directory=GHOST_RUNS_PATH):
+        # Only touched on the I/O worker thread once the first chunk is queued
+        self.directory = directory
+        self.file = None
+        self.temp_path = None
+        self.encoder = None
+        self.started = False
+
+        # Set once a write fails, the recording is incomplete from then on and never replaces a ghost
+        self.failed = False
+
+    @staticmethod
+    def remove_stale_recordings(directory=GHOST_RUNS_PATH):
+        """Delete temporary recordings left behind by runs that never ended"""
+        if not os.path.isdir(directory):
+            return
+        for filename in os.listdir(directory):
+            if filename.startswith("recording_") and filename.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except OSError as e:
+                    print(f"Error removing stale ghost recording: {e}")
+
+    def write(self, times, xs, ys, flags):
+        """Queue a chunk of samples to be appended to the recording"""
+        self.started = True
+        io_worker.submit(self.write_chunk, times, xs, ys, flags)
+
+    def finish(self, path):
+        """Queue the recording to be completed and renamed to path"""
+        self.started = True
+        io_worker.submit(self.finish_file, path)
+
+    def discard(self):
+        """Queue the recording to be deleted"""
+        if self.started:
+            io_worker.submit(self.close_file)
+
+    def open_file(self):
+        """Create the temporary file on first use (worker thread)"""
+        if self.file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, self.temp_path = tempfile.mkstemp(prefix="recording_", suffix=".tmp", dir=self.directory)
+            self.file = os.fdopen(fd, 'wb')
+            self.encoder = GhostEncoder(self.file, GHOST_COMPRESSION)
+
+    def write_chunk(self, times, xs, ys, flags):
+        """Append a chunk to the temporary file (worker thread)"""
+        if self.failed:
+            return
+        try:
+            self.open_file()
+            self.encoder.write(times, xs, ys, flags)
+        except (OSError, ValueError) as e:
+            print(f"Error streaming ghost data: {e}")
+            self.failed = True
+            self.close_file()
+
+    def finish_file(self, path):
+        """Complete the temporary file and move it into place (worker thread)"""
+        if self.failed:
+            print(f"Ghost recording incomplete, not saved to {path}")
+            self.close_file()
+            return
+        try:
+            self.open_file()
+            self.encoder.close()
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+            
+            # Readers see either the old ghost or the complete new one
+            os.replace(self.temp_path, path)
+            self.temp_path = None
+        except OSError as e:
+            print(f"Error streaming ghost data: {e}")
+            self.failed = True
+            self.close_file()
+
+    def close_file(self):
+        """Close and delete the temporary file (worker thread)"""
+        if self.file is not None:
+            try:
+                self.file.close()
+            except OSError:
+                # Closing flushes what is buffered, which fails the same way the write did
+                pass
+            self.file = None
+        if self.temp_path and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.temp_path = None
+
+
+class StreamingRecorder(AdaptiveRecorder):
+    def __init__(self, chunk_size=RECORDER_CHUNK_SIZE):
+        # Full chunks are handed to the stream, so memory stays at one chunk per column
+        self.stream = GhostStream()
+        super().__init__(chunk_size=chunk_size)
+
+    def grow(self):
+        """Hand a full chunk to the stream instead of growing the columns"""
+        if self.count:
+            self.spill()
+        else:
+            super().grow()
+
+    def spill(self):
+        """Send the stored keyframes to the stream and reuse the columns"""
+        count = self.count
+        self.stream.write(self.times[:count], self.xs[:count], self.ys[:count], self.flags[:count])
+        self.count = 0
+
+    def finish(self, path):
+        """Complete the recording in the background and move it to path"""
+        self.flush()
+        if self.count:
+            self.spill()
+        self.stream.finish(path)
+        self.stream = GhostStream()
+
+    def discard(self):
+        """Throw the recording away"""
+        self.stream.discard()
+        self.stream = GhostStream()
+        self.clear()
@@ -0,0 +1,141 @@
+"""
+Heatmap module for SpeedRunner X.
+Bins ghost trajectories and death locations into density grids and draws them over the level.
+"""
+import os
+import zlib
+import pygame
+from src.settings import *
+from src.ghost_format import GHOST_MAGIC, HEADER, HEADER_ZLIB, FLAG_CONTINUED, read_ghost_file
+
+# Import numpy conditionally, only building heatmaps needs it
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+
+    # One ghost record as a structured type, matching RECORD in ghost_format
+    RECORD_DTYPE = np.dtype([('dt', '<u2'), ('dx', '<i2'), ('dy', '<i2'), ('flags', 'u1')])
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Colors of the occupancy and death layers
+OCCUPANCY_COLOR = (0, 170, 255)
+DEATH_COLOR = (255, 40, 40)
+
+# Width of the pieces the overlay is cut into, so only visible ones are drawn
+OVERLAY_TILE_WIDTH = 512
+
+def heatmap_path(level_name, directory=HEATMAP_PATH):
+    """Get the overlay image path of a level"""
+    return os.path.join(directory, f"{level_name}.png")
+
+
+def read_ghost_arrays(path):
+    """Read a ghost file into (times, xs, ys) arrays without decoding it record by record"""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if not data.startswith(GHOST_MAGIC):
+        # Old JSON ghosts go through the regular reader
+        times, xs, ys, flags = read_ghost_file(path).columns()
+        return np.asarray(times, dtype=np.int64), np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+    return decode_ghost_arrays(data)
+
+
+def decode_ghost_arrays(data):
+    """Decode binary ghost data, e.g. from the ghost library, into (times, xs, ys) arrays"""
+    magic, version, header_flags, count = HEADER.unpack_from(data)
+    payload = data[HEADER.size:]
+    if header_flags & HEADER_ZLIB:
+        payload = zlib.decompress(payload)
+    records = np.frombuffer(payload, dtype=RECORD_DTYPE)
+
+    # Deltas add up to absolute values, continuation records only contribute to the sample after them
+    keep = (records['flags'] & FLAG_CONTINUED) == 0
+    times = np.cumsum(records['dt'], dtype=np.int64)[keep]
+    xs = np.cumsum(records['dx'], dtype=np.int64)[keep]
+    ys = np.cumsum(records['dy'], dtype=np.int64)[keep]
+    return times, xs, ys
+
+
+def resample_ghosts(ghosts, interval=HEATMAP_SAMPLE_INTERVAL):
+    """Sample every ghost at a fixed interval, so positions are weighted by the time spent there"""
+    ghosts = [ghost for ghost in ghosts if len(ghost[0]) > 1]
+    if not ghosts:
+        return np.zeros(0), np.zeros(0)
+
+    # Shift each ghost's times into its own range, then one interpolation covers every ghost
+    stride = max(int(times[-1]) for times, xs, ys in ghosts) + interval
+    times = np.concatenate([times + i * stride for i, (times, xs, ys) in enumerate(ghosts)])
+    xs = np.concatenate([xs for times, xs, ys in ghosts])
+    ys = np.concatenate([ys for times, xs, ys in ghosts])
+    queries = np.concatenate([np.arange(ghost_times[0], ghost_times[-1], interval) + i * stride
+                              for i, (ghost_times, ghost_xs, ghost_ys) in enumerate(ghosts)])
+    return np.interp(queries, times, xs), np.interp(queries, times, ys)
+
+
+def bin_positions(xs, ys, width, height, cell_size=HEATMAP_CELL_SIZE):
+    """Count positions per grid cell, returning a (rows, columns) grid over the level"""
+    columns = -(-width // cell_size)
+    rows = -(-height // cell_size)
+    cell_x = np.floor_divide(xs, cell_size).astype(np.int64)
+    cell_y = np.floor_divide(ys, cell_size).astype(np.int64)
+
+    # Positions off the grid, like jumps above the top of the screen, are dropped
+    inside = (cell_x >= 0) & (cell_x < columns) & (cell_y >= 0) & (cell_y < rows)
+    counts = np.bincount(cell_y[inside] * columns + cell_x[inside], minlength=rows * columns)
+    return counts.reshape(rows, columns)
+
+
+def grid_to_rgba(grid, color, max_alpha=190):
+    """Color a grid with alpha growing with the log of its counts, returning (rows, columns, 4) floats"""
+    rgba = np.zeros(grid.shape + (4,))
+    rgba[..., :3] = color
+    if grid.max() > 0:
+        rgba[..., 3] = np.log1p(grid) / np.log1p(grid.max()) * (max_alpha / 255)
+    return rgba
+
+
+def composite(top, bottom):
+    """Draw one RGBA layer over another"""
+    alpha = top[..., 3:] + bottom[..., 3:] * (1 - top[..., 3:])
+    rgb = (top[..., :3] * top[..., 3:] + bottom[..., :3] * bottom[..., 3:] * (1 - top[..., 3:]))
+    return np.concatenate([np.divide(rgb, alpha, out=np.zeros_like(rgb), where=alpha > 0), alpha], axis=-1)
+
+
+def rgba_to_surface(rgba, cell_size=HEATMAP_CELL_SIZE):
+    """Turn an RGBA layer into a surface at world resolution"""
+    pixels = np.empty(rgba.shape, dtype=np.uint8)
+    pixels[..., :3] = np.clip(rgba[..., :3], 0, 255)
+    pixels[..., 3] = np.clip(rgba[..., 3] * 255, 0, 255)
+    rows, columns = rgba.shape[:2]
+    surface = pygame.image.frombuffer(pixels.tobytes(), (columns, rows), 'RGBA')
+    return pygame.transform.scale(surface, (columns * cell_size, rows * cell_size))
+
+
+class HeatmapOverlay:
+    def __init__(self, image):
+        # Cut into strips so a frame only draws the strips on screen
+        self.tiles = []
+        for x in range(0, image.get_width(), OVERLAY_TILE_WIDTH):
+            width = min(OVERLAY_TILE_WIDTH, image.get_width() - x)
+            self.tiles.append((x, image.subsurface((x, 0, width, image.get_height())).copy()))
+
+    @classmethod
+    def load(cls, level_name):
+        """Load a level's exported overlay image, or None if it has none"""
+        path = heatmap_path(level_name)
+        if not os.path.exists(path):
+            print(f"No heatmap for {level_name}, create one with tools/heatmap.py")
+            return None
+        try:
+            return cls(pygame.image.load(path))
+        except pygame.error as e:
+            print(f"Error loading heatmap: {e}")
+            return None
+
+    def visible_tiles(self, camera_x, view_width):
+        """Get the (x, image) tiles that overlap the view"""
+        for x, image in self.tiles:
+            if x + image.get_width() > -camera_x and x < view_width - camera_x:
+                yield x, image
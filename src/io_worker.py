@@ -0,0 +1,72 @@
+"""
+I/O worker module for SpeedRunner X.
+Runs disk access on one background thread and hands results back to the game loop.
+"""
+import atexit
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+
+class IOWorker:
+    def __init__(self):
+        # One thread keeps requests in submission order, so a read never overtakes an earlier write
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="io-worker")
+        self.completed = queue.SimpleQueue()
+        self.closed = False
+
+        # Whatever is still queued gets written before the process exits
+        atexit.register(self.flush)
+
+    def submit(self, func, *args, callback=None):
+        """Queue func(*args) on the worker thread, callback(result) runs later on the game loop"""
+        if not self.closed:
+            try:
+                future = self.executor.submit(func, *args)
+            except RuntimeError:
+                # The interpreter is shutting down and has already stopped the thread
+                self.closed = True
+
+        if self.closed:
+            # Nothing runs in the background any more, so do the work right away
+            result = func(*args)
+            if callback:
+                callback(result)
+            return None
+
+        if callback:
+            future.add_done_callback(lambda done: self.completed.put((callback, done)))
+        return future
+
+    def post(self, callback, result):
+        """Hand a result from any other background thread to the game loop"""
+        future = Future()
+        future.set_result(result)
+        self.completed.put((callback, future))
+
+    def poll(self):
+        """Run the callbacks of finished requests, called once per frame from the game loop"""
+        while True:
+            try:
+                callback, future = self.completed.get_nowait()
+            except queue.Empty:
+                return
+
+            error = future.exception()
+            if error:
+                print(f"Background I/O failed: {error}")
+            else:
+                callback(future.result())
+
+    def wait(self):
+        """Block until every request queued so far has finished"""
+        if not self.closed:
+            self.executor.submit(lambda: None).result()
+
+    def flush(self):
+        """Finish all queued requests and stop the worker thread"""
+        if not self.closed:
+            self.closed = True
+            self.executor.shutdown(wait=True)
+
+
+# Shared by the leaderboard and the ghost code
+io_worker = IOWorker()
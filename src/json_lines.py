@@ -0,0 +1,28 @@
+"""
+JSON lines module for SpeedRunner X.
+Reads the append-only JSON lines files (journal, manifest, outbox) and repairs a line a crash cut short.
+"""
+import json
+import os
+
+def read_json_lines(path):
+    """Read every record of a JSON lines file, cutting off a last line left half written (background thread)"""
+    records = []
+    complete = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            # A write cut short by a crash can only be the last line, it has no newline yet
+            if not line.endswith(b"\n"):
+                break
+            complete += len(line)
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A damaged line is skipped, the complete lines after it still count
+                print(f"Skipping damaged line in {path}")
+
+    # Appends would otherwise be glued onto the fragment and lost with it
+    if complete < os.path.getsize(path):
+        with open(path, 'r+b') as f:
+            f.truncate(complete)
+    return records
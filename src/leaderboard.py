@@ -1,22 +1,165 @@
 """
 Leaderboard module for SpeedRunner X.
-Handles storing and displaying best times.
+Handles storing best times.
 """
-import pygame
+import atexit
+import bisect
 import json
 import os
+import platform
+import time
 from src.settings import *
+from src.io_worker import io_worker
+from src.json_lines import read_json_lines
+from src.quantile_sketch import KLLSketch, sketches_to_dict, sketches_from_dict
+
+class LeaderboardJournal:
+    def __init__(self):
+        # Only used on the I/O worker thread
+        self.file = None
+        self.seq = 0
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+    
+    @staticmethod
+    def parse_snapshot(loaded_data):
+        """Get (seq, attempts, sketches) from a snapshot, including the old plain format"""
+        if 'attempts' in loaded_data:
+            return loaded_data.get('seq', 0), loaded_data['attempts'], loaded_data.get('sketches')
+        
+        # Old format: level -> top times, possibly as dictionaries
+        attempts = {}
+        for level, times in loaded_data.items():
+            attempts[level] = [t['time'] if isinstance(t, dict) else t for t in times]
+        return 0, attempts, None
+    
+    def recover(self):
+        """Load the snapshot and replay the journal on top of it, returning (attempts, sketches, imported sketches)"""
+        seq, attempts, sketch_data = 0, None, None
+        if os.path.exists(LEADERBOARD_PATH):
+            try:
+                with open(LEADERBOARD_PATH, 'r') as f:
+                    seq, attempts, sketch_data = self.parse_snapshot(json.load(f))
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"Error loading leaderboard: {e}")
+        
+        replayed = []
+        if os.path.exists(LEADERBOARD_JOURNAL_PATH):
+            try:
+                for record in read_json_lines(LEADERBOARD_JOURNAL_PATH):
+                    # Records up to the snapshot's seq are already part of it
+                    if record['seq'] > seq:
+                        attempts = attempts if attempts is not None else {}
+                        attempts.setdefault(record['level'], []).append(record['time'])
+                        seq = record['seq']
+                        replayed.append((record['level'], record['time']))
+            except IOError as e:
+                print(f"Error reading leaderboard journal: {e}")
+        
+        self.seq = seq
+        
+        # Snapshots from before sketches existed get them built from every attempt once
+        if sketch_data is None:
+            sketches = {level: KLLSketch.from_values(times) for level, times in (attempts or {}).items()}
+            imported = {}
+        else:
+            sketches = sketches_from_dict(sketch_data['local'])
+            imported = {source: sketches_from_dict(data) for source, data in sketch_data['imported'].items()}
+            for level, time_ms in replayed:
+                sketches.setdefault(level, KLLSketch()).update(time_ms)
+        
+        # Fold a replayed journal into a fresh snapshot right away
+        if replayed or (attempts and sketch_data is None):
+            self.compact(json.dumps(attempts), json.dumps(self.sketch_data(sketches, imported)))
+        return attempts, sketches, imported
+    
+    @staticmethod
+    def sketch_data(sketches, imported):
+        """Get local and imported sketches as JSON-friendly data"""
+        return {'local': sketches_to_dict(sketches),
+                'imported': {source: sketches_to_dict(data) for source, data in imported.items()}}
+    
+    def append(self, level_name, time_ms):
+        """Append one record to the journal, syncing to disk in batches"""
+        try:
+            if self.file is None:
+                os.makedirs(os.path.dirname(LEADERBOARD_JOURNAL_PATH), exist_ok=True)
+                self.file = open(LEADERBOARD_JOURNAL_PATH, 'a')
+            
+            self.seq += 1
+            self.file.write(json.dumps({'seq': self.seq, 'level': level_name, 'time': time_ms}) + "\n")
+            self.file.flush()
+            self.unsynced += 1
+            
+            if (self.unsynced >= LEADERBOARD_FSYNC_BATCH or
+                    time.monotonic() - self.last_sync >= LEADERBOARD_FSYNC_INTERVAL):
+                self.sync()
+        except IOError as e:
+            print(f"Error writing leaderboard journal: {e}")
+    
+    def sync(self):
+        """Force journal records written so far onto the disk"""
+        if self.file is not None and self.unsynced:
+            os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+    
+    def compact(self, attempts_json, sketches_json):
+        """Write a snapshot of every attempt and empty the journal"""
+        temp_path = LEADERBOARD_PATH + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(LEADERBOARD_PATH), exist_ok=True)
+            with open(temp_path, 'w') as f:
+                f.write(f'{{"seq": {self.seq}, "attempts": {attempts_json}, "sketches": {sketches_json}}}')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, LEADERBOARD_PATH)
+            
+            # The journal is only emptied once the snapshot is in place,
+            # a crash in between just replays records the snapshot already has
+            self.close()
+            open(LEADERBOARD_JOURNAL_PATH, 'w').close()
+        except IOError as e:
+            print(f"Error compacting leaderboard: {e}")
+    
+    def close(self):
+        """Sync and close the journal"""
+        try:
+            self.sync()
+        except IOError as e:
+            print(f"Error syncing leaderboard journal: {e}")
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
 
 class Leaderboard:
     def __init__(self):
         self.leaderboard_data = {}
+        
+        # Every attempt per level; leaderboard_data holds the fastest of them
+        self.attempts = {}
+        self.loaded = False
+        
+        # Quantile sketches of every run per level, and of other machines' runs per source
+        self.sketches = {}
+        self.imported_sketches = {}
+        self.merged_sketches = {}
+        
+        # Bumped whenever the shown times change, so cached screens know to rebuild
+        self.version = 0
+        self.journal = LeaderboardJournal()
+        self.appended = 0
         self.load_leaderboard()
+        
+        # Make sure the last journal records reach the disk on exit
+        atexit.register(self.close)
     
     def get_best_time(self, level_name):
         """Get the best time for a level"""
         if level_name in self.leaderboard_data and self.leaderboard_data[level_name]:
-            # Return the fastest time
-            return min(self.leaderboard_data[level_name])
+            # Times are kept sorted, so the fastest is first
+            return self.leaderboard_data[level_name][0]
         return None
     
     def is_new_record(self, level_name, time):
@@ -24,99 +167,137 @@ class Leaderboard:
         best_time = self.get_best_time(level_name)
         return best_time is None or time < best_time
     
-    def load_leaderboard(self):
-        """Load leaderboard data from file"""
-        if os.path.exists(LEADERBOARD_PATH):
-            try:
-                with open(LEADERBOARD_PATH, 'r') as f:
-                    loaded_data = json.load(f)
-                    
-                    # Convert any old format data (dictionaries) to new format (simple times)
-                    self.leaderboard_data = {}
-                    for level, times in loaded_data.items():
-                        self.leaderboard_data[level] = []
-                        for time_entry in times:
-                            if isinstance(time_entry, dict):
-                                # Old format with dictionaries
-                                self.leaderboard_data[level].append(time_entry['time'])
-                            else:
-                                # New format with simple times
-                                self.leaderboard_data[level].append(time_entry)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Error loading leaderboard: {e}")
-                self.leaderboard_data = {}
-        else:
-            # Initialize empty leaderboard
-            self.leaderboard_data = {}
-            for i in range(1, LEVEL_COUNT + 1):
-                self.leaderboard_data[f"level{i}"] = []
-            self.save_leaderboard()
+    def get_times(self, level_name):
+        """Get the recorded times for a level, fastest first"""
+        return self.leaderboard_data.get(level_name, [])
     
-    def save_leaderboard(self):
-        """Save leaderboard data to file"""
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(LEADERBOARD_PATH), exist_ok=True)
-        
+    def get_board_times(self, level_name):
+        """Get the times shown on the leaderboard screen for a level"""
+        return self.get_times(level_name)
+    
+    def is_top_time(self, level_name, time):
+        """Check if a time would make it onto the leaderboard for the level"""
+        times = self.get_times(level_name)
+        return len(times) < LEADERBOARD_SIZE or time < times[-1]
+    
+    def get_sketch(self, level_name):
+        """Get the sketch of every known run of a level, including imported ones"""
+        sketch = self.merged_sketches.get(level_name)
+        if sketch is None:
+            sketch = self.sketches[level_name].copy() if level_name in self.sketches else KLLSketch()
+            for sketches in self.imported_sketches.values():
+                if level_name in sketches:
+                    sketch.merge(sketches[level_name])
+            self.merged_sketches[level_name] = sketch
+        return sketch
+    
+    def get_percentile(self, level_name, time):
+        """Get the percentage of runs slower than a time, or None if there are no other runs"""
+        sketch = self.get_sketch(level_name)
+        if sketch.count < 2:
+            return None
+        return 100 * (1 - sketch.rank(time))
+    
+    def get_median(self, level_name):
+        """Get the median time of every run of a level"""
+        return self.get_sketch(level_name).quantile(0.5)
+    
+    def update_sketch(self, level_name, time):
+        """Add a run to the level's sketch"""
+        self.sketches.setdefault(level_name, KLLSketch()).update(time)
+        self.merged_sketches.pop(level_name, None)
+    
+    def apply_sketches(self, sketches, imported):
+        """Take over loaded sketches, keeping runs added before they finished loading"""
+        for level, sketch in self.sketches.items():
+            sketches.setdefault(level, KLLSketch()).merge(sketch)
+        imported.update(self.imported_sketches)
+        self.sketches = sketches
+        self.imported_sketches = imported
+        self.merged_sketches = {}
+    
+    def export_sketches(self, path, source=None):
+        """Write this machine's sketches so other machines can merge them"""
+        data = {'source': source or platform.node(), 'sketches': sketches_to_dict(self.sketches)}
         try:
-            with open(LEADERBOARD_PATH, 'w') as f:
-                json.dump(self.leaderboard_data, f)
+            with open(path, 'w') as f:
+                json.dump(data, f)
         except IOError as e:
-            print(f"Error saving leaderboard: {e}")
+            print(f"Error exporting sketches: {e}")
     
-    def add_time(self, level_name, time, player_name="Player"):
-        """Add a new time to the leaderboard"""
-        if level_name not in self.leaderboard_data:
-            self.leaderboard_data[level_name] = []
-        
-        # Add new time (ensure it's a simple number, not a dictionary)
-        self.leaderboard_data[level_name].append(time)
-        
-        # Sort by time (ascending)
-        self.leaderboard_data[level_name].sort()
+    def import_sketches(self, path):
+        """Merge sketches exported by another machine, replacing any earlier import from it"""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error importing sketches: {e}")
+            return False
         
-        # Keep only top 5
-        self.leaderboard_data[level_name] = self.leaderboard_data[level_name][:5]
+        # Keyed by source, so importing a newer export from the same machine doesn't count its runs twice
+        self.imported_sketches[data['source']] = sketches_from_dict(data['sketches'])
+        self.merged_sketches = {}
+        self.version += 1
+        if self.loaded:
+            self.save_leaderboard()
+        return True
+    
+    def load_leaderboard(self):
+        """Load leaderboard data from file in the background"""
+        io_worker.submit(self.journal.recover, callback=self.apply_leaderboard)
+    
+    def apply_leaderboard(self, recovered):
+        """Take over recovered leaderboard data (game loop)"""
+        attempts, sketches, imported = recovered
+        self.apply_sketches(sketches, imported)
         
-        # Save updated leaderboard
-        self.save_leaderboard()
-    
-    def render(self, screen):
-        """Render the leaderboard on screen"""
-        font_large = pygame.font.Font(None, 48)
-        font_medium = pygame.font.Font(None, 36)
-        font_small = pygame.font.Font(None, 24)
+        # Keep any time added before the file finished loading
+        for level, times in (attempts or {}).items():
+            self.attempts[level] = times + self.attempts.get(level, [])
+        for i in range(1, LEVEL_COUNT + 1):
+            self.attempts.setdefault(f"level{i}", [])
         
-        # Draw title
-        title = font_large.render("LEADERBOARD", True, WHITE)
-        screen.blit(title, (WIDTH/2 - title.get_width()/2, 50))
+        for level, times in self.attempts.items():
+            self.leaderboard_data[level] = sorted(times)[:LEADERBOARD_SIZE]
+        self.loaded = True
+        self.version += 1
+    
+    def save_leaderboard(self):
+        """Write a compacted snapshot of every attempt in the background"""
+        sketch_data = self.journal.sketch_data(self.sketches, self.imported_sketches)
+        io_worker.submit(self.journal.compact, json.dumps(self.attempts), json.dumps(sketch_data))
+        self.appended = 0
+    
+    def add_time(self, level_name, time, player_name="Player", ghost=None):
+        """Add a new time to the leaderboard"""
+        self.attempts.setdefault(level_name, []).append(time)
         
-        y_offset = 120
+        # Keep only the top times on the board
+        bisect.insort(self.leaderboard_data.setdefault(level_name, []), time)
+        del self.leaderboard_data[level_name][LEADERBOARD_SIZE:]
+        self.update_sketch(level_name, time)
+        self.version += 1
         
-        # Draw each level's times
-        for i in range(1, LEVEL_COUNT + 1):
-            level_name = f"level{i}"
-            
-            # Draw level title
-            level_title = font_medium.render(f"Level {i}", True, WHITE)
-            screen.blit(level_title, (WIDTH/2 - level_title.get_width()/2, y_offset))
-            y_offset += 40
-            
-            # Draw times
-            if level_name in self.leaderboard_data and self.leaderboard_data[level_name]:
-                for j, time in enumerate(self.leaderboard_data[level_name]):
-                    # Format time
-                    minutes = time // 60000
-                    seconds = (time % 60000) // 1000
-                    milliseconds = time % 1000
-                    time_str = f"{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
-                    
-                    # Draw time
-                    time_text = font_small.render(f"{j+1}. {time_str}", True, WHITE)
-                    screen.blit(time_text, (WIDTH/2 - time_text.get_width()/2, y_offset))
-                    y_offset += 30
-            else:
-                no_times = font_small.render("No times recorded", True, WHITE)
-                screen.blit(no_times, (WIDTH/2 - no_times.get_width()/2, y_offset))
-                y_offset += 30
-            
-            y_offset += 20
+        # Only one small record is written per run, the full snapshot is rewritten now and then
+        io_worker.submit(self.journal.append, level_name, time)
+        self.appended += 1
+        if self.loaded and self.appended >= LEADERBOARD_COMPACT_INTERVAL:
+            self.save_leaderboard()
+    
+    def close(self):
+        """Flush the journal to disk"""
+        io_worker.submit(self.journal.close)
+
+
+def create_leaderboard(backend=LEADERBOARD_BACKEND):
+    """Create the leaderboard for the configured storage backend"""
+    if backend == "sqlite":
+        # Import here to avoid circular imports
+        from src.leaderboard_db import SQLiteLeaderboard, SQLITE_AVAILABLE
+        if SQLITE_AVAILABLE:
+            return SQLiteLeaderboard()
+        print("sqlite3 not available, using the JSON leaderboard")
+    elif backend == "remote":
+        from src.leaderboard_remote import RemoteLeaderboard
+        return RemoteLeaderboard()
+    return Leaderboard()
@@ -0,0 +1,244 @@
+"""
+Leaderboard database module for SpeedRunner X.
+Stores every run in SQLite and answers leaderboard queries through indexes.
+"""
+import bisect
+import json
+import os
+import time
+from src.settings import *
+from src.leaderboard import Leaderboard, LeaderboardJournal
+from src.io_worker import io_worker
+from src.quantile_sketch import KLLSketch
+
+# Import sqlite3 conditionally, some Python builds leave it out
+try:
+    import sqlite3
+    SQLITE_AVAILABLE = True
+except ImportError:
+    SQLITE_AVAILABLE = False
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    level TEXT NOT NULL,
+    player TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    ghost TEXT  -- ghost library entry id
+);
+CREATE INDEX IF NOT EXISTS runs_level_time ON runs (level, time);
+CREATE INDEX IF NOT EXISTS runs_player_level_time ON runs (player, level, time);
+CREATE INDEX IF NOT EXISTS runs_player_timestamp ON runs (player, timestamp);
+CREATE TABLE IF NOT EXISTS sketches (
+    source TEXT NOT NULL,
+    level TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (source, level)
+);
+"""
+
+# PRAGMA user_version: 1 once the JSON leaderboard has been imported, 2 once sketches were built from the runs
+SCHEMA_VERSION = 2
+
+# Source of this machine's own sketches in the sketches table
+LOCAL_SOURCE = ""
+
+class SQLiteLeaderboard(Leaderboard):
+    def __init__(self, path=LEADERBOARD_DB_PATH):
+        # The database is only touched on the I/O worker, the game loop shows query results cached here
+        self.path = path
+        self.writer = None
+        self.query_results = {}
+        self.query_pending = set()
+
+        # Counts the runs added, cached query results from before the last one are read again
+        self.runs_version = 0
+        super().__init__()
+
+    def connect(self):
+        """Open the database for writing (I/O worker thread)"""
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Only the worker uses it, except for the final close once the worker has stopped
+            self.writer = sqlite3.connect(self.path, check_same_thread=False)
+
+            # WAL lets queries read while another process, like the merge tool, writes
+            self.writer.execute("PRAGMA journal_mode=WAL")
+            self.writer.execute("PRAGMA synchronous=NORMAL")
+            self.writer.executescript(SCHEMA)
+
+            version = self.writer.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                self.import_json()
+            if version < 2:
+                self.build_sketches()
+            if version < SCHEMA_VERSION:
+                self.writer.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                self.writer.commit()
+        return self.writer
+
+    def import_json(self):
+        """Copy the runs of the JSON leaderboard into the database (I/O worker thread)"""
+        attempts = LeaderboardJournal().recover()[0] or {}
+        timestamp = os.path.getmtime(LEADERBOARD_PATH) if os.path.exists(LEADERBOARD_PATH) else time.time()
+        rows = [(level, "Player", run_time, timestamp)
+                for level, times in attempts.items() for run_time in times]
+        self.writer.executemany("INSERT INTO runs (level, player, time, timestamp) VALUES (?, ?, ?, ?)", rows)
+        self.writer.commit()
+        if rows:
+            print(f"Imported {len(rows)} runs from {LEADERBOARD_PATH}")
+
+    def build_sketches(self):
+        """Build the sketches from every stored run (I/O worker thread)"""
+        sketches = {}
+        for level, run_time in self.writer.execute("SELECT level, time FROM runs"):
+            sketches.setdefault(level, KLLSketch()).update(run_time)
+        self.write_sketches(LOCAL_SOURCE, {level: json.dumps(sketch.to_dict()) for level, sketch in sketches.items()})
+
+    def write_sketches(self, source, sketches):
+        """Replace the stored sketches of one source (I/O worker thread)"""
+        try:
+            db = self.connect()
+            db.executemany("INSERT OR REPLACE INTO sketches (source, level, data) VALUES (?, ?, ?)",
+                           [(source, level, data) for level, data in sketches.items()])
+            db.commit()
+        except sqlite3.Error as e:
+            print(f"Error saving sketches: {e}")
+
+    def load_leaderboard(self):
+        """Load the top times of every level in the background"""
+        io_worker.submit(self.read_top_times, callback=self.apply_leaderboard)
+
+    def read_top_times(self):
+        """Read the top times of every level (I/O worker thread)"""
+        try:
+            db = self.connect()
+            top_times = {}
+            for i in range(1, LEVEL_COUNT + 1):
+                rows = db.execute("SELECT time FROM runs WHERE level = ? ORDER BY time LIMIT ?",
+                                  (f"level{i}", LEADERBOARD_SIZE))
+                top_times[f"level{i}"] = [row[0] for row in rows]
+
+            sketches, imported = {}, {}
+            for source, level, data in db.execute("SELECT source, level, data FROM sketches"):
+                target = sketches if source == LOCAL_SOURCE else imported.setdefault(source, {})
+                target[level] = KLLSketch.from_dict(json.loads(data))
+            return top_times, sketches, imported
+        except sqlite3.Error as e:
+            print(f"Error loading leaderboard database: {e}")
+            return {}, {}, {}
+
+    def apply_leaderboard(self, loaded):
+        """Take over the loaded top times and sketches (game loop)"""
+        top_times, sketches, imported = loaded
+
+        # Runs added before loading finished stored sketches without the older runs, so store the merged ones
+        added_early = bool(self.sketches)
+        self.apply_sketches(sketches, imported)
+        if added_early:
+            self.save_leaderboard()
+
+        # Keep any time added before the database finished loading
+        for level, times in top_times.items():
+            merged = sorted(times + self.leaderboard_data.get(level, []))
+            self.leaderboard_data[level] = merged[:LEADERBOARD_SIZE]
+        self.loaded = True
+        self.runs_version += 1
+        self.version += 1
+
+    def save_leaderboard(self):
+        """Write every sketch, the runs themselves are committed as they are added"""
+        io_worker.submit(self.write_sketches, LOCAL_SOURCE,
+                         {level: json.dumps(sketch.to_dict()) for level, sketch in self.sketches.items()})
+        for source, sketches in self.imported_sketches.items():
+            io_worker.submit(self.write_sketches, source,
+                             {level: json.dumps(sketch.to_dict()) for level, sketch in sketches.items()})
+
+    def add_time(self, level_name, time, player_name="Player", ghost=None):
+        """Add a new run to the leaderboard"""
+        # The board shown in game is kept in memory, the database gets the full run
+        bisect.insort(self.leaderboard_data.setdefault(level_name, []), time)
+        del self.leaderboard_data[level_name][LEADERBOARD_SIZE:]
+        self.update_sketch(level_name, time)
+        self.runs_version += 1
+        self.version += 1
+        sketch_json = json.dumps(self.sketches[level_name].to_dict())
+        io_worker.submit(self.insert_run, level_name, player_name, time, ghost, sketch_json)
+
+    def insert_run(self, level_name, player_name, run_time, ghost, sketch_json):
+        """Insert one run and the level's updated sketch (I/O worker thread)"""
+        try:
+            db = self.connect()
+            db.execute("INSERT INTO runs (level, player, time, timestamp, ghost) VALUES (?, ?, ?, ?, ?)",
+                       (level_name, player_name, run_time, time.time(), ghost))
+            db.execute("INSERT OR REPLACE INTO sketches (source, level, data) VALUES (?, ?, ?)",
+                       (LOCAL_SOURCE, level_name, sketch_json))
+            db.commit()
+        except sqlite3.Error as e:
+            print(f"Error saving run: {e}")
+
+    def close(self):
+        """Close the database connection"""
+        io_worker.submit(self.close_writer)
+
+    def close_writer(self):
+        """Close the connection (I/O worker thread)"""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def read_rows(self, sql, params):
+        """Run a read-only query (I/O worker thread)"""
+        # Queued behind the worker's writes, so every run added before the query is committed
+        try:
+            return self.connect().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error querying leaderboard database: {e}")
+            return []
+
+    def query(self, sql, params):
+        """Get the cached rows of a query, reading them again in the background once runs were added"""
+        key = (sql, params)
+        cached = self.query_results.get(key)
+        if (cached is None or cached[0] != self.runs_version) and key not in self.query_pending:
+            self.query_pending.add(key)
+            runs_version = self.runs_version
+            io_worker.submit(self.read_rows, sql, params,
+                             callback=lambda rows: self.apply_query(key, runs_version, rows))
+        return cached[1] if cached else []
+
+    def apply_query(self, key, runs_version, rows):
+        """Cache the rows of a finished query (game loop)"""
+        self.query_pending.discard(key)
+        cached = self.query_results.get(key)
+        self.query_results[key] = (runs_version, rows)
+
+        # Screens showing the old rows rebuild when the version changes
+        if cached is None or cached[1] != rows:
+            self.version += 1
+
+    def get_top_runs(self, level_name, count=LEADERBOARD_SIZE):
+        """Get the fastest runs of a level as (player, time, timestamp, ghost)"""
+        return self.query("SELECT player, time, timestamp, ghost FROM runs "
+                          "WHERE level = ? ORDER BY time LIMIT ?", (level_name, count))
+
+    def get_personal_best(self, level_name, player_name):
+        """Get a player's best time on a level, None until it has been read"""
+        rows = self.query("SELECT MIN(time) FROM runs WHERE player = ? AND level = ?",
+                          (player_name, level_name))
+        return rows[0][0] if rows else None
+
+    def get_rank(self, level_name, time):
+        """Get the position a time would take on a level's full leaderboard, None until it has been read"""
+        # Counts along the (level, time) index, so the cost grows with the rank
+        rows = self.query("SELECT COUNT(*) FROM runs WHERE level = ? AND time < ?", (level_name, time))
+        return rows[0][0] + 1 if rows else None
+
+    def get_player_history(self, player_name, level_name=None, count=50):
+        """Get a player's most recent runs as (level, time, timestamp)"""
+        if level_name is None:
+            return self.query("SELECT level, time, timestamp FROM runs WHERE player = ? "
+                              "ORDER BY timestamp DESC LIMIT ?", (player_name, count))
+        return self.query("SELECT level, time, timestamp FROM runs WHERE player = ? AND level = ? "
+                          "ORDER BY timestamp DESC LIMIT ?", (player_name, level_name, count))
@@ -0,0 +1,266 @@
+"""
+Leaderboard merge module for SpeedRunner X.
+Streams the runs of many leaderboard files in time order and merges them into one board.
+"""
+import collections
+import heapq
+import itertools
+import json
+import os
+import re
+from src.settings import *
+
+# Import sqlite3 conditionally, some Python builds leave it out
+try:
+    import sqlite3
+    SQLITE_AVAILABLE = True
+except ImportError:
+    SQLITE_AVAILABLE = False
+
+WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+class JSONStream:
+    def __init__(self, f, chunk_size=65536):
+        # Decodes values from a buffer refilled in chunks, so a file is never held whole
+        self.file = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.at_end = False
+
+        # Counts the chunks read, a batch that failed to decode isn't tried again on the same buffer
+        self.chunks = 0
+
+    def fill(self):
+        """Read the next chunk into the buffer, dropping what was already decoded"""
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.at_end = True
+        self.chunks += 1
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def peek(self):
+        """Get the next character that isn't whitespace, empty at the end of the file"""
+        while True:
+            self.position = WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or self.at_end:
+                return self.buffer[self.position:self.position + 1]
+            self.fill()
+
+    def expect(self, characters):
+        """Consume the next character, which has to be one of characters"""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"expected {characters!r} at {character!r}")
+        self.position += 1
+        return character
+
+    def value(self):
+        """Decode the next complete value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number at the end of the buffer might go on in the next chunk
+                if end < len(self.buffer) or self.at_end:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.at_end:
+                    raise
+            self.fill()
+
+    def keys(self):
+        """Walk an object, the caller reads each key's value before asking for the next key"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+    def elements(self):
+        """Walk an array, yielding each element"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        failed_chunk = None
+        while True:
+            # Decode every element before the buffer's last comma in one go, stopping at the array's end.
+            # The text only decodes as a list if the comma is between two elements of this array
+            end = self.buffer.find("]", self.position)
+            cut = self.buffer.rfind(",", self.position, end if end >= 0 else len(self.buffer))
+            if cut > self.position and failed_chunk != self.chunks:
+                try:
+                    batch = json.loads("[" + self.buffer[self.position:cut] + "]")
+                except json.JSONDecodeError:
+                    # A "]" inside a string, try again after the next chunk
+                    failed_chunk = self.chunks
+                else:
+                    self.position = cut + 1
+                    yield from batch
+                    self.peek()
+                    continue
+
+            # One element at a time, at the array's end and across chunks
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+
+def read_level_runs(stream, level):
+    """Yield (level, time, player, id) from a level's list of times, plain or as dictionaries"""
+    for run in stream.elements():
+        if isinstance(run, dict):
+            yield level, run['time'], run.get('player', "Player"), run.get('id', "")
+        else:
+            yield level, run, "Player", ""
+
+
+def read_json_runs(path):
+    """Yield (level, time, player, id) from a leaderboard snapshot, an old plain leaderboard or a server data file"""
+    with open(path, 'r') as f:
+        stream = JSONStream(f)
+
+        # The leaderboard server stores a flat list of runs
+        if stream.peek() == "[":
+            for run in stream.elements():
+                yield run['level'], run['time'], run.get('player', "Player"), run.get('id', "")
+            return
+
+        # Old plain leaderboards map levels to times, snapshots keep that map under attempts next to other data
+        for key in stream.keys():
+            if key == 'attempts' and stream.peek() == "{":
+                for level in stream.keys():
+                    yield from read_level_runs(stream, level)
+            elif stream.peek() == "[":
+                yield from read_level_runs(stream, key)
+            else:
+                stream.value()
+
+
+def read_journal_runs(path):
+    """Yield (level, time, player, id) from a leaderboard journal or a remote leaderboard's outbox"""
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A write cut short by a crash can only be the last line
+                break
+            yield record['level'], record['time'], record.get('player', "Player"), record.get('id', "")
+
+
+def read_db_runs(path, keep):
+    """Yield (level, time, player, id) from a leaderboard database by level and time, at most keep per level"""
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        levels = [row[0] for row in db.execute("SELECT DISTINCT level FROM runs ORDER BY level")]
+        for level in levels:
+            # The (level, time) index hands the runs over already sorted.
+            # Row ids are only unique within one database, so its runs don't carry one
+            rows = db.execute("SELECT time, player FROM runs WHERE level = ? ORDER BY time, player LIMIT ?",
+                              (level, keep or -1))
+            for run_time, player in rows:
+                yield level, run_time, player, ""
+    finally:
+        db.close()
+
+
+def top_runs(runs, keep):
+    """Sort runs by level and time, holding only the fastest keep of each level while reading"""
+    if not keep:
+        return sorted(runs)
+
+    # One max-heap per level, its root is the slowest run kept so far
+    heaps = {}
+    for index, (level, run_time, player, run_id) in enumerate(runs):
+        heap = heaps.setdefault(level, [])
+        if len(heap) < keep:
+            heapq.heappush(heap, (-run_time, index, player, run_id))
+        elif run_time < -heap[0][0]:
+            heapq.heapreplace(heap, (-run_time, index, player, run_id))
+    return sorted((level, -negative_time, player, run_id) for level, heap in heaps.items()
+                  for negative_time, index, player, run_id in heap)
+
+
+def open_runs(path, keep):
+    """Get the runs of one leaderboard file sorted by level and time, at most keep per level"""
+    extension = os.path.splitext(path)[1]
+    if extension in (".db", ".sqlite"):
+        if not SQLITE_AVAILABLE:
+            raise ValueError("sqlite3 is not available")
+        return read_db_runs(path, keep)
+    if extension in (".journal", ".jsonl"):
+        return iter(top_runs(read_journal_runs(path), keep))
+    return iter(top_runs(read_json_runs(path), keep))
+
+
+def tag_runs(runs, source):
+    """Add the index of the input they came from to runs"""
+    for level, run_time, player, run_id in runs:
+        yield level, run_time, player, run_id, source
+
+
+def merge_runs(sources, keep, stats=None, loose=False):
+    """K-way merge sorted run streams into one, dropping runs that several inputs share"""
+    # The same run can come in through more than one file, e.g. a server's data file and a cabinet's outbox.
+    # Runs with an id are kept once per id. Runs without one are all kept, unless loose is set:
+    # then equal runs are kept as often as the one input with the most of them has them,
+    # so repeats within a file stay and copies across files, like a board and its backup, don't add up
+    merged = heapq.merge(*[tag_runs(runs, source) for source, runs in enumerate(sources)])
+    kept_level, kept = None, 0
+    for (level, run_time, player), group in itertools.groupby(merged, key=lambda run: run[:3]):
+        if level != kept_level:
+            kept_level, kept = level, 0
+        if keep and kept >= keep:
+            continue
+
+        run_ids = set()
+        anonymous = collections.Counter()
+        total = 0
+        for run in group:
+            if run[3]:
+                run_ids.add(run[3])
+            else:
+                anonymous[run[4]] += 1
+            total += 1
+        if loose:
+            copies = max(len(run_ids), max(anonymous.values(), default=0))
+        else:
+            copies = len(run_ids) + sum(anonymous.values())
+        if stats is not None:
+            stats['duplicates'] = stats.get('duplicates', 0) + total - copies
+        for _ in range(copies if not keep else min(copies, keep - kept)):
+            yield level, run_time, player
+            kept += 1
+
+
+def write_merged(runs, path, players=False):
+    """Write merged runs as a plain leaderboard file, one level at a time"""
+    temp_path = path + ".tmp"
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    levels = 0
+    with open(temp_path, 'w') as f:
+        f.write("{")
+        for level, level_runs in itertools.groupby(runs, key=lambda run: run[0]):
+            if players:
+                times = [{'time': run_time, 'player': player} for _, run_time, player in level_runs]
+            else:
+                times = [run_time for _, run_time, _ in level_runs]
+            f.write(f"{', ' if levels else ''}{json.dumps(level)}: {json.dumps(times)}")
+            levels += 1
+        f.write("}")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return levels
@@ -0,0 +1,248 @@
+"""
+Remote leaderboard module for SpeedRunner X.
+Shares runs with a leaderboard server and keeps working while it is unreachable.
+"""
+import http.client
+import json
+import os
+import queue
+import threading
+import uuid
+from time import monotonic, time as current_time
+from urllib.parse import urlsplit, quote
+from src.settings import *
+from src.leaderboard import Leaderboard
+from src.io_worker import io_worker
+from src.json_lines import read_json_lines
+
+class HTTPConnectionPool:
+    def __init__(self, url, size=2, timeout=LEADERBOARD_REMOTE_TIMEOUT):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+        self.idle = []
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request over a kept-alive connection, returning (status, headers, body)"""
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+
+        # A kept-alive connection may have been closed by the server, so retry once on a fresh one
+        for attempt in range(2):
+            reused = bool(self.idle)
+            connection = self.idle.pop() if reused else self.connection_class(self.host, self.port, timeout=self.timeout)
+            try:
+                connection.request(method, self.base_path + path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+
+            if response.will_close or len(self.idle) >= self.size:
+                connection.close()
+            else:
+                self.idle.append(connection)
+            return response.status, dict(response.getheaders()), data
+
+    def close(self):
+        """Close every idle connection"""
+        for connection in self.idle:
+            connection.close()
+        self.idle = []
+
+
+class RemoteLeaderboard(Leaderboard):
+    def __init__(self, url=LEADERBOARD_REMOTE_URL):
+        # Runs are still kept locally, the server adds the shared board on top
+        super().__init__()
+        self.pool = HTTPConnectionPool(url)
+
+        # Game loop view: cached remote top runs per level and runs the server hasn't accepted yet
+        self.remote_runs = {}
+        self.unsent = {}
+
+        # Everything network related happens on the sync thread
+        self.commands = queue.Queue()
+        self.thread = threading.Thread(target=self.run_sync, name="leaderboard-sync", daemon=True)
+        self.thread.start()
+
+    def add_time(self, level_name, time, player_name="Player", ghost=None):
+        """Add a new time locally and queue it for the server"""
+        super().add_time(level_name, time, player_name, ghost)
+
+        # The id lets the server ignore a batch that is sent again after a lost response
+        run = {'id': uuid.uuid4().hex, 'level': level_name, 'player': player_name,
+               'time': time, 'timestamp': current_time()}
+        self.unsent[run['id']] = run
+        self.commands.put(('submit', run))
+
+    def get_board_times(self, level_name):
+        """Get the shared top times, including runs still waiting to be sent"""
+        if level_name not in self.remote_runs:
+            return self.get_times(level_name)
+
+        known = {run['id'] for run in self.remote_runs[level_name]}
+        times = [run['time'] for run in self.remote_runs[level_name]]
+        times += [run['time'] for run in self.unsent.values()
+                  if run['level'] == level_name and run['id'] not in known]
+        return sorted(times)[:LEADERBOARD_SIZE]
+
+    def close(self):
+        """Flush the local journal and stop the sync thread"""
+        super().close()
+        self.commands.put(('stop', None))
+        
+        # Give the thread the chance to persist runs it hasn't picked up yet
+        self.thread.join(LEADERBOARD_REMOTE_TIMEOUT)
+
+    # Callbacks from the sync thread (game loop)
+
+    def apply_remote_runs(self, result):
+        """Take over freshly fetched top runs of a level"""
+        level_name, runs = result
+        self.remote_runs[level_name] = runs
+        self.version += 1
+
+    def apply_unsent(self, runs):
+        """Show runs left in the offline queue by an earlier session"""
+        for run in runs:
+            self.unsent.setdefault(run['id'], run)
+        self.version += 1
+
+    def apply_sent(self, run_ids):
+        """Forget runs the server has accepted"""
+        for run_id in run_ids:
+            self.unsent.pop(run_id, None)
+        self.version += 1
+
+    # Sync thread
+
+    def run_sync(self):
+        """Send queued runs in batches and keep the top times fresh"""
+        outbox = self.read_outbox()
+        if outbox:
+            io_worker.post(self.apply_unsent, list(outbox))
+
+        # Per level: (etag, time fetched)
+        cache = {}
+        retry_at = 0
+
+        while True:
+            now = monotonic()
+            if now >= retry_at:
+                try:
+                    # Levels that got new runs are refetched right away
+                    while outbox:
+                        for level_name in self.send_batch(outbox):
+                            cache.pop(level_name, None)
+                    
+                    for i in range(1, LEVEL_COUNT + 1):
+                        level_name = f"level{i}"
+                        etag, fetched = cache.get(level_name, (None, None))
+                        if fetched is None or monotonic() - fetched >= LEADERBOARD_REMOTE_TTL:
+                            cache[level_name] = self.fetch_top(level_name, etag)
+                except (OSError, http.client.HTTPException, ValueError) as e:
+                    # Offline: keep everything queued and try again later
+                    print(f"Leaderboard server unavailable: {e}")
+                    self.pool.close()
+                    retry_at = now + LEADERBOARD_REMOTE_RETRY
+
+            # Sleep until new runs arrive or the next refresh or retry is due
+            wake_at = min([fetched + LEADERBOARD_REMOTE_TTL for etag, fetched in cache.values()] or [now])
+            if retry_at > now:
+                wake_at = max(wake_at, retry_at)
+            try:
+                command, run = self.commands.get(timeout=max(wake_at - monotonic(), 0.05))
+            except queue.Empty:
+                continue
+
+            # Collect every run submitted meanwhile so they go out as one batch
+            new_runs = []
+            while True:
+                if command == 'stop':
+                    self.append_outbox(new_runs)
+                    self.pool.close()
+                    return
+                new_runs.append(run)
+                try:
+                    command, run = self.commands.get_nowait()
+                except queue.Empty:
+                    break
+            self.append_outbox(new_runs)
+            outbox.extend(new_runs)
+
+    def send_batch(self, outbox):
+        """Send the oldest queued runs, drop them from the outbox once accepted and return their levels"""
+        batch = outbox[:LEADERBOARD_REMOTE_BATCH]
+        status, headers, data = self.pool.request("POST", "/runs", batch)
+        if status >= 300:
+            raise ValueError(f"server answered {status}")
+
+        del outbox[:len(batch)]
+        self.write_outbox(outbox)
+        io_worker.post(self.apply_sent, [run['id'] for run in batch])
+
+        # New runs can change these levels' top times
+        return {run['level'] for run in batch}
+
+    def fetch_top(self, level_name, etag):
+        """Revalidate a level's cached top runs, returning (etag, time fetched)"""
+        headers = {"If-None-Match": etag} if etag else {}
+        status, response_headers, data = self.pool.request(
+            "GET", f"/leaderboard/{quote(level_name)}?limit={LEADERBOARD_SIZE}", headers=headers)
+
+        if status == 304:
+            return etag, monotonic()
+        if status != 200:
+            raise ValueError(f"server answered {status}")
+
+        runs = json.loads(data)['runs']
+        io_worker.post(self.apply_remote_runs, (level_name, runs))
+        return response_headers.get("ETag"), monotonic()
+
+    @staticmethod
+    def read_outbox():
+        """Read runs queued by earlier sessions, cutting off a run a crash left half written"""
+        if os.path.exists(LEADERBOARD_OUTBOX_PATH):
+            try:
+                return read_json_lines(LEADERBOARD_OUTBOX_PATH)
+            except IOError as e:
+                print(f"Error reading leaderboard outbox: {e}")
+        return []
+
+    @staticmethod
+    def append_outbox(runs):
+        """Persist new runs before trying to send them"""
+        if not runs:
+            return
+        try:
+            os.makedirs(os.path.dirname(LEADERBOARD_OUTBOX_PATH), exist_ok=True)
+            with open(LEADERBOARD_OUTBOX_PATH, 'a') as f:
+                for run in runs:
+                    f.write(json.dumps(run) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except IOError as e:
+            print(f"Error writing leaderboard outbox: {e}")
+
+    @staticmethod
+    def write_outbox(runs):
+        """Replace the outbox with the runs still waiting to be sent"""
+        temp_path = LEADERBOARD_OUTBOX_PATH + ".tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                for run in runs:
+                    f.write(json.dumps(run) + "\n")
+            os.replace(temp_path, LEADERBOARD_OUTBOX_PATH)
+        except IOError as e:
+            print(f"Error writing leaderboard outbox: {e}")
+
@@ -0,0 +1,178 @@
+"""
+Leaderboard screen module for SpeedRunner X.
+Draws the leaderboard as a cached, scrollable list that only lays out visible rows.
+"""
+import pygame
+import re
+from bisect import bisect_right
+from src.settings import *
+
+# Height of each kind of row in the list
+ROW_HEIGHTS = {'section': 50, 'level': 40, 'entry': 30, 'gap': 20}
+
+class LeaderboardScreen:
+    def __init__(self, leaderboard):
+        self.leaderboard = leaderboard
+
+        # Fonts are created once instead of on every frame
+        self.font_large = pygame.font.Font(None, 48)
+        self.font_medium = pygame.font.Font(None, 36)
+        self.font_small = pygame.font.Font(None, 24)
+
+        # The list scrolls between the title and the instructions
+        self.list_rect = pygame.Rect(0, 110, WIDTH, HEIGHT - 190)
+
+        # Row model: (kind, text) plus the y offset where each row starts
+        self.rows = []
+        self.row_tops = []
+        self.content_height = 0
+        self.scroll = 0
+
+        # Rebuilt only when the leaderboard's data version changes
+        self.version = None
+        self.surface = None
+        self.text_cache = {}
+        self.dirty = True
+
+    @staticmethod
+    def format_time(milliseconds):
+        """Format time in milliseconds to MM:SS.mmm"""
+        milliseconds = int(milliseconds)
+        return f"{milliseconds // 60000:02d}:{(milliseconds % 60000) // 1000:02d}.{milliseconds % 1000:03d}"
+
+    @staticmethod
+    def level_title(level_name):
+        """Turn a level name like level12 into Level 12"""
+        match = re.fullmatch(r"level(\d+)", level_name)
+        return f"Level {match.group(1)}" if match else level_name
+
+    def level_names(self):
+        """Get every level with a board, in level order"""
+        names = {f"level{i}" for i in range(1, LEVEL_COUNT + 1)} | set(self.leaderboard.leaderboard_data)
+
+        def level_key(name):
+            match = re.fullmatch(r"level(\d+)", name)
+            return (0, int(match.group(1)), "") if match else (1, 0, name)
+        return sorted(names, key=level_key)
+
+    def build_rows(self):
+        """Lay out the row model, without rendering any text"""
+        rows = []
+        for level_name in self.level_names():
+            rows.append(('level', self.level_title(level_name)))
+            board_times = self.leaderboard.get_board_times(level_name)
+            if board_times:
+                for j, time in enumerate(board_times):
+                    rows.append(('entry', f"{j+1}. {self.format_time(time)}"))
+            else:
+                rows.append(('entry', "No times recorded"))
+            rows.append(('gap', ""))
+
+        # Stores that keep every run can also list the player's recent runs, empty until read in the background
+        if hasattr(self.leaderboard, 'get_player_history'):
+            history = self.leaderboard.get_player_history("Player", count=LEADERBOARD_HISTORY_ROWS)
+            if history:
+                rows.append(('section', "Recent Runs"))
+                for level_name, time, timestamp in history:
+                    rows.append(('entry', f"{self.level_title(level_name)}   {self.format_time(time)}"))
+
+        self.rows = rows
+        self.row_tops = []
+        top = 0
+        for kind, text in rows:
+            self.row_tops.append(top)
+            top += ROW_HEIGHTS[kind]
+        self.content_height = top
+        self.text_cache = {}
+        self.version = self.leaderboard.version
+        self.scroll_to(self.scroll)
+        self.dirty = True
+
+    def max_scroll(self):
+        """Get the furthest the list can scroll"""
+        return max(0, self.content_height - self.list_rect.height)
+
+    def scroll_to(self, scroll):
+        """Scroll the list, marking the screen for a redraw if it moved"""
+        scroll = max(0, min(self.max_scroll(), scroll))
+        if scroll != self.scroll:
+            self.scroll = scroll
+            self.dirty = True
+
+    def handle_event(self, event):
+        """Scroll with the arrow keys, page keys and mouse wheel"""
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_UP:
+                self.scroll_to(self.scroll - ROW_HEIGHTS['entry'])
+            elif event.key == pygame.K_DOWN:
+                self.scroll_to(self.scroll + ROW_HEIGHTS['entry'])
+            elif event.key == pygame.K_PAGEUP:
+                self.scroll_to(self.scroll - self.list_rect.height)
+            elif event.key == pygame.K_PAGEDOWN:
+                self.scroll_to(self.scroll + self.list_rect.height)
+            elif event.key == pygame.K_HOME:
+                self.scroll_to(0)
+            elif event.key == pygame.K_END:
+                self.scroll_to(self.max_scroll())
+        elif event.type == pygame.MOUSEWHEEL:
+            self.scroll_to(self.scroll - event.y * ROW_HEIGHTS['entry'] * 3)
+
+    def row_text(self, index):
+        """Render a row's text, reusing it while the row stays on screen"""
+        text = self.text_cache.get(index)
+        if text is None:
+            kind, label = self.rows[index]
+            font = self.font_small if kind == 'entry' else self.font_medium
+            text = font.render(label, True, WHITE)
+
+            # Only rows near the viewport are worth keeping
+            if len(self.text_cache) > 256:
+                self.text_cache = {}
+            self.text_cache[index] = text
+        return text
+
+    def redraw(self):
+        """Render the screen into the cached surface"""
+        if self.surface is None:
+            self.surface = pygame.Surface((WIDTH, HEIGHT))
+        self.surface.fill(BLACK)
+
+        title = self.font_large.render("LEADERBOARD", True, WHITE)
+        self.surface.blit(title, (WIDTH/2 - title.get_width()/2, 50))
+        back_text = self.font_medium.render("Press ESC to return to menu", True, WHITE)
+        self.surface.blit(back_text, (WIDTH/2 - back_text.get_width()/2, HEIGHT - 50))
+
+        # Only the rows inside the viewport are drawn
+        self.surface.set_clip(self.list_rect)
+        first = max(bisect_right(self.row_tops, self.scroll) - 1, 0)
+        bottom = self.scroll + self.list_rect.height
+        for index in range(first, len(self.rows)):
+            top = self.row_tops[index]
+            if top >= bottom:
+                break
+            if self.rows[index][0] != 'gap':
+                text = self.row_text(index)
+                self.surface.blit(text, (WIDTH/2 - text.get_width()/2, self.list_rect.top + top - self.scroll))
+        self.surface.set_clip(None)
+
+        # Scrollbar when the list doesn't fit
+        if self.content_height > self.list_rect.height:
+            track = pygame.Rect(WIDTH - 40, self.list_rect.top, 6, self.list_rect.height)
+            thumb_height = max(20, track.height * self.list_rect.height // self.content_height)
+            thumb_top = track.top + (track.height - thumb_height) * self.scroll // self.max_scroll()
+            pygame.draw.rect(self.surface, (60, 60, 60), track)
+            pygame.draw.rect(self.surface, WHITE, (track.left, thumb_top, track.width, thumb_height))
+
+        self.dirty = False
+
+    def draw(self, screen, force=False):
+        """Blit the cached screen, returning True if it changed since the last draw"""
+        if self.version != self.leaderboard.version:
+            self.build_rows()
+
+        changed = self.dirty
+        if self.dirty or self.surface is None:
+            self.redraw()
+        if changed or force:
+            screen.blit(self.surface, (0, 0))
+        return changed
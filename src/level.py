@@ -5,20 +5,19 @@ Handles level loading, rendering, and management.
 import pygame
 import os
 import math
+import weakref
+import xml.etree.ElementTree as ET
 from src.settings import *
 from src.player import Player
 from src.enemy import Enemy
 from src.tiles import Tile, Hazard, MovingPlatform, FinishFlag
 from src.powerups import PowerUp
-from src.ghost import Ghost
-
-# Import pytmx conditionally to handle potential import errors
-try:
-    import pytmx
-    PYTMX_AVAILABLE = True
-except ImportError:
-    PYTMX_AVAILABLE = False
-    print("Warning: pytmx module not found. Using fallback level creation.")
+from src.heatmap import HeatmapOverlay
+from src.analytics import run_analytics, POWERUP_EVENTS, EVENT_CHECKPOINT, EVENT_DEATH_ENEMY, EVENT_DEATH_HAZARD, EVENT_RESPAWN, EVENT_ENEMY_DEFEATED, EVENT_ABANDON
+from src.ghost import GhostRace
+from src.recorder import PositionRecorder
+from src.world_renderer import TerrainCache, ScrollingWorldRenderer
+from src.tmx_map import load_tmx_map, TILE_SOLID, TILE_HAZARD
 
 class Checkpoint(pygame.sprite.Sprite):
     def __init__(self, pos, size, groups):
@@ -73,6 +72,9 @@ class Checkpoint(pygame.sprite.Sprite):
         self.activated = True
         # Change color to indicate activation
         if self.activated:
+            # Work on a copy so caches keyed by image (e.g. scaled images) pick up the change
+            self.image = self.image.copy()
+            
             # Redraw the flag in gold color
             size = self.rect.width
             FLAG_COLOR = (255, 215, 0)  # Gold
@@ -97,11 +99,21 @@ class Checkpoint(pygame.sprite.Sprite):
             self.image.blit(glow_surf, (-size//2, 0))
 
 class Level:
-    def __init__(self, level_name, surface):
+    def __init__(self, level_name, surface, render_backend=None, ghost_library=None):
         # Setup
         self.display_surface = surface
         self.level_name = level_name
         
+        # Hardware render backend - when set the level draws through textures instead of surface
+        self.render_backend = render_backend
+        self.sky_layers = None
+        self.cloud_images = {}
+        
+        # Sky gradients by surface size for the software renderer
+        self.sky_gradients = {}
+        if render_backend:
+            render_backend.clear_textures()
+        
         # Level status
         self.active = False
         self.completed = False
@@ -115,28 +127,55 @@ class Level:
         self.finish_sprites = pygame.sprite.Group()
         self.checkpoint_sprites = pygame.sprite.Group()
         
-        # Player and ghost
+        # Drawing order: static terrain, then moving sprites with the player on top
+        self.terrain_sprites = pygame.sprite.Group()
+        self.dynamic_sprites = pygame.sprite.LayeredUpdates()
+        
+        # Player and ghosts of the fastest runs
         self.player = None
-        self.ghost = Ghost([self.all_sprites])
-        self.ghost.load_ghost_data(level_name)
+        self.ghosts = GhostRace([self.all_sprites, self.dynamic_sprites], level_name, ghost_library)
         
         # Camera
         self.camera_offset = pygame.math.Vector2(0, 0)
         
-        # UI reference for powerup notifications
+        # UI reference for powerup notifications, and the split timer
         self.ui = None
+        self.splits = None
         
-        # Checkpoint system
+        # Checkpoint system, and where the player starts and respawns without one
         self.current_checkpoint = None
         self.checkpoint_positions = []
+        self.start_position = (100, HEIGHT - 200)
+        
+        # Run time of the current frame, used to time analytics events
+        self.elapsed_time = 0
+        
+        # Optional reduced-resolution framebuffer for the world layer
+        self.render_scale = 1 if render_backend else RENDER_SCALE
+        self.world_surface = None
+        self.scaled_images = weakref.WeakKeyDictionary()
+        if self.render_scale != 1:
+            width, height = self.display_surface.get_size()
+            self.world_surface = pygame.Surface((int(width * self.render_scale), int(height * self.render_scale)))
+        
+        # Debug heatmap overlay, loaded the first time it is shown
+        self.show_heatmap = HEATMAP_OVERLAY
+        self.heatmap = None
+        
+        # Optional scroll-reuse renderer for the static terrain, or the terrain index of the hardware renderer
+        self.world_renderer = None
+        self.terrain_cache = None
         
         # Load the level
         self.load_level()
+        self.build_world_renderer()
     
     def load_level(self):
         """Load level from TMX file or create a simple test level"""
-        # Skip TMX loading for now and just create a test level
-        # This avoids the image format error
+        tmx_path = os.path.join(MAPS_PATH, f"{self.level_name}.tmx")
+        if TMX_LEVELS and os.path.exists(tmx_path) and self.load_tmx_level(tmx_path):
+            return
+        
         if self.level_name == "level1":
             self.create_test_level()
         elif self.level_name == "level2":
@@ -145,56 +184,66 @@ class Level:
             self.create_test_level()  # Default to level 1
     
     def load_tmx_level(self, tmx_path):
-        """Load level from TMX file using PyTMX"""
-        if not PYTMX_AVAILABLE:
-            print("PyTMX not available, using test level instead")
-            self.create_test_level()
-            return
+        """Build the level from a TMX file, drawing its tiles procedurally, returns False if it can't be read"""
+        try:
+            tmx_map = load_tmx_map(tmx_path)
+        except (OSError, ValueError, ET.ParseError) as e:
+            print(f"Error loading map {tmx_path}: {e}")
+            return False
+        
+        tile_width, tile_height = tmx_map.tile_width, tmx_map.tile_height
+        level_width, level_height = tmx_map.width * tile_width, tmx_map.height * tile_height
+        
+        # Invisible boundary below the map, like the built-in levels have
+        for x in range(-tile_width * 10, level_width + tile_width * 10, tile_width):
+            boundary = Tile((x, level_height), tile_width, [self.collision_sprites], 'invisible')
+            boundary.rect.height = tile_height * 10
+        
+        # Solid tiles with open space above are drawn as grass, the rest as dirt
+        solid = {(column, row) for column, row, kind in tmx_map.tiles if kind == TILE_SOLID}
+        for column, row, kind in tmx_map.tiles:
+            pos = (column * tile_width, row * tile_height)
+            if kind == TILE_SOLID:
+                tile_type = 'dirt' if (column, row - 1) in solid else 'grass'
+                Tile(pos, tile_width, [self.all_sprites, self.collision_sprites], tile_type)
+            elif kind == TILE_HAZARD:
+                Hazard(pos, tile_width, [self.all_sprites, self.hazard_sprites], 'spike')
+        
+        for obj in tmx_map.objects:
+            pos = (int(obj['x']), int(obj['y']))
+            properties = obj['properties']
             
-        tmx_data = pytmx.load_pygame(tmx_path)
-        
-        # Process tile layers
-        for layer in tmx_data.visible_layers:
-            if hasattr(layer, 'data'):
-                for x, y, gid in layer.iter_data():
-                    # Get tile properties
-                    tile_props = tmx_data.get_tile_properties_by_gid(gid)
-                    if tile_props is None:
-                        continue
-                    
-                    # Calculate position
-                    pos = (x * tmx_data.tilewidth, y * tmx_data.tileheight)
-                    
-                    # Create appropriate tile based on properties
-                    if 'type' in tile_props:
-                        if tile_props['type'] == 'solid':
-                            Tile(pos, tmx_data.tilewidth, [self.all_sprites, self.collision_sprites])
-                        elif tile_props['type'] == 'hazard':
-                            Hazard(pos, tmx_data.tilewidth, [self.all_sprites, self.hazard_sprites])
-                    
-        # Process object layers
-        for obj in tmx_data.objects:
-            pos = (obj.x, obj.y)
-            
-            if obj.type == 'player_start':
-                self.player = Player(pos, [self.all_sprites], self.collision_sprites)
-            elif obj.type == 'enemy':
-                enemy_type = obj.properties.get('enemy_type', 'basic')
-                patrol_distance = obj.properties.get('patrol_distance', 128)
+            if obj['type'] == 'player_start':
+                self.start_position = pos
+                self.player = Player(pos[0], pos[1], [self.all_sprites], self.collision_sprites)
+            elif obj['type'] == 'enemy':
+                enemy_type = properties.get('enemy_type', 'basic')
+                patrol_distance = properties.get('patrol_distance', 128)
                 Enemy(pos, TILE_SIZE, [self.all_sprites, self.enemy_sprites], patrol_distance, enemy_type)
-            elif obj.type == 'powerup':
-                powerup_type = obj.properties.get('powerup_type', 'speed')
-                PowerUp(pos, TILE_SIZE, [self.all_sprites, self.powerup_sprites], powerup_type)
-            elif obj.type == 'finish':
+            elif obj['type'] == 'powerup':
+                # Power-ups the game doesn't have become speed boosts
+                powerup_type = properties.get('powerup_type', 'speed')
+                if powerup_type not in POWERUP_EVENTS:
+                    powerup_type = 'speed'
+                PowerUp(pos, TILE_SIZE, [self.all_sprites, self.powerup_sprites], powerup_type, self.collision_sprites)
+            elif obj['type'] == 'hazard':
+                hazard_type = properties.get('hazard_type', 'spike')
+                Hazard(pos, TILE_SIZE, [self.all_sprites, self.hazard_sprites], hazard_type)
+            elif obj['type'] == 'finish':
                 FinishFlag(pos, TILE_SIZE, [self.all_sprites, self.finish_sprites])
-            elif obj.type == 'moving_platform':
-                direction = obj.properties.get('direction', 'horizontal')
-                distance = obj.properties.get('distance', 128)
-                speed = obj.properties.get('speed', 2)
+            elif obj['type'] == 'moving_platform':
+                direction = properties.get('direction', 'horizontal')
+                distance = properties.get('distance', 128)
+                speed = properties.get('speed', 2)
                 MovingPlatform(pos, TILE_SIZE, [self.all_sprites, self.collision_sprites], distance, speed, direction)
-            elif obj.type == 'checkpoint':
-                checkpoint = Checkpoint(pos, TILE_SIZE, [self.all_sprites, self.checkpoint_sprites])
-                self.checkpoint_positions.append((pos[0], pos[1]))
+            elif obj['type'] == 'checkpoint':
+                Checkpoint(pos, TILE_SIZE, [self.all_sprites, self.checkpoint_sprites])
+                self.checkpoint_positions.append(pos)
+        
+        # Maps without a start object start where the built-in levels do
+        if self.player is None:
+            self.player = Player(self.start_position[0], self.start_position[1], [self.all_sprites], self.collision_sprites)
+        return True
     
     def create_test_level(self):
         """Create a simple test level if no TMX file is available"""
@@ -646,12 +695,13 @@ class Level:
             return
         
         # Removed debug print to improve performance
+        self.elapsed_time = elapsed_time
         
         # Update player
         self.player.update(elapsed_time)
         
-        # Update ghost - disable ghost shadow
-        # self.ghost.update(elapsed_time)
+        # Update ghosts
+        self.ghosts.update(elapsed_time)
         
         # Update enemies
         for enemy in self.enemy_sprites:
@@ -674,6 +724,9 @@ class Level:
                 checkpoint.activate()
                 self.current_checkpoint = checkpoint
                 print(f"Checkpoint activated at {checkpoint.position}")
+                self.log_event(EVENT_CHECKPOINT)
+                if self.splits:
+                    self.splits.checkpoint(checkpoint.position, elapsed_time)
                 # Show notification on UI
                 if self.ui:
                     self.ui.show_powerup_notification("Checkpoint Reached!")
@@ -704,14 +757,17 @@ class Level:
                     # Give player a small bounce
                     self.player.direction.y = -10
                     print("Enemy stomped!")
+                    self.log_event(EVENT_ENEMY_DEFEATED)
                 elif self.player.invincible:
                     # If player is invincible, defeat the enemy
                     enemy.kill()
                     print("Enemy defeated with invincibility!")
+                    self.log_event(EVENT_ENEMY_DEFEATED)
                 else:
                     # Player takes damage
                     self.player.lives -= 1
                     print(f"Player hit by enemy! Lives left: {self.player.lives}")
+                    self.log_event(EVENT_DEATH_ENEMY, self.player.lives)
                     # Reset player position to last checkpoint or start
                     self.respawn_player()
                 break
@@ -723,6 +779,7 @@ class Level:
                     # Player takes damage
                     self.player.lives -= 1
                     print(f"Player hit by hazard! Lives left: {self.player.lives}")
+                    self.log_event(EVENT_DEATH_HAZARD, self.player.lives)
                     # Reset player position to last checkpoint or start
                     self.respawn_player()
                 break
@@ -730,6 +787,9 @@ class Level:
         # Check powerup collisions
         for powerup in list(self.powerup_sprites):
             if self.player.rect.colliderect(powerup.rect):
+                if powerup.type in POWERUP_EVENTS:
+                    self.log_event(POWERUP_EVENTS[powerup.type])
+                
                 # Apply powerup effect
                 if powerup.type == 'speed':
                     self.player.activate_speed_boost(powerup.duration)
@@ -763,29 +823,43 @@ class Level:
             print(f"Player respawned at checkpoint: {self.current_checkpoint.position}")
         else:
             # Respawn at start
-            self.player.rect.x = 100
-            self.player.rect.y = HEIGHT - 200
+            self.player.rect.x, self.player.rect.y = self.start_position
             print("Player respawned at start position")
         
         # Reset player velocity
         self.player.direction.x = 0
         self.player.direction.y = 0
+        self.log_event(EVENT_RESPAWN)
     
-    def draw_background(self):
+    def log_event(self, event, value=0):
+        """Record an analytics event at the player's position"""
+        run_analytics.log(event, self.elapsed_time, self.player.rect.x, self.player.rect.y, value)
+    
+    def draw_background(self, surface=None):
         """Draw a gradient background with clouds that fills the entire screen"""
+        if surface is None:
+            surface = self.display_surface
+        
         # Create a gradient from blue to light blue
-        height = self.display_surface.get_height()
-        width = self.display_surface.get_width()
+        height = surface.get_height()
+        width = surface.get_width()
+        scale = height / HEIGHT
         
         # Fill the entire screen with sky gradient - ensure it covers everything
-        for y in range(0, height):
-            # Calculate color based on height
-            # Top is darker blue, gradually becoming lighter
-            r = int(80 + (y / height) * 100)
-            g = int(120 + (y / height) * 80)
-            b = int(235)
-            
-            pygame.draw.line(self.display_surface, (r, g, b), (0, y), (width, y))
+        # It only depends on the surface size, so it is drawn once and blitted every frame
+        sky = self.sky_gradients.get((width, height))
+        if sky is None:
+            sky = pygame.Surface((width, height))
+            for y in range(0, height):
+                # Calculate color based on height
+                # Top is darker blue, gradually becoming lighter
+                r = int(80 + (y / height) * 100)
+                g = int(120 + (y / height) * 80)
+                b = int(235)
+                
+                pygame.draw.line(sky, (r, g, b), (0, y), (width, y))
+            self.sky_gradients[(width, height)] = sky
+        surface.blit(sky, (0, 0))
         
         # Draw clouds
         # Use a deterministic approach based on game time to create moving clouds
@@ -795,13 +869,13 @@ class Level:
         for i in range(12):  # More clouds for better coverage
             x_pos = (width * (i * 0.12) - (cloud_time % (width * 2)) * 0.01) % (width * 1.2) - width * 0.1
             y_pos = height * (0.05 + (i % 5) * 0.08)
-            cloud_size = 60 + (i % 5) * 20
-            self.draw_cloud(x_pos, y_pos, cloud_size, cloud_size / 2)
+            cloud_size = (60 + (i % 5) * 20) * scale
+            self.draw_cloud(x_pos, y_pos, cloud_size, cloud_size / 2, surface)
         
         # Draw sun with improved glow effect
         sun_x = width * 0.85
         sun_y = height * 0.15
-        sun_radius = 45
+        sun_radius = 45 * scale
         
         # Draw sun glow with more layers for better effect
         for i in range(8, 0, -1):
@@ -809,15 +883,23 @@ class Level:
             color = (255, 255, 200, alpha)
             glow_surf = pygame.Surface((sun_radius * 2 * i, sun_radius * 2 * i), pygame.SRCALPHA)
             pygame.draw.circle(glow_surf, color, (sun_radius * i, sun_radius * i), sun_radius * i)
-            self.display_surface.blit(glow_surf, (sun_x - sun_radius * i, sun_y - sun_radius * i))
+            surface.blit(glow_surf, (sun_x - sun_radius * i, sun_y - sun_radius * i))
         
         # Draw sun body with gradient effect
-        pygame.draw.circle(self.display_surface, (255, 255, 200), (sun_x, sun_y), sun_radius)
-        pygame.draw.circle(self.display_surface, (255, 255, 100), (sun_x, sun_y), sun_radius - 5)
-        pygame.draw.circle(self.display_surface, (255, 255, 50), (sun_x, sun_y), sun_radius - 15)
+        pygame.draw.circle(surface, (255, 255, 200), (sun_x, sun_y), sun_radius)
+        pygame.draw.circle(surface, (255, 255, 100), (sun_x, sun_y), sun_radius - 5 * scale)
+        pygame.draw.circle(surface, (255, 255, 50), (sun_x, sun_y), sun_radius - 15 * scale)
     
-    def draw_cloud(self, x, y, width, height):
+    def draw_cloud(self, x, y, width, height, surface=None):
         """Draw a fluffy cloud"""
+        if surface is None:
+            surface = self.display_surface
+        
+        # Blit the cloud to the display surface
+        surface.blit(self.make_cloud_image(width, height), (x, y))
+    
+    def make_cloud_image(self, width, height):
+        """Create the image for a fluffy cloud"""
         cloud_color = (255, 255, 255, 180)  # Semi-transparent white
         
         # Create a surface for the cloud
@@ -836,26 +918,176 @@ class Level:
         for pos in positions:
             pygame.draw.circle(cloud_surf, cloud_color, pos, circle_radius)
         
-        # Blit the cloud to the display surface
-        self.display_surface.blit(cloud_surf, (x, y))
+        return cloud_surf
+    
+    def get_sky_layers(self):
+        """Build the static parts of the background once for the hardware renderer"""
+        if self.sky_layers is None:
+            # Sky gradient, clouds are drawn on top of it every frame
+            sky = pygame.Surface((WIDTH, HEIGHT))
+            for y in range(0, HEIGHT):
+                r = int(80 + (y / HEIGHT) * 100)
+                g = int(120 + (y / HEIGHT) * 80)
+                pygame.draw.line(sky, (r, g, 235), (0, y), (WIDTH, y))
+            
+            # Sun and its glow, drawn above the clouds
+            sun = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+            sun_x = WIDTH * 0.85
+            sun_y = HEIGHT * 0.15
+            sun_radius = 45
+            for i in range(8, 0, -1):
+                glow_surf = pygame.Surface((sun_radius * 2 * i, sun_radius * 2 * i), pygame.SRCALPHA)
+                pygame.draw.circle(glow_surf, (255, 255, 200, 120 - i * 12), (sun_radius * i, sun_radius * i), sun_radius * i)
+                sun.blit(glow_surf, (sun_x - sun_radius * i, sun_y - sun_radius * i))
+            pygame.draw.circle(sun, (255, 255, 200), (sun_x, sun_y), sun_radius)
+            pygame.draw.circle(sun, (255, 255, 100), (sun_x, sun_y), sun_radius - 5)
+            pygame.draw.circle(sun, (255, 255, 50), (sun_x, sun_y), sun_radius - 15)
+            
+            self.sky_layers = (sky, sun)
+        return self.sky_layers
+    
+    def draw_textured(self):
+        """Draw the level through the hardware render backend"""
+        backend = self.render_backend
+        sky, sun = self.get_sky_layers()
+        backend.blit(sky, (0, 0))
+        
+        # Same cloud motion as draw_background, with one cached image per cloud size
+        cloud_time = pygame.time.get_ticks() // 50
+        for i in range(12):
+            x_pos = (WIDTH * (i * 0.12) - (cloud_time % (WIDTH * 2)) * 0.01) % (WIDTH * 1.2) - WIDTH * 0.1
+            y_pos = HEIGHT * (0.05 + (i % 5) * 0.08)
+            cloud_size = 60 + (i % 5) * 20
+            if cloud_size not in self.cloud_images:
+                self.cloud_images[cloud_size] = self.make_cloud_image(cloud_size, cloud_size / 2)
+            backend.blit(self.cloud_images[cloud_size], (x_pos, y_pos))
+        
+        backend.blit(sun, (0, 0))
+        
+        # Sprite images are uploaded as textures the first time they are drawn
+        screen_rect = pygame.Rect(0, 0, WIDTH, HEIGHT)
+        offset = (math.floor(self.camera_offset.x), math.floor(self.camera_offset.y))
+        self.terrain_cache.draw_region(backend, screen_rect.move(-offset[0], -offset[1]), offset)
+        for sprite in self.dynamic_sprites:
+            rect = sprite.rect.move(offset)
+            if screen_rect.colliderect(rect):
+                backend.blit(sprite.image, rect.topleft)
+        
+        heatmap = self.get_heatmap()
+        if heatmap:
+            for x, image in heatmap.visible_tiles(offset[0], WIDTH):
+                backend.blit(image, (x + offset[0], offset[1]))
+    
+    def build_world_renderer(self):
+        """Split the sprites into terrain and dynamic ones once, and index the terrain for the scroll-reuse renderer"""
+        # Sprites created later (ghosts) join the dynamic group themselves, killed ones leave it
+        self.terrain_sprites.empty()
+        self.dynamic_sprites.empty()
+        for sprite in self.all_sprites:
+            if TerrainCache.is_static(sprite):
+                self.terrain_sprites.add(sprite)
+            elif sprite is not self.player:
+                self.dynamic_sprites.add(sprite)
+        if self.player:
+            self.dynamic_sprites.add(self.player, layer=1)
+        
+        self.world_renderer = None
+        self.terrain_cache = None
+        if self.render_backend:
+            # Textures are drawn in place, the index only finds the terrain on screen
+            self.terrain_cache = TerrainCache(self.terrain_sprites)
+            return
+        if not SCROLL_RENDER:
+            return
+        
+        terrain_cache = TerrainCache(self.terrain_sprites, self.render_scale)
+        surface = self.world_surface or self.display_surface
+        self.world_renderer = ScrollingWorldRenderer(surface.get_size(), terrain_cache)
+    
+    def scaled_image(self, image):
+        """Get a sprite image at the world render scale, scaling each image only once"""
+        if self.render_scale == 1:
+            return image
+        
+        # Entries go away with their source image, so images made fresh every frame are scaled on the fly
+        scaled = self.scaled_images.get(image)
+        if scaled is None:
+            size = (math.ceil(image.get_width() * self.render_scale), math.ceil(image.get_height() * self.render_scale))
+            scaled = pygame.transform.scale(image, size)
+            self.scaled_images[image] = scaled
+        return scaled
     
     def draw(self):
         """Draw all level elements with camera offset"""
+        if self.render_backend:
+            self.draw_textured()
+            return
+        
+        # The world goes to the low-res framebuffer when render scaling is on
+        surface = self.world_surface or self.display_surface
+        
         # Fill background with a gradient sky - draw this first to cover everything
-        self.draw_background()
+        self.draw_background(surface)
         
-        # Draw all sprites with camera offset
-        for sprite in sorted(self.all_sprites, key=lambda s: 1 if isinstance(s, Player) else 0):
-            offset_pos = sprite.rect.topleft + self.camera_offset
-            self.display_surface.blit(sprite.image, offset_pos)
+        if self.world_renderer or self.world_surface:
+            scale = self.render_scale
+            offset = (math.floor(self.camera_offset.x * scale), math.floor(self.camera_offset.y * scale))
+            
+            # Terrain comes from the scrolled buffer, so only dynamic sprites are drawn here
+            groups = (self.terrain_sprites, self.dynamic_sprites)
+            if self.world_renderer:
+                self.world_renderer.draw(surface, offset)
+                groups = (self.dynamic_sprites,)
+            
+            for group in groups:
+                for sprite in group:
+                    pos = (math.floor(sprite.rect.x * scale) + offset[0], math.floor(sprite.rect.y * scale) + offset[1])
+                    surface.blit(self.scaled_image(sprite.image), pos)
+            
+            heatmap = self.get_heatmap()
+            if heatmap:
+                for x, image in heatmap.visible_tiles(offset[0] / scale, WIDTH):
+                    surface.blit(self.scaled_image(image), (math.floor(x * scale) + offset[0], offset[1]))
+        else:
+            # Draw all sprites with camera offset
+            for group in (self.terrain_sprites, self.dynamic_sprites):
+                for sprite in group:
+                    offset_pos = sprite.rect.topleft + self.camera_offset
+                    self.display_surface.blit(sprite.image, offset_pos)
+            
+            heatmap = self.get_heatmap()
+            if heatmap:
+                for x, image in heatmap.visible_tiles(self.camera_offset.x, WIDTH):
+                    self.display_surface.blit(image, (x + self.camera_offset.x, self.camera_offset.y))
+        
+        # Upscale the world framebuffer once per frame
+        if self.world_surface:
+            pygame.transform.scale(self.world_surface, self.display_surface.get_size(), self.display_surface)
+    
+    def get_heatmap(self):
+        """Get the heatmap overlay if it is shown, loading it the first time"""
+        if not self.show_heatmap:
+            return None
+        if self.heatmap is None:
+            # False marks a level without a heatmap, so loading isn't retried every frame
+            self.heatmap = HeatmapOverlay.load(self.level_name) or False
+        return self.heatmap
     
     def start(self):
         """Start the level"""
         self.active = True
+        self.elapsed_time = 0
+        run_analytics.start_attempt(self.level_name)
+        if self.splits:
+            self.splits.start(self.level_name, [checkpoint.position for checkpoint in self.checkpoint_sprites])
         print("Level started - active state set to True")
     
     def reset(self):
         """Reset the level"""
+        # The unfinished run's ghost recording is no longer needed
+        self.discard_recording()
+        self.abandon_attempt()
+        
         # Clear all sprites
         self.all_sprites.empty()
         self.collision_sprites.empty()
@@ -870,21 +1102,38 @@ class Level:
         self.completed = False
         self.current_checkpoint = None
         self.checkpoint_positions = []
+        self.player = None
         
         # Reset camera
         self.camera_offset = pygame.math.Vector2(0, 0)
         
+        # Drop scaled copies and textures of the old sprites
+        self.scaled_images = weakref.WeakKeyDictionary()
+        if self.render_backend:
+            self.render_backend.clear_textures()
+        
         # Reload the level
         self.load_level()
+        self.build_world_renderer()
         
         # Reload ghost data
-        self.ghost = Ghost([self.all_sprites])
-        self.ghost.load_ghost_data(self.level_name)
+        self.ghosts.load()
         
         print("Level reset complete")
     
+    def abandon_attempt(self):
+        """End the analytics attempt of a run that was left unfinished"""
+        x, y = self.player.rect.topleft if self.player else (0, 0)
+        run_analytics.end_attempt(EVENT_ABANDON, self.elapsed_time, x, y)
+    
+    def discard_recording(self):
+        """Throw away the player's ghost recording"""
+        if self.player:
+            self.player.position_history.discard()
+    
     def get_player_position_history(self):
         """Get the player's position history for ghost replay"""
         if self.player:
+            self.player.position_history.flush()
             return self.player.position_history
-        return []
+        return PositionRecorder()
@@ -5,6 +5,7 @@ Entry point for the game.
 import pygame
 import sys
 import os
+import argparse
 
 # Add the parent directory to the path so we can import modules
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -13,6 +14,15 @@ sys.path.append(parent_dir)
 
 def main():
     """Main function to start the game"""
+    # Import here to avoid circular imports
+    from src.settings import RENDER_BACKEND
+    
+    # Parse launch options
+    parser = argparse.ArgumentParser(description="SpeedRunner X")
+    parser.add_argument("--renderer", choices=["software", "hardware"], default=RENDER_BACKEND,
+                        help="render through the software display surface or an SDL2 renderer")
+    args = parser.parse_args()
+    
     # Initialize pygame
     pygame.init()
     
@@ -21,7 +31,7 @@ def main():
     
     # Create and run the game
     print("Creating game instance...")
-    game = Game()
+    game = Game(args.renderer)
     print("Starting game loop...")
     game.run()
 
@@ -6,6 +6,8 @@ import pygame
 import os
 import time
 from src.settings import *
+from src.recorder import pack_state
+from src.ghost_stream import StreamingRecorder
 
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y, groups, collision_sprites):
@@ -52,8 +54,7 @@ class Player(pygame.sprite.Sprite):
         self.flash_timer = 0
         
         # Position history for ghost replay
-        self.position_history = []
-        self.last_record_time = 0
+        self.position_history = StreamingRecorder()
     
     def load_player_sprites(self):
         """Load player sprite images"""
@@ -341,10 +342,8 @@ class Player(pygame.sprite.Sprite):
         # Update animation
         self.animate()
         
-        # Record position for ghost replay (every 50ms)
-        if elapsed_time - self.last_record_time > 50:
-            self.record_position(elapsed_time)
-            self.last_record_time = elapsed_time
+        # Offer every frame to the ghost recorder, it keeps only the keyframes it needs
+        self.record_position(elapsed_time)
     
     def update_powerups(self):
         """Update powerup effects"""
@@ -382,12 +381,6 @@ class Player(pygame.sprite.Sprite):
     
     def record_position(self, time):
         """Record current position for ghost replay"""
-        self.position_history.append({
-            'time': time,
-            'x': self.rect.x,
-            'y': self.rect.y,
-            'facing_right': self.facing_right,
-            'is_running': self.is_running,
-            'is_jumping': self.is_jumping,
-            'is_falling': self.is_falling
-        })
+        self.position_history.record(time, self.rect.x, self.rect.y,
+                                     pack_state(self.facing_right, self.is_running,
+                                                self.is_jumping, self.is_falling))
@@ -0,0 +1,137 @@
+"""
+Quantile sketch module for SpeedRunner X.
+A KLL sketch that answers rank and quantile queries over every run in bounded memory.
+"""
+import math
+import random
+from bisect import bisect_left, bisect_right
+from src.settings import *
+
+class KLLSketch:
+    def __init__(self, k=QUANTILE_SKETCH_K):
+        # compactors[h] holds items that each stand for 2**h runs
+        self.k = k
+        self.compactors = [[]]
+        self.count = 0
+
+        # Sorted values and cumulative weights, rebuilt lazily after an update
+        self.values = None
+        self.weights = None
+
+    def capacity(self, height):
+        """Get how many items a compactor holds before it is compacted"""
+        # Lower compactors shrink geometrically, the top one holds k items
+        depth = len(self.compactors) - height - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def size(self):
+        """Get the number of items kept"""
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def max_size(self):
+        """Get the number of items kept before something is compacted"""
+        return sum(self.capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, value):
+        """Add one run"""
+        self.compactors[0].append(value)
+        self.count += 1
+        self.values = None
+        if self.size() >= self.max_size():
+            self.compress()
+
+    def compress(self):
+        """Compact full compactors until the sketch is back under its size"""
+        while self.size() >= self.max_size():
+            for height in range(len(self.compactors)):
+                if len(self.compactors[height]) >= self.capacity(height):
+                    self.compact(height)
+                    break
+
+    def compact(self, height):
+        """Promote every other item of a compactor to the next one, doubling its weight"""
+        if height + 1 == len(self.compactors):
+            self.compactors.append([])
+        items = sorted(self.compactors[height])
+
+        # An odd item out stays behind so the total weight stays exact
+        leftover = [items.pop()] if len(items) % 2 else []
+        offset = random.getrandbits(1)
+        self.compactors[height + 1].extend(items[offset::2])
+        self.compactors[height] = leftover
+
+    def merge(self, other):
+        """Add every run of another sketch"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for height, compactor in enumerate(other.compactors):
+            self.compactors[height].extend(compactor)
+        self.count += other.count
+        self.values = None
+        self.compress()
+
+    def copy(self):
+        """Get an independent copy of the sketch"""
+        sketch = KLLSketch(self.k)
+        sketch.compactors = [list(compactor) for compactor in self.compactors]
+        sketch.count = self.count
+        return sketch
+
+    def build_table(self):
+        """Sort the kept items with their cumulative weights"""
+        items = sorted((value, 1 << height) for height, compactor in enumerate(self.compactors)
+                       for value in compactor)
+        self.values = [value for value, weight in items]
+        self.weights = []
+        total = 0
+        for value, weight in items:
+            total += weight
+            self.weights.append(total)
+
+    def rank(self, value, inclusive=True):
+        """Get the estimated fraction of runs at or below value"""
+        if not self.count:
+            return 0.0
+        if self.values is None:
+            self.build_table()
+        index = bisect_right(self.values, value) if inclusive else bisect_left(self.values, value)
+        return self.weights[index - 1] / self.weights[-1] if index else 0.0
+
+    def quantile(self, q):
+        """Get the estimated value at fraction q of the runs"""
+        if not self.count:
+            return None
+        if self.values is None:
+            self.build_table()
+        index = bisect_left(self.weights, q * self.weights[-1])
+        return self.values[min(index, len(self.values) - 1)]
+
+    def to_dict(self):
+        """Get the sketch as JSON-friendly data"""
+        return {'k': self.k, 'count': self.count, 'compactors': self.compactors}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a sketch saved with to_dict"""
+        sketch = cls(data.get('k', QUANTILE_SKETCH_K))
+        sketch.compactors = [list(compactor) for compactor in data['compactors']] or [[]]
+        sketch.count = data['count']
+        return sketch
+
+    @classmethod
+    def from_values(cls, values, k=QUANTILE_SKETCH_K):
+        """Build a sketch from existing runs"""
+        sketch = cls(k)
+        for value in values:
+            sketch.update(value)
+        return sketch
+
+
+def sketches_to_dict(sketches):
+    """Get per-level sketches as JSON-friendly data"""
+    return {level: sketch.to_dict() for level, sketch in sketches.items()}
+
+
+def sketches_from_dict(data):
+    """Rebuild per-level sketches saved with sketches_to_dict"""
+    return {level: KLLSketch.from_dict(sketch) for level, sketch in data.items()}
@@ -0,0 +1,172 @@
+"""
+Recorder module for SpeedRunner X.
+Stores position samples for ghost replays in typed arrays.
+"""
+from array import array
+from src.settings import *
+
+# State flags packed into one byte per sample
+FLAG_FACING_RIGHT = 0x01
+FLAG_RUNNING = 0x02
+FLAG_JUMPING = 0x04
+FLAG_FALLING = 0x08
+
+# Slope bound of a segment no sample has narrowed yet
+SLOPE_LIMIT = float('inf')
+
+def pack_state(facing_right, is_running, is_jumping, is_falling):
+    """Pack the player's state booleans into a bitfield"""
+    flags = 0
+    if facing_right:
+        flags |= FLAG_FACING_RIGHT
+    if is_running:
+        flags |= FLAG_RUNNING
+    if is_jumping:
+        flags |= FLAG_JUMPING
+    if is_falling:
+        flags |= FLAG_FALLING
+    return flags
+
+class PositionRecorder:
+    def __init__(self, chunk_size=RECORDER_CHUNK_SIZE):
+        # One column per field, 13 bytes per sample
+        self.chunk_size = chunk_size
+        self.times = array('I')
+        self.xs = array('i')
+        self.ys = array('i')
+        self.flags = array('B')
+        self.count = 0
+        self.grow()
+
+    def __len__(self):
+        return self.count
+
+    def grow(self):
+        """Extend every column by one chunk of empty slots"""
+        self.times.extend(array('I', [0]) * self.chunk_size)
+        self.xs.extend(array('i', [0]) * self.chunk_size)
+        self.ys.extend(array('i', [0]) * self.chunk_size)
+        self.flags.extend(bytes(self.chunk_size))
+
+    def append(self, time, x, y, flags):
+        """Record one sample into the preallocated columns"""
+        if self.count == len(self.times):
+            self.grow()
+        index = self.count
+        self.times[index] = time
+        self.xs[index] = x
+        self.ys[index] = y
+        self.flags[index] = flags
+        self.count = index + 1
+
+    def clear(self):
+        """Forget all samples but keep the allocated columns"""
+        self.count = 0
+
+    def columns(self):
+        """Get read-only views of the recorded part of each column without copying"""
+        # The columns can't grow while a view is held, so release views before recording more
+        count = self.count
+        return (memoryview(self.times)[:count].toreadonly(),
+                memoryview(self.xs)[:count].toreadonly(),
+                memoryview(self.ys)[:count].toreadonly(),
+                memoryview(self.flags)[:count].toreadonly())
+
+    def trim(self):
+        """Drop the unused slots at the end of every column"""
+        for column in (self.times, self.xs, self.ys, self.flags):
+            del column[self.count:]
+
+    @classmethod
+    def from_samples(cls, samples):
+        """Build a recorder from a list of sample dictionaries (old JSON ghosts)"""
+        recorder = cls(max(len(samples), 1))
+        for sample in samples:
+            recorder.append(int(sample['time']), int(sample['x']), int(sample['y']),
+                            pack_state(sample.get('facing_right', True),
+                                       sample.get('is_running', False),
+                                       sample.get('is_jumping', False),
+                                       sample.get('is_falling', False)))
+        return recorder
+
+
+class AdaptiveRecorder(PositionRecorder):
+    def __init__(self, tolerance=GHOST_ERROR_TOLERANCE, max_gap=GHOST_MAX_KEYFRAME_GAP,
+                 chunk_size=RECORDER_CHUNK_SIZE):
+        super().__init__(chunk_size)
+        self.tolerance = tolerance
+        self.max_gap = max_gap
+        
+        # Last keyframe, no time until the first one is stored
+        self.key_time = None
+        self.key_x = self.key_y = self.key_flags = 0
+        
+        # Samples since the keyframe: how many, the newest one and the step that led to it
+        self.pending = 0
+        self.last_time = self.last_x = self.last_y = 0
+        self.step_x = self.step_y = 0
+        
+        # Range of slopes from the keyframe that pass within tolerance of every pending sample
+        self.min_slope_x = self.min_slope_y = -SLOPE_LIMIT
+        self.max_slope_x = self.max_slope_y = SLOPE_LIMIT
+
+    def append(self, time, x, y, flags):
+        """Store a keyframe"""
+        super().append(time, x, y, flags)
+        self.key_time, self.key_x, self.key_y, self.key_flags = time, x, y, flags
+        self.pending = 0
+        self.last_time, self.last_x, self.last_y = time, x, y
+        self.min_slope_x = self.min_slope_y = -SLOPE_LIMIT
+        self.max_slope_x = self.max_slope_y = SLOPE_LIMIT
+
+    def clear(self):
+        """Forget all keyframes and pending samples"""
+        super().clear()
+        self.key_time = None
+        self.pending = 0
+
+    def add_pending(self, time, x, y):
+        """Keep a sample the current segment reaches, narrowing the slopes it allows"""
+        self.step_x, self.step_y = x - self.last_x, y - self.last_y
+        self.last_time, self.last_x, self.last_y = time, x, y
+        self.pending += 1
+        
+        span = time - self.key_time
+        self.min_slope_x = max(self.min_slope_x, (x - self.key_x - self.tolerance) / span)
+        self.max_slope_x = min(self.max_slope_x, (x - self.key_x + self.tolerance) / span)
+        self.min_slope_y = max(self.min_slope_y, (y - self.key_y - self.tolerance) / span)
+        self.max_slope_y = min(self.max_slope_y, (y - self.key_y + self.tolerance) / span)
+
+    def record(self, time, x, y, flags):
+        """Offer a sample, storing keyframes only where the path can't be interpolated"""
+        if self.key_time is None:
+            self.append(time, x, y, flags)
+            return
+        
+        if time <= self.last_time:
+            return
+        
+        # A state change ends the current segment and starts a new one at this sample
+        if flags != self.key_flags:
+            if self.pending:
+                self.append(self.last_time, self.last_x, self.last_y, self.key_flags)
+            self.append(time, x, y, flags)
+            return
+        
+        if self.pending:
+            # Turning around always needs a keyframe at the turning point, and so does a long segment.
+            # Otherwise interpolating from the keyframe misses a pending sample if its slope is out of range
+            span = time - self.key_time
+            if (self.step_x * (x - self.last_x) < 0 or self.step_y * (y - self.last_y) < 0 or
+                    span > self.max_gap or
+                    not self.min_slope_x <= (x - self.key_x) / span <= self.max_slope_x or
+                    not self.min_slope_y <= (y - self.key_y) / span <= self.max_slope_y):
+                # The previous sample was the last one the straight segment could reach
+                self.append(self.last_time, self.last_x, self.last_y, self.key_flags)
+        
+        self.add_pending(time, x, y)
+
+    def flush(self):
+        """Store the newest pending sample so the recording ends where the player is"""
+        if self.pending:
+            self.append(self.last_time, self.last_x, self.last_y, self.key_flags)
@@ -0,0 +1,145 @@
+"""
+Render backend module for SpeedRunner X.
+Provides the software display path and an SDL2 Renderer/Texture path.
+"""
+import weakref
+import pygame
+from src.settings import *
+
+# Import the SDL2 video bindings conditionally, they are not part of every pygame build
+try:
+    from pygame._sdl2.video import Window, Renderer, Texture
+    SDL2_VIDEO_AVAILABLE = True
+except ImportError:
+    SDL2_VIDEO_AVAILABLE = False
+
+class SoftwareBackend:
+    def __init__(self, fullscreen=False):
+        self.name = "software"
+        self.hardware = False
+        self.clear_color = BLACK
+        self.screen = None
+        self.set_fullscreen(fullscreen)
+
+    def set_fullscreen(self, fullscreen):
+        """Create (or recreate) the game window"""
+        # SCALED lets SDL upscale the 1280x720 frame to the window or the whole screen
+        flags = pygame.FULLSCREEN if fullscreen else 0
+        try:
+            self.screen = pygame.display.set_mode((WIDTH, HEIGHT), flags | pygame.SCALED)
+        except pygame.error as e:
+            print(f"Scaled display not available, using a plain window: {e}")
+            self.screen = pygame.display.set_mode((WIDTH, HEIGHT), flags)
+
+    def begin_frame(self):
+        """Prepare for a new frame - the display surface keeps its contents"""
+        pass
+
+    def blit(self, image, pos):
+        """Draw an image onto the frame"""
+        self.screen.blit(image, pos)
+
+    def clear_textures(self):
+        """Forget cached textures - the software path has none"""
+        pass
+
+    def snapshot(self):
+        """Copy the current frame"""
+        return self.screen.copy()
+
+    def present(self, rects=None):
+        """Push the frame, or only the given rects of it, to the display"""
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+
+
+class HardwareBackend:
+    def __init__(self, fullscreen=False):
+        self.name = "hardware"
+        self.hardware = True
+        self.clear_color = (0, 0, 0, 0)
+
+        # pygame-menu sizes itself from the display module, so keep a hidden display for it
+        pygame.display.set_mode((WIDTH, HEIGHT), pygame.HIDDEN)
+
+        # SDL picks an accelerated renderer when there is one and its software renderer otherwise
+        self.window = Window(TITLE, size=(WIDTH, HEIGHT))
+        self.renderer = Renderer(self.window)
+        self.renderer.logical_size = (WIDTH, HEIGHT)
+        self.set_fullscreen(fullscreen)
+
+        # HUD and menus keep drawing to a surface, only the parts of it that changed are uploaded
+        self.screen = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        self.overlay_texture = Texture(self.renderer, (WIDTH, HEIGHT), streaming=True)
+        self.overlay_texture.blend_mode = 1  # SDL_BLENDMODE_BLEND
+
+        # Sprite images are uploaded once and reused every frame, a texture goes away with its surface
+        self.textures = weakref.WeakKeyDictionary()
+
+    def set_fullscreen(self, fullscreen):
+        """Switch the window between fullscreen and windowed mode"""
+        if fullscreen:
+            self.window.set_fullscreen(True)
+        else:
+            self.window.set_windowed()
+
+    def begin_frame(self):
+        """Clear the renderer for a new frame"""
+        self.renderer.draw_color = (0, 0, 0, 255)
+        self.renderer.clear()
+
+    def texture(self, image):
+        """Get the texture for a surface, uploading it the first time it is seen"""
+        texture = self.textures.get(image)
+        if texture is None:
+            texture = Texture.from_surface(self.renderer, image)
+            self.textures[image] = texture
+        return texture
+
+    def blit(self, image, pos):
+        """Draw an image onto the frame as a texture"""
+        self.texture(image).draw(dstrect=(int(pos[0]), int(pos[1])))
+
+    def clear_textures(self):
+        """Forget all uploaded textures, e.g. when a level is rebuilt"""
+        self.textures = weakref.WeakKeyDictionary()
+
+    def snapshot(self):
+        """Copy what has been drawn so far, with the overlay on top"""
+        frame = self.renderer.to_surface()
+        if frame.get_size() != (WIDTH, HEIGHT):
+            frame = pygame.transform.smoothscale(frame, (WIDTH, HEIGHT))
+        frame.blit(self.screen, (0, 0))
+        return frame
+
+    def present(self, rects=None):
+        """Upload the overlay, or only the given rects of it, composite it over the world and show the frame"""
+        if rects is None:
+            self.overlay_texture.update(self.screen)
+        else:
+            screen_rect = self.screen.get_rect()
+            for rect in rects:
+                rect = screen_rect.clip(rect)
+                if rect.width and rect.height:
+                    self.overlay_texture.update(self.screen.subsurface(rect), rect)
+        self.overlay_texture.draw()
+        self.renderer.present()
+
+        # Closing the visible window doesn't end SDL while the hidden display exists
+        if pygame.event.peek(pygame.WINDOWCLOSE):
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+
+def create_backend(name, fullscreen=False):
+    """Create the requested render backend, falling back to software rendering"""
+    if name == "hardware":
+        if not SDL2_VIDEO_AVAILABLE:
+            print("pygame._sdl2.video not available, using software rendering")
+        else:
+            try:
+                return HardwareBackend(fullscreen)
+            except Exception as e:
+                print(f"Could not create hardware renderer, using software rendering: {e}")
+    return SoftwareBackend(fullscreen)
@@ -9,6 +9,7 @@ WIDTH = 1280
 HEIGHT = 720
 FPS = 60
 TILE_SIZE = 32
+FULLSCREEN = False  # Start in fullscreen (toggle in game with F)
 
 # Colors
 WHITE = (255, 255, 255)
@@ -42,6 +43,16 @@ SLOW_TIME_FACTOR = 0.5
 SLOW_TIME_DURATION = 3000  # milliseconds
 INVINCIBILITY_DURATION = 5000  # milliseconds
 
+# Render settings
+RENDER_BACKEND = "software"  # "software" or "hardware" (SDL2 Renderer), can be overridden with --renderer
+RENDER_SCALE = 1.0  # Internal resolution of the world layer, e.g. 0.5, 0.75 or 1.0
+SCROLL_RENDER = False  # Reuse the previous frame's terrain and only repaint newly exposed strips
+TERRAIN_COLUMN_WIDTH = 256  # Width of the terrain cache buckets in pixels
+TERRAIN_COLORKEY = (255, 0, 255)  # Marks empty pixels in the terrain buffer
+OVERLAY_DIM_ALPHA = 140  # How strongly the frozen frame behind overlays is dimmed (0 disables)
+OVERLAY_BLUR = False  # Blur the frozen frame behind overlays
+OVERLAY_BLUR_FACTOR = 4  # Downscale factor used for the blur
+
 # Physics settings
 GRAVITY = 0.8
 TERMINAL_VELOCITY = 20
@@ -56,7 +67,40 @@ STATE_LEADERBOARD = 5
 
 # File paths
 LEADERBOARD_PATH = "data/leaderboard.json"
+LEADERBOARD_SIZE = 5  # Times kept per level
+LEADERBOARD_HISTORY_ROWS = 100  # Recent runs listed on the leaderboard screen
+LEADERBOARD_BACKEND = "json"  # "json" (journal + snapshot), "sqlite" or "remote"
+LEADERBOARD_REMOTE_URL = "http://127.0.0.1:8765"
+LEADERBOARD_OUTBOX_PATH = "data/leaderboard_outbox.jsonl"  # Runs not yet accepted by the server
+LEADERBOARD_REMOTE_BATCH = 25  # Runs sent per request
+LEADERBOARD_REMOTE_TTL = 30.0  # Seconds before cached remote top times are revalidated
+LEADERBOARD_REMOTE_RETRY = 10.0  # Seconds to wait after the server could not be reached
+LEADERBOARD_REMOTE_TIMEOUT = 3.0  # Seconds per request
+LEADERBOARD_DB_PATH = "data/leaderboard.db"
+LEADERBOARD_JOURNAL_PATH = "data/leaderboard.journal"
+LEADERBOARD_FSYNC_BATCH = 8  # Journal records written before forcing them to disk
+LEADERBOARD_FSYNC_INTERVAL = 2.0  # Max seconds between journal syncs
+LEADERBOARD_COMPACT_INTERVAL = 50  # Journal records between snapshots
+QUANTILE_SKETCH_K = 200  # Items in the largest sketch compactor, higher is more accurate
 GHOST_RUNS_PATH = "data/ghost_runs/"
+GHOST_COMPRESSION = True
+GHOST_LIBRARY_PATH = "data/ghost_library/"  # Archive of personal best and imported ghost runs
+RECORDER_CHUNK_SIZE = 1024  # Samples added whenever the position recorder fills up
+GHOST_ERROR_TOLERANCE = 1.5  # Max distance in pixels between the ghost path and the real one
+GHOST_MAX_KEYFRAME_GAP = 1000  # Max time in ms between ghost keyframes
+GHOST_RACE_COUNT = 5  # Ghosts of the fastest leaderboard runs raced at once
+GHOST_TINTS = [(255, 255, 255), (255, 215, 0), (0, 220, 255), (120, 255, 120), (255, 120, 220)]
+ANALYTICS_ENABLED = True
+ANALYTICS_PATH = "data/analytics/"
+ANALYTICS_CHUNK_SIZE = 4096  # Events buffered before a chunk is written
+SPLITS_PATH = "data/splits.json"
+SPLIT_DISPLAY_TIME = 3000  # Ms a split delta stays in the HUD
+HEATMAP_PATH = "data/heatmaps/"
+HEATMAP_CELL_SIZE = 16  # Pixels per heatmap grid cell
+HEATMAP_SAMPLE_INTERVAL = 50  # Ms between ghost positions counted for the occupancy heatmap
+HEATMAP_OVERLAY = False  # Draw the level's heatmap over the world, toggled in game with F3
 MAPS_PATH = "assets/maps/"
+MAP_CACHE_PATH = "data/map_cache/"  # Parsed TMX maps, rebuilt whenever the map file changes
+TMX_LEVELS = False  # Build levels from MAPS_PATH/<level>.tmx when there is one, instead of the built-in layouts
 # Level settings
 LEVEL_COUNT = 2  # Number of levels in the game
@@ -0,0 +1,161 @@
+"""
+Splits module for SpeedRunner X.
+Times every checkpoint of a run against the personal best and the best segments.
+"""
+import json
+import os
+from src.settings import *
+from src.io_worker import io_worker
+
+# How a split compares: faster than the best segment ever, ahead of or behind the personal best
+SPLIT_GOLD = 'gold'
+SPLIT_AHEAD = 'ahead'
+SPLIT_BEHIND = 'behind'
+
+class SplitTracker:
+    def __init__(self):
+        # Per level: 'pb' holds the personal best's elapsed time at each split, the finish last,
+        # 'best_segments' the fastest time ever taken for each segment
+        self.split_data = {}
+        self.loaded = False
+        io_worker.submit(self.read_splits, callback=self.apply_splits)
+
+        # Run in progress
+        self.level_name = None
+        self.split_index = {}
+        self.times = []
+        self.pb = None
+        self.best_segments = None
+
+        # Last split shown in the HUD as (delta ms, kind, elapsed time it happened at)
+        self.last_split = None
+
+    @staticmethod
+    def read_splits():
+        """Read the split file (I/O worker thread)"""
+        if not os.path.exists(SPLITS_PATH):
+            return {}
+        try:
+            with open(SPLITS_PATH, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading splits: {e}")
+            return {}
+
+    def apply_splits(self, split_data):
+        """Take over the loaded splits (game loop)"""
+        # Keep any level finished before the file finished loading, and save it now
+        finished_early = bool(self.split_data)
+        split_data.update(self.split_data)
+        self.split_data = split_data
+        self.loaded = True
+        if finished_early:
+            io_worker.submit(self.write_splits, json.dumps(self.split_data))
+        if self.level_name:
+            self.load_comparison()
+
+    @staticmethod
+    def write_splits(data_json):
+        """Write the split file (I/O worker thread)"""
+        temp_path = SPLITS_PATH + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(SPLITS_PATH), exist_ok=True)
+            with open(temp_path, 'w') as f:
+                f.write(data_json)
+            os.replace(temp_path, SPLITS_PATH)
+        except IOError as e:
+            print(f"Error saving splits: {e}")
+
+    def start(self, level_name, checkpoint_positions):
+        """Begin timing a run, indexing the level's checkpoints by position in level order"""
+        self.level_name = level_name
+        self.split_index = {position: i for i, position in enumerate(sorted(checkpoint_positions))}
+
+        # One slot per checkpoint plus the finish, None until reached
+        self.times = [None] * (len(self.split_index) + 1)
+        self.last_split = None
+        self.load_comparison()
+
+    def load_comparison(self):
+        """Pick up the stored splits of the level, if they match its checkpoints"""
+        level_splits = self.split_data.get(self.level_name, {})
+        self.pb = level_splits.get('pb')
+        self.best_segments = level_splits.get('best_segments')
+
+        # Splits recorded before the level's checkpoints changed can't be compared
+        if self.pb is not None and len(self.pb) != len(self.times):
+            self.pb = None
+            self.best_segments = None
+
+    def previous_time(self, index):
+        """Get the elapsed time at the last split reached before index"""
+        for time in reversed(self.times[:index]):
+            if time is not None:
+                return time
+        return 0
+
+    def split(self, index, elapsed_time):
+        """Record reaching a split and work out how it compares"""
+        if self.times[index] is not None:
+            return
+        self.times[index] = elapsed_time
+
+        # A segment only compares to the best one if the split before it was reached too
+        segment = None
+        if index == 0 or self.times[index - 1] is not None:
+            segment = elapsed_time - self.previous_time(index)
+
+        if self.pb is None or self.pb[index] is None:
+            self.last_split = None
+            return
+        delta = elapsed_time - self.pb[index]
+        best_segment = self.best_segments[index] if self.best_segments else None
+        if best_segment is not None and segment is not None and segment < best_segment:
+            kind = SPLIT_GOLD
+        else:
+            kind = SPLIT_AHEAD if delta < 0 else SPLIT_BEHIND
+        self.last_split = (delta, kind, elapsed_time)
+
+    def checkpoint(self, position, elapsed_time):
+        """Record reaching the checkpoint at position"""
+        index = self.split_index.get(position)
+        if index is not None:
+            self.split(index, elapsed_time)
+
+    def finish(self, elapsed_time):
+        """Record the finish, then store new best segments and a new personal best"""
+        if self.level_name is None:
+            return
+        self.split(len(self.times) - 1, elapsed_time)
+
+        # Segments only count between two splits that were both reached
+        best_segments = list(self.best_segments) if self.best_segments else [None] * len(self.times)
+        last = 0
+        for index, time in enumerate(self.times):
+            if time is None:
+                last = None
+                continue
+            if last is not None:
+                segment = time - last
+                if best_segments[index] is None or segment < best_segments[index]:
+                    best_segments[index] = segment
+            last = time
+
+        level_splits = {'pb': self.pb, 'best_segments': best_segments}
+        if self.pb is None or elapsed_time < self.pb[-1]:
+            level_splits['pb'] = list(self.times)
+        self.split_data[self.level_name] = level_splits
+        self.level_name = None
+
+        # The whole file is small, so it is rewritten on each finish
+        if self.loaded:
+            io_worker.submit(self.write_splits, json.dumps(self.split_data))
+
+    def current_split(self, elapsed_time):
+        """Get the (delta ms, kind) to show in the HUD, or None"""
+        if self.last_split is None:
+            return None
+        delta, kind, split_time = self.last_split
+        if elapsed_time - split_time > SPLIT_DISPLAY_TIME:
+            return None
+        return delta, kind
@@ -0,0 +1,198 @@
+"""
+TMX map module for SpeedRunner X.
+Parses Tiled maps into the tiles and objects a level is built from, and caches them in a compact binary file.
+"""
+import base64
+import gzip
+import json
+import os
+import struct
+import xml.etree.ElementTree as ET
+import zlib
+from src.settings import *
+from src.io_worker import io_worker
+
+# Cache layout: header, one record per tile, then the objects as JSON
+MAP_MAGIC = b'SRXM'
+MAP_VERSION = 1
+HEADER = struct.Struct('<4sBqqHHHHI')  # magic, version, TMX mtime (ns), TMX size, map width, height, tile width, height, tile count
+TILE = struct.Struct('<HHB')            # column, row, tile kind
+
+# Tile kinds, from the tileset's 'type' of each tile
+TILE_SOLID = 1
+TILE_HAZARD = 2
+TILE_KINDS = {'solid': TILE_SOLID, 'hazard': TILE_HAZARD}
+
+# Tiled keeps flip flags in the top bits of a gid
+GID_MASK = 0x0FFFFFFF
+
+# Maps already loaded this session, by path
+loaded_maps = {}
+
+class TMXMap:
+    def __init__(self, width, height, tile_width, tile_height, tiles, objects):
+        # Size in tiles, tiles as (column, row, kind), objects as dicts with type, x, y and properties
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.tiles = tiles
+        self.objects = objects
+
+
+def property_value(prop):
+    """Convert a Tiled property to its declared type"""
+    value = prop.get('value', prop.text or "")
+    kind = prop.get('type')
+    if kind == 'int':
+        return int(value)
+    if kind == 'float':
+        return float(value)
+    if kind == 'bool':
+        return value == 'true'
+
+    if kind is not None:
+        return value
+
+    # Untyped numbers from older Tiled versions
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def read_properties(element):
+    """Get the properties of a map element as a dict"""
+    return {prop.get('name'): property_value(prop) for prop in element.findall('properties/property')}
+
+
+def read_tileset(element, directory):
+    """Get the kind of every typed tile in a tileset, by local tile id"""
+    # External tilesets keep their tiles in a .tsx file
+    if element.get('source'):
+        element = ET.parse(os.path.join(directory, element.get('source'))).getroot()
+
+    kinds = {}
+    for tile in element.findall('tile'):
+        kind = read_properties(tile).get('type') or tile.get('type') or tile.get('class')
+        if kind in TILE_KINDS:
+            kinds[int(tile.get('id'))] = TILE_KINDS[kind]
+    return kinds
+
+
+def read_layer_data(data):
+    """Get the gids of a tile layer in row order"""
+    encoding = data.get('encoding')
+    if encoding == 'csv':
+        return [int(gid) for gid in data.text.replace("\n", "").split(",") if gid.strip()]
+    if encoding == 'base64':
+        raw = base64.b64decode(data.text.strip())
+        compression = data.get('compression')
+        if compression == 'zlib':
+            raw = zlib.decompress(raw)
+        elif compression == 'gzip':
+            raw = gzip.decompress(raw)
+        elif compression:
+            raise ValueError(f"Unsupported layer compression: {compression}")
+        return list(struct.unpack(f'<{len(raw) // 4}I', raw))
+
+    # Plain XML, one element per tile
+    return [int(tile.get('gid', 0)) for tile in data.findall('tile')]
+
+
+def parse_tmx(path):
+    """Parse a TMX file, without loading any tileset images"""
+    root = ET.parse(path).getroot()
+    directory = os.path.dirname(path)
+    width, height = int(root.get('width')), int(root.get('height'))
+
+    # Tile kinds by global id
+    kinds = {}
+    for tileset in root.findall('tileset'):
+        first_gid = int(tileset.get('firstgid'))
+        for tile_id, kind in read_tileset(tileset, directory).items():
+            kinds[first_gid + tile_id] = kind
+
+    # Later layers override earlier ones where both have a typed tile
+    tile_kinds = {}
+    for layer in root.iter('layer'):
+        if layer.get('visible') == '0':
+            continue
+        for index, gid in enumerate(read_layer_data(layer.find('data'))):
+            kind = kinds.get(gid & GID_MASK)
+            if kind:
+                tile_kinds[(index % width, index // width)] = kind
+    tiles = sorted((column, row, kind) for (column, row), kind in tile_kinds.items())
+
+    objects = []
+    for obj in root.iter('object'):
+        y = float(obj.get('y', 0))
+
+        # Tile objects are placed by their bottom left corner
+        if obj.get('gid'):
+            y -= float(obj.get('height', 0))
+        objects.append({'type': obj.get('type') or obj.get('class') or obj.get('name', ''),
+                        'x': float(obj.get('x', 0)), 'y': y, 'properties': read_properties(obj)})
+
+    return TMXMap(width, height, int(root.get('tilewidth')), int(root.get('tileheight')), tiles, objects)
+
+
+def cache_path(path):
+    """Get the cache file of a TMX file, named after its full path"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(MAP_CACHE_PATH, f"{name}-{zlib.crc32(os.path.abspath(path).encode()):08x}.map")
+
+
+def write_map_cache(path, stat, tmx_map):
+    """Write a parsed map to its cache file (I/O worker thread)"""
+    target = cache_path(path)
+    temp_path = target + ".tmp"
+    try:
+        os.makedirs(MAP_CACHE_PATH, exist_ok=True)
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAP_MAGIC, MAP_VERSION, stat.st_mtime_ns, stat.st_size, tmx_map.width, tmx_map.height,
+                                tmx_map.tile_width, tmx_map.tile_height, len(tmx_map.tiles)))
+            f.write(b''.join(TILE.pack(*tile) for tile in tmx_map.tiles))
+            f.write(json.dumps(tmx_map.objects).encode())
+        os.replace(temp_path, target)
+    except IOError as e:
+        print(f"Error writing map cache: {e}")
+
+
+def read_map_cache(path, stat):
+    """Read a parsed map from its cache file, or None if there is none for this version of the TMX file"""
+    try:
+        with open(cache_path(path), 'rb') as f:
+            data = f.read()
+    except IOError:
+        return None
+
+    if len(data) < HEADER.size:
+        return None
+    magic, version, mtime_ns, size, width, height, tile_width, tile_height, count = HEADER.unpack_from(data)
+    if magic != MAP_MAGIC or version != MAP_VERSION or mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+        return None
+
+    tiles_end = HEADER.size + count * TILE.size
+    try:
+        tiles = list(TILE.iter_unpack(data[HEADER.size:tiles_end]))
+        objects = json.loads(data[tiles_end:])
+    except (struct.error, ValueError):
+        return None
+    return TMXMap(width, height, tile_width, tile_height, tiles, objects)
+
+
+def load_tmx_map(path):
+    """Load a TMX map, from the cache if the file hasn't changed since it was parsed"""
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = loaded_maps.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    tmx_map = read_map_cache(path, stat)
+    if tmx_map is None:
+        tmx_map = parse_tmx(path)
+        io_worker.submit(write_map_cache, path, stat, tmx_map)
+    loaded_maps[path] = (key, tmx_map)
+    return tmx_map
@@ -41,6 +41,17 @@ class UI:
         self.powerup_message = ""
         self.powerup_display_time = 0
         self.powerup_duration = 3000  # Display for 3 seconds
+        
+        # Countdown graphics, pre-rendered by prepare_countdown()
+        self.countdown_overlay = None
+        self.countdown_digits = {}
+        
+        # Split delta graphic, rendered once per split
+        self.split_key = None
+        self.split_surface = None
+        
+        # Screen areas the HUD and countdown covered in the last frame they were drawn
+        self.hud_rects = []
     
     def create_main_menu(self):
         """Create a modern main menu"""
@@ -199,7 +210,10 @@ class UI:
         self.victory_best_label = self.victory_menu.add.label(
             'Best Time: 00:00.000', font_size=40, font_color=(255, 215, 0))
         
-        self.victory_menu.add.vertical_margin(25)
+        self.victory_rank_label = self.victory_menu.add.label(
+            'First recorded run', font_size=28, font_color=(180, 230, 180))
+        
+        self.victory_menu.add.vertical_margin(20)
         
         # Add buttons
         self.victory_menu.add.button('NEXT LEVEL', self.next_level, font_size=40)
@@ -248,7 +262,7 @@ class UI:
             
         self.powerup_display_time = pygame.time.get_ticks()
     
-    def draw_hud(self, lives, current_level):
+    def draw_hud(self, lives, current_level, split=None):
         """Draw the HUD (heads-up display)"""
         # Create a semi-transparent HUD background
         hud_height = 70
@@ -263,6 +277,7 @@ class UI:
         pygame.draw.line(hud_surface, (100, 150, 255, 150), (0, hud_height-1), (WIDTH, hud_height-1), 2)
         
         self.screen.blit(hud_surface, (0, 0))
+        self.hud_rects = [pygame.Rect(0, 0, WIDTH, hud_height)]
         
         # Draw lives with heart icons
         lives_text = self.font_medium.render("LIVES:", True, (220, 220, 255))
@@ -308,6 +323,10 @@ class UI:
             self.screen.blit(shadow_text, shadow_rect)
             self.screen.blit(timer_text, timer_rect)
         
+        # Draw the last split's delta under the timer
+        if split is not None:
+            self.draw_split(split)
+        
         # Draw powerup notification if active
         current_time = pygame.time.get_ticks()
         if current_time - self.powerup_display_time < self.powerup_duration:
@@ -336,6 +355,7 @@ class UI:
             
             self.screen.blit(bg_surface, bg_rect)
             self.screen.blit(powerup_text, text_rect)
+            self.hud_rects.append(bg_rect)
     
     def draw_heart(self, pos, scale=1.0):
         """Draw a heart icon for lives"""
@@ -396,8 +416,8 @@ class UI:
         self.paused_time = 0
         self.current_time = 0
     
-    def update_victory_menu(self, current_time, best_time):
-        """Update the victory menu with current and best times"""
+    def update_victory_menu(self, current_time, best_time, percentile=None, median_time=None):
+        """Update the victory menu with current and best times, and how the run compares to all others"""
         # Format times
         current_time_str = self.format_time(current_time)
         best_time_str = self.format_time(best_time) if best_time else "None"
@@ -405,33 +425,66 @@ class UI:
         # Update labels
         self.victory_time_label.set_title(f"Your Time: {current_time_str}")
         self.victory_best_label.set_title(f"Best Time: {best_time_str}")
+        if percentile is None:
+            self.victory_rank_label.set_title("First recorded run")
+        else:
+            self.victory_rank_label.set_title(
+                f"Faster than {percentile:.0f}% of runs  -  Median {self.format_time(median_time)}")
+        
+    def draw_split(self, split):
+        """Draw a split delta, green when ahead of the personal best, red when behind, gold for a best segment"""
+        if split != self.split_key:
+            delta, kind = split
+            colors = {'gold': (255, 215, 0), 'ahead': (80, 255, 120), 'behind': (255, 90, 90)}
+            sign = "-" if delta < 0 else "+"
+            text = self.font_medium.render(f"{sign}{self.format_time(abs(delta))}", True, colors[kind])
+            
+            # Background and text are combined once, each frame is a single blit
+            self.split_surface = pygame.Surface((text.get_width() + 20, text.get_height() + 10), pygame.SRCALPHA)
+            self.split_surface.fill((0, 0, 0, 150))
+            self.split_surface.blit(text, (10, 5))
+            self.split_key = split
         
-    def draw_countdown(self, count):
-        """Draw countdown before level starts"""
-        # Create a darkening overlay
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150))
-        self.screen.blit(overlay, (0, 0))
+        self.hud_rects.append(self.screen.blit(self.split_surface, self.split_surface.get_rect(topright=(WIDTH - 5, 80))))
+    
+    def prepare_countdown(self):
+        """Pre-render the countdown overlay and digits so drawing them is just blits"""
+        if self.countdown_overlay is not None:
+            return
         
-        # Draw the number
         count_size = 150
         count_font = pygame.font.Font(None, count_size)
         
-        # Draw shadow
-        shadow_text = count_font.render(str(count), True, (0, 0, 0))
-        shadow_rect = shadow_text.get_rect(center=(WIDTH/2 + 5, HEIGHT/2 + 5))
-        self.screen.blit(shadow_text, shadow_rect)
-        
-        # Draw main text
-        count_text = count_font.render(str(count), True, (255, 255, 0))
-        count_rect = count_text.get_rect(center=(WIDTH/2, HEIGHT/2))
-        self.screen.blit(count_text, count_rect)
+        # Create a darkening overlay
+        self.countdown_overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        self.countdown_overlay.fill((0, 0, 0, 150))
         
         # Add a circle background
         circle_radius = count_size
-        pygame.draw.circle(self.screen, (0, 0, 100, 150), (WIDTH/2, HEIGHT/2), circle_radius, 5)
+        pygame.draw.circle(self.countdown_overlay, (0, 0, 100), (WIDTH/2, HEIGHT/2), circle_radius, 5)
         
         # Add "Get Ready!" text
         ready_text = self.font_medium.render("Get Ready!", True, WHITE)
         ready_rect = ready_text.get_rect(center=(WIDTH/2, HEIGHT/2 + circle_radius + 20))
-        self.screen.blit(ready_text, ready_rect)
+        self.countdown_overlay.blit(ready_text, ready_rect)
+        
+        # Render each number with its shadow into a single frame
+        for count in range(1, 4):
+            shadow_text = count_font.render(str(count), True, (0, 0, 0))
+            count_text = count_font.render(str(count), True, (255, 255, 0))
+            count_rect = count_text.get_rect(center=(WIDTH/2, HEIGHT/2))
+            
+            frame = pygame.Surface((count_rect.width + 5, count_rect.height + 5), pygame.SRCALPHA)
+            frame.blit(shadow_text, (5, 5))
+            frame.blit(count_text, (0, 0))
+            self.countdown_digits[count] = (frame, count_rect.topleft)
+    
+    def draw_countdown(self, count):
+        """Draw countdown before level starts"""
+        self.prepare_countdown()
+        self.screen.blit(self.countdown_overlay, (0, 0))
+        self.hud_rects.append(self.screen.get_rect())
+        
+        if count in self.countdown_digits:
+            frame, pos = self.countdown_digits[count]
+            self.screen.blit(frame, pos)
@@ -0,0 +1,101 @@
+"""
+World renderer module for SpeedRunner X.
+Caches the static terrain layer and reuses it between frames.
+"""
+import pygame
+import math
+from src.settings import *
+from src.tiles import Tile, Hazard
+
+class TerrainCache:
+    def __init__(self, sprites, scale=1.0, column_width=TERRAIN_COLUMN_WIDTH):
+        # Static terrain bucketed by the world column its left edge falls in
+        self.column_width = column_width
+        self.columns = {}
+        self.max_width = 0
+
+        for order, sprite in enumerate(sprites):
+            image, rect = sprite.image, sprite.rect.copy()
+            
+            # Store terrain already scaled to the world render resolution
+            if scale != 1:
+                rect = pygame.Rect(math.floor(rect.x * scale), math.floor(rect.y * scale),
+                                   math.ceil(rect.width * scale), math.ceil(rect.height * scale))
+                image = pygame.transform.scale(image, rect.size)
+            
+            column = rect.left // column_width
+            self.columns.setdefault(column, []).append((order, image, rect))
+            self.max_width = max(self.max_width, rect.width)
+
+    @staticmethod
+    def is_static(sprite):
+        """Check if a sprite never moves or animates and can be cached"""
+        if isinstance(sprite, Tile):
+            return True
+        return isinstance(sprite, Hazard) and sprite.hazard_type == 'spike'
+
+    def draw_region(self, surface, world_rect, offset):
+        """Blit every cached terrain piece overlapping world_rect"""
+        # Sprites are indexed by their left edge, so widen the search to the left
+        first = (world_rect.left - self.max_width) // self.column_width
+        last = world_rect.right // self.column_width
+
+        # Keep the original creation order so overlapping pieces stack the same way
+        pieces = []
+        for column in range(first, last + 1):
+            for piece in self.columns.get(column, ()):
+                if piece[2].colliderect(world_rect):
+                    pieces.append(piece)
+        pieces.sort(key=lambda piece: piece[0])
+        
+        for order, image, rect in pieces:
+            surface.blit(image, (rect.x + offset[0], rect.y + offset[1]))
+
+
+class ScrollingWorldRenderer:
+    def __init__(self, size, terrain_cache):
+        self.terrain_cache = terrain_cache
+        self.width, self.height = size
+
+        # Terrain layer from the previous frame, transparent where there is no terrain
+        self.buffer = pygame.Surface(size)
+        self.buffer.set_colorkey(TERRAIN_COLORKEY)
+        self.last_offset = None
+
+    def invalidate(self):
+        """Force a full repaint on the next frame"""
+        self.last_offset = None
+
+    def repaint(self, screen_rect, offset):
+        """Redraw one screen-space region of the terrain buffer"""
+        self.buffer.set_clip(screen_rect)
+        self.buffer.fill(TERRAIN_COLORKEY, screen_rect)
+        world_rect = screen_rect.move(-offset[0], -offset[1])
+        self.terrain_cache.draw_region(self.buffer, world_rect, offset)
+        self.buffer.set_clip(None)
+
+    def draw(self, surface, offset):
+        """Bring the terrain buffer up to date with the camera and blit it"""
+        if self.last_offset is None:
+            self.repaint(pygame.Rect(0, 0, self.width, self.height), offset)
+        else:
+            dx = offset[0] - self.last_offset[0]
+            dy = offset[1] - self.last_offset[1]
+
+            if abs(dx) >= self.width or abs(dy) >= self.height:
+                # Camera jumped further than a screen (e.g. respawn), nothing to reuse
+                self.repaint(pygame.Rect(0, 0, self.width, self.height), offset)
+            elif dx or dy:
+                # Shift last frame's pixels and repaint only the exposed edges
+                self.buffer.scroll(dx, dy)
+                if dx > 0:
+                    self.repaint(pygame.Rect(0, 0, dx, self.height), offset)
+                elif dx < 0:
+                    self.repaint(pygame.Rect(self.width + dx, 0, -dx, self.height), offset)
+                if dy > 0:
+                    self.repaint(pygame.Rect(0, 0, self.width, dy), offset)
+                elif dy < 0:
+                    self.repaint(pygame.Rect(0, self.height + dy, self.width, -dy), offset)
+
+        self.last_offset = offset
+        surface.blit(self.buffer, (0, 0))
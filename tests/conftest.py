@@ -0,0 +1,32 @@
+"""
+Test setup for SpeedRunner X.
+Runs pygame headless and makes the src package importable.
+"""
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pygame
+import pytest
+from src.recorder import PositionRecorder
+
+@pytest.fixture(scope="session", autouse=True)
+def pygame_session():
+    """Initialise pygame once for the whole test run"""
+    pygame.init()
+    yield
+    pygame.quit()
+
+
+@pytest.fixture
+def make_ghost():
+    """Get a builder of straight runs ending at a given time"""
+    def make_ghost(run_time):
+        recorder = PositionRecorder()
+        for t in range(0, run_time + 1, 100):
+            recorder.append(t, t // 10, 300, 0)
+        return recorder
+    return make_ghost
@@ -0,0 +1,24 @@
+"""
+Tests of the ghost comparison splits.
+"""
+import warnings
+import numpy as np
+from src.ghost_compare import sum_of_best
+
+def test_sum_of_best_picks_the_fastest_section_times():
+    splits = np.array([[1000.0, 2000.0], [1200.0, 1800.0]])
+    best, holders, total = sum_of_best(splits)
+    assert best.tolist() == [1000.0, 1800.0]
+    assert holders.tolist() == [0, 1]
+    assert total == 2800.0
+
+
+def test_sum_of_best_skips_sections_no_run_reached():
+    splits = np.array([[1000.0, np.nan, np.nan], [1200.0, 900.0, np.nan]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        best, holders, total = sum_of_best(splits)
+    assert best[:2].tolist() == [1000.0, 900.0]
+    assert np.isnan(best[2])
+    assert holders.tolist() == [0, 1, -1]
+    assert total == 1900.0
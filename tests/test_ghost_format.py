@@ -0,0 +1,21 @@
+"""
+Tests of the binary ghost format.
+"""
+import io
+import pytest
+from src.ghost_format import GhostEncoder, encode_ghost, decode_ghost
+from src.recorder import PositionRecorder
+
+def test_large_deltas_round_trip():
+    recorder = PositionRecorder()
+    for time, x, y in ((0, 0, 0), (100000, 50000, -40000), (100016, 50004, -40000)):
+        recorder.append(time, x, y, 1)
+    decoded = decode_ghost(encode_ghost(recorder))
+    assert [list(column) for column in decoded.columns()] == [list(column) for column in recorder.columns()]
+
+
+def test_negative_time_delta_is_rejected():
+    encoder = GhostEncoder(io.BytesIO(), compress=False)
+    encoder.write([0, 100], [0, 10], [0, 0], [0, 0])
+    with pytest.raises(ValueError):
+        encoder.write([50], [20], [0], [0])
@@ -0,0 +1,51 @@
+"""
+Tests of the ghost library pack and manifest.
+"""
+import os
+import pytest
+from src.ghost_format import encode_ghost
+from src.ghost_library import GhostLibrary
+
+@pytest.fixture
+def library(tmp_path):
+    library = GhostLibrary(str(tmp_path))
+    library.load_manifest()
+    return library
+
+
+def reload(library):
+    reloaded = GhostLibrary(library.directory)
+    reloaded.load_manifest()
+    return reloaded
+
+
+def test_runs_are_listed_from_the_manifest_and_read_lazily(library, make_ghost):
+    for run_time in (3000, 2000):
+        library.apply_entry(library.append(encode_ghost(make_ghost(run_time)), "level1", run_time))
+    entries = reload(library).runs("level1")
+    assert [entry['time'] for entry in entries] == [2000, 3000]
+    assert list(library.read(entries[0]).columns()[0])[-1] == 2000
+
+
+def test_torn_manifest_line_is_cut_before_the_next_entry(library, make_ghost):
+    library.apply_entry(library.append(encode_ghost(make_ghost(1000)), "level1", 1000))
+    with open(library.manifest_path, 'a') as f:
+        f.write('{"id": "torn", "level": "lev')
+
+    # Reading the manifest repairs it, so later entries aren't glued onto the fragment
+    library = reload(library)
+    library.apply_entry(library.append(encode_ghost(make_ghost(2000)), "level1", 2000))
+    library.apply_entry(library.append(encode_ghost(make_ghost(3000)), "level1", 3000))
+    assert [entry['time'] for entry in reload(library).runs("level1")] == [1000, 2000, 3000]
+
+
+def test_given_ids_survive_compaction(library, make_ghost):
+    entries = [library.append(encode_ghost(make_ghost(t)), "level1", t, entry_id=f"run{t}") for t in (1000, 2000, 3000)]
+    library.apply_entries(entries)
+    library.remove(entries[1])
+    library.compact()
+
+    compacted = reload(library)
+    assert [entry['id'] for entry in compacted.runs("level1")] == ["run1000", "run3000"]
+    assert list(compacted.read(compacted.runs("level1")[1]).columns()[0])[-1] == 3000
+    assert os.path.basename(compacted.pack_path) != "ghosts.pack"
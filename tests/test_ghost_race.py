@@ -0,0 +1,83 @@
+"""
+Tests of the ghost race picking its runs from the ghost library manifest.
+"""
+import os
+import pygame
+import pytest
+from src.settings import *
+from src import ghost
+from src.ghost import GhostRace
+from src.ghost_format import encode_ghost, write_ghost_file
+from src.ghost_library import GhostLibrary
+from src.io_worker import io_worker
+
+def settle():
+    """Finish queued I/O and run its callbacks, twice for loads that queue a second read"""
+    for _ in range(2):
+        io_worker.wait()
+        io_worker.poll()
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(ghost, "GHOST_RUNS_PATH", str(tmp_path / "ghost_runs"))
+    library = GhostLibrary(str(tmp_path / "library"))
+    library.load_manifest()
+    yield library
+    settle()
+
+
+def test_race_loads_only_the_fastest_runs(library, monkeypatch, make_ghost):
+    for run_time in (5000, 3000, 4000, 6000):
+        library.apply_entry(library.append(encode_ghost(make_ghost(run_time)), "level1", run_time))
+    library.apply_entry(library.append(encode_ghost(make_ghost(1000)), "level2", 1000))
+    library.apply_entry(library.append(encode_ghost(make_ghost(2000)), "level1", 2000, "Friend", "import"))
+
+    read = []
+    original_read = library.read
+    monkeypatch.setattr(library, "read", lambda entry: read.append(entry['time']) or original_read(entry))
+
+    race = GhostRace([pygame.sprite.Group()], "level1", library, count=2)
+    settle()
+    assert read == [3000, 4000]
+    assert [g.position_data.times[len(g.position_data) - 1] for g in race.ghosts] == [3000, 4000]
+
+
+def test_saved_ghost_is_raced_on_the_next_load(library, make_ghost):
+    race = GhostRace([pygame.sprite.Group()], "level1", library)
+    settle()
+    assert len(race) == 0
+
+    ghost_id = race.save_ghost_data("level1", make_ghost(2500), 2500)
+    race.load()
+    settle()
+    assert [(entry['id'], entry['time']) for entry in library.runs("level1")] == [(ghost_id, 2500)]
+    assert len(race) == 1
+
+
+def test_prune_keeps_personal_bests(library, make_ghost):
+    for run_time, record in ((3000, True), (4000, False), (5000, False)):
+        library.apply_entry(library.append(encode_ghost(make_ghost(run_time)), "level1", run_time, record=record))
+    race = GhostRace([pygame.sprite.Group()], "level1", library)
+    settle()
+
+    race.prune("level1", [1000, 2000, 4000])
+    assert [entry['time'] for entry in library.runs("level1")] == [3000, 4000]
+    settle()
+
+    # The removal is in the manifest too
+    reloaded = GhostLibrary(library.directory)
+    reloaded.load_manifest()
+    assert [entry['time'] for entry in reloaded.runs("level1")] == [3000, 4000]
+
+
+def test_ghost_files_are_moved_into_the_library(library, make_ghost):
+    os.makedirs(ghost.GHOST_RUNS_PATH)
+    write_ghost_file(os.path.join(ghost.GHOST_RUNS_PATH, "level1_4200.ghost"), make_ghost(4200))
+    write_ghost_file(os.path.join(ghost.GHOST_RUNS_PATH, "level2_ghost.ghost"), make_ghost(3100))
+    write_ghost_file(os.path.join(ghost.GHOST_RUNS_PATH, "notes.ghost"), make_ghost(100))
+
+    library.apply_entries(GhostRace.import_ghost_files(library))
+    assert [(e['level'], e['time'], e['record']) for e in library.runs()] == [("level2", 3100, True),
+                                                                               ("level1", 4200, False)]
+    assert sorted(os.listdir(ghost.GHOST_RUNS_PATH)) == ["notes.ghost"]
@@ -0,0 +1,43 @@
+"""
+Tests of ghost recordings streamed to disk.
+"""
+import os
+import pytest
+from src.ghost_format import read_ghost_file, write_ghost_file
+from src.ghost_stream import GhostStream
+
+@pytest.fixture
+def stream(tmp_path):
+    return GhostStream(str(tmp_path))
+
+
+def chunk(start):
+    return [start, start + 100], [0, 10], [300, 300], [0, 0]
+
+
+def test_stream_is_moved_into_place(stream, tmp_path):
+    path = str(tmp_path / "level1_200.ghost")
+    stream.write_chunk(*chunk(0))
+    stream.write_chunk(*chunk(200))
+    stream.finish_file(path)
+    assert list(read_ghost_file(path).columns()[0]) == [0, 100, 200, 300]
+    assert os.listdir(tmp_path) == ["level1_200.ghost"]
+
+
+def test_failed_write_never_replaces_a_ghost(stream, tmp_path, monkeypatch, make_ghost):
+    path = str(tmp_path / "level1_200.ghost")
+    write_ghost_file(path, make_ghost(200))
+    good = open(path, 'rb').read()
+
+    stream.write_chunk(*chunk(0))
+    def fail(*args):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(stream.encoder, "write", fail)
+    stream.write_chunk(*chunk(200))
+    assert stream.failed
+
+    # Later chunks don't start a new, truncated recording
+    stream.write_chunk(*chunk(400))
+    stream.finish_file(path)
+    assert open(path, 'rb').read() == good
+    assert os.listdir(tmp_path) == ["level1_200.ghost"]
@@ -0,0 +1,84 @@
+"""
+Tests of the journaled JSON leaderboard and its crash recovery.
+"""
+import json
+import os
+import pytest
+from src.settings import *
+from src.leaderboard import Leaderboard, LeaderboardJournal
+from src.io_worker import io_worker
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Keep the leaderboard files of each test in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(LEADERBOARD_JOURNAL_PATH))
+    yield tmp_path
+    io_worker.wait()
+    io_worker.poll()
+
+
+def write_journal(*lines):
+    with open(LEADERBOARD_JOURNAL_PATH, 'w') as f:
+        f.write("".join(lines))
+
+
+def test_torn_tail_is_cut_before_new_records(workdir):
+    write_journal('{"seq": 1, "level": "lev')
+    journal = LeaderboardJournal()
+    attempts, sketches, imported = journal.recover()
+    assert attempts is None
+
+    for time_ms in (4000, 4100, 4200):
+        journal.append("level1", time_ms)
+    journal.close()
+
+    attempts, sketches, imported = LeaderboardJournal().recover()
+    assert attempts == {"level1": [4000, 4100, 4200]}
+
+
+def test_torn_tail_after_complete_records(workdir):
+    write_journal('{"seq": 1, "level": "level1", "time": 5000}\n', '{"seq": 2, "le')
+    journal = LeaderboardJournal()
+    assert journal.recover()[0] == {"level1": [5000]}
+    journal.append("level2", 6000)
+    journal.close()
+
+    assert LeaderboardJournal().recover()[0] == {"level1": [5000], "level2": [6000]}
+
+
+def test_journal_is_replayed_on_top_of_the_snapshot(workdir):
+    with open(LEADERBOARD_PATH, 'w') as f:
+        json.dump({'seq': 2, 'attempts': {"level1": [5000, 6000]}}, f)
+    write_journal('{"seq": 1, "level": "level1", "time": 5000}\n',
+                  '{"seq": 2, "level": "level1", "time": 6000}\n',
+                  '{"seq": 3, "level": "level1", "time": 4500}\n',
+                  '{"seq": 4, "level": "level2", "time": 7000}\n')
+
+    journal = LeaderboardJournal()
+    attempts, sketches, imported = journal.recover()
+    assert attempts == {"level1": [5000, 6000, 4500], "level2": [7000]}
+    assert sketches["level1"].count == 3
+
+    # The replay is folded into a new snapshot and the journal emptied
+    assert os.path.getsize(LEADERBOARD_JOURNAL_PATH) == 0
+    with open(LEADERBOARD_PATH, 'r') as f:
+        snapshot = json.load(f)
+    assert snapshot['seq'] == 4
+    assert snapshot['attempts'] == attempts
+
+
+def test_times_survive_a_restart(workdir):
+    leaderboard = Leaderboard()
+    io_worker.wait()
+    io_worker.poll()
+    leaderboard.add_time("level1", 5200)
+    leaderboard.add_time("level1", 4800)
+    leaderboard.close()
+    io_worker.wait()
+
+    reloaded = Leaderboard()
+    io_worker.wait()
+    io_worker.poll()
+    assert reloaded.get_times("level1") == [4800, 5200]
+    assert reloaded.get_median("level1") in (4800, 5200)
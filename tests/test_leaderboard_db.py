@@ -0,0 +1,98 @@
+"""
+Tests of the SQLite leaderboard and its background queries.
+"""
+import os
+import pytest
+from src.settings import *
+from src.io_worker import io_worker
+from src.leaderboard_db import SQLiteLeaderboard, SCHEMA_VERSION
+
+sqlite3 = pytest.importorskip("sqlite3")
+
+def settle():
+    """Finish queued I/O and run its callbacks"""
+    io_worker.wait()
+    io_worker.poll()
+
+
+@pytest.fixture
+def leaderboard(tmp_path, monkeypatch):
+    """Open a fresh database in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    leaderboard = SQLiteLeaderboard()
+    settle()
+    yield leaderboard
+    leaderboard.close()
+    settle()
+
+
+def test_schema_is_created(leaderboard):
+    db = sqlite3.connect(LEADERBOARD_DB_PATH)
+    tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    indexes = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"runs", "sketches"} <= tables
+    assert {"runs_level_time", "runs_player_level_time", "runs_player_timestamp"} <= indexes
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    db.close()
+
+
+def test_queries_run_in_the_background(leaderboard):
+    leaderboard.add_time("level1", 4000, ghost="run4000")
+
+    # Nothing is read on the game loop, the cached rows show until the worker answers
+    assert leaderboard.get_top_runs("level1") == []
+    version = leaderboard.version
+    settle()
+    assert leaderboard.version == version + 1
+    assert [(player, time, ghost) for player, time, timestamp, ghost in leaderboard.get_top_runs("level1")] == \
+        [("Player", 4000, "run4000")]
+
+    # Unchanged runs aren't read again
+    settle()
+    assert leaderboard.version == version + 1
+
+    # A new run makes the next call read again, the old rows show meanwhile
+    leaderboard.add_time("level1", 3000)
+    assert len(leaderboard.get_top_runs("level1")) == 1
+    settle()
+    assert [row[1] for row in leaderboard.get_top_runs("level1")] == [3000, 4000]
+
+
+def test_history_and_rank(leaderboard):
+    for level_name, player_name, time in (("level1", "Player", 5000), ("level1", "Friend", 3000),
+                                          ("level2", "Player", 7000), ("level1", "Player", 4000)):
+        leaderboard.add_time(level_name, time, player_name)
+
+    def read(get, *args, **kwargs):
+        get(*args, **kwargs)
+        settle()
+        return get(*args, **kwargs)
+
+    assert [row[:2] for row in read(leaderboard.get_player_history, "Player")] in (
+        [("level1", 4000), ("level2", 7000), ("level1", 5000)],
+        # Runs added within the clock's resolution share a timestamp
+        [("level1", 5000), ("level2", 7000), ("level1", 4000)])
+    assert [row[1] for row in read(leaderboard.get_player_history, "Player", "level1", count=1)] in ([4000], [5000])
+    assert read(leaderboard.get_personal_best, "level1", "Player") == 4000
+    assert read(leaderboard.get_personal_best, "level3", "Player") is None
+    assert read(leaderboard.get_rank, "level1", 3500) == 2
+    assert read(leaderboard.get_rank, "level1", 1000) == 1
+    assert read(leaderboard.get_rank, "level1", 9000) == 4
+
+
+def test_reads_see_committed_runs_during_a_write(leaderboard):
+    leaderboard.add_time("level1", 4000)
+    settle()
+
+    # Another process, like the merge tool, holds a write transaction open
+    other = sqlite3.connect(LEADERBOARD_DB_PATH)
+    other.execute("BEGIN IMMEDIATE")
+    other.execute("INSERT INTO runs (level, player, time, timestamp) VALUES ('level1', 'Other', 1000, 0)")
+
+    sql, params = "SELECT time FROM runs WHERE level = ? ORDER BY time", ("level1",)
+    assert io_worker.submit(leaderboard.read_rows, sql, params).result(timeout=5) == [(4000,)]
+
+    other.commit()
+    other.close()
+    assert io_worker.submit(leaderboard.read_rows, sql, params).result(timeout=5) == [(1000,), (4000,)]
@@ -0,0 +1,95 @@
+"""
+Tests of reading leaderboard files and merging their runs.
+"""
+import io
+import json
+import pytest
+from src.leaderboard_merge import JSONStream, read_json_runs, read_journal_runs, open_runs, merge_runs
+
+def write_json(path, data, lines=False):
+    with open(path, 'w') as f:
+        if lines:
+            f.write("".join(json.dumps(record) + "\n" for record in data))
+        else:
+            json.dump(data, f)
+    return str(path)
+
+
+def merged(sources, keep=0, loose=False):
+    stats = {}
+    runs = list(merge_runs([open_runs(path, keep) for path in sources], keep, stats, loose))
+    return runs, stats.get('duplicates', 0)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 65536])
+def test_stream_decodes_values_across_chunks(chunk_size):
+    text = '{"seq": 12345, "attempts": {"level1": [4000, 31000], "level2": [ 7 , {"time": 8} ]}, "sketches": {"local": {}}, "end": [1.5e3]}'
+    stream = JSONStream(io.StringIO(text), chunk_size)
+    seen = []
+    for key in stream.keys():
+        if key == "attempts":
+            for level in stream.keys():
+                for run_time in stream.elements():
+                    seen.append((level, run_time))
+        else:
+            seen.append((key, stream.value()))
+    assert seen == [("seq", 12345), ("level1", 4000), ("level1", 31000), ("level2", 7), ("level2", {"time": 8}),
+                    ("sketches", {"local": {}}), ("end", [1500.0])]
+    assert stream.peek() == ""
+
+
+def test_every_json_format_is_read(tmp_path):
+    snapshot = write_json(tmp_path / "snapshot.json", {'seq': 3, 'attempts': {'level1': [5000, 4000]},
+                                                      'sketches': {'local': {}, 'imported': {}}})
+    plain = write_json(tmp_path / "plain.json", {'level2': [{'time': 3000, 'player': "Ann"}, 3500]})
+    server = write_json(tmp_path / "server.json", [{'id': "a1", 'level': "level1", 'player': "Bob", 'time': 4200}])
+    assert list(read_json_runs(snapshot)) == [("level1", 5000, "Player", ""), ("level1", 4000, "Player", "")]
+    assert list(read_json_runs(plain)) == [("level2", 3000, "Ann", ""), ("level2", 3500, "Player", "")]
+    assert list(read_json_runs(server)) == [("level1", 4200, "Bob", "a1")]
+
+
+def test_only_the_fastest_runs_of_each_level_are_kept(tmp_path):
+    path = write_json(tmp_path / "plain.json", {'level1': [5000, 3000, 4000, 6000], 'level2': [9000, 8000]})
+    assert list(open_runs(path, 2)) == [("level1", 3000, "Player", ""), ("level1", 4000, "Player", ""),
+                                        ("level2", 8000, "Player", ""), ("level2", 9000, "Player", "")]
+
+
+def test_runs_with_ids_are_kept_once_per_id(tmp_path):
+    # Two cabinets each had a run with the same time, and one of them already reached the server
+    server = write_json(tmp_path / "server.json", [{'id': "a", 'level': "level1", 'player': "Player", 'time': 4000}])
+    outbox_a = write_json(tmp_path / "a.jsonl", [{'id': "a", 'level': "level1", 'player': "Player", 'time': 4000}],
+                          lines=True)
+    outbox_b = write_json(tmp_path / "b.jsonl", [{'id': "b", 'level': "level1", 'player': "Player", 'time': 4000},
+                                                 {'id': "c", 'level': "level1", 'player': "Player", 'time': 5000}],
+                          lines=True)
+    assert list(read_journal_runs(outbox_b))[0] == ("level1", 4000, "Player", "b")
+
+    runs, duplicates = merged([server, outbox_a, outbox_b])
+    assert runs == [("level1", 4000, "Player"), ("level1", 4000, "Player"), ("level1", 5000, "Player")]
+    assert duplicates == 1
+
+
+def test_runs_without_ids_are_only_deduplicated_when_loose(tmp_path):
+    board = {'level1': [4000, 4000, 5000]}
+    original = write_json(tmp_path / "leaderboard.json", board)
+    backup = write_json(tmp_path / "backup.json", board)
+
+    runs, duplicates = merged([original, backup])
+    assert [run[1] for run in runs] == [4000, 4000, 4000, 4000, 5000, 5000]
+    assert duplicates == 0
+
+    # Repeats within one file stay, copies across files are dropped
+    runs, duplicates = merged([original, backup], loose=True)
+    assert [run[1] for run in runs] == [4000, 4000, 5000]
+    assert duplicates == 3
+
+    runs, duplicates = merged([original, backup], keep=2, loose=True)
+    assert [run[1] for run in runs] == [4000, 4000]
+
+
+@pytest.mark.parametrize("chunk_size", [5, 64, 65536])
+def test_stream_reads_runs_with_brackets_in_names(chunk_size):
+    runs = [{'id': f"r{i}", 'level': "level1", 'player': name, 'time': 1000 + i}
+            for i, name in enumerate(["Ann", "[x], y", "]", ",", "Bob"] * 20)]
+    stream = JSONStream(io.StringIO(json.dumps(runs)), chunk_size)
+    assert list(stream.elements()) == runs
@@ -0,0 +1,232 @@
+"""
+Integration tests of the remote leaderboard client against the reference server in tools/.
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import threading
+import time
+import pytest
+from src.settings import *
+from src import leaderboard_remote
+from src.leaderboard_remote import RemoteLeaderboard, HTTPConnectionPool
+from src.io_worker import io_worker
+
+# Load the reference server from tools/, it isn't part of the src package
+SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools", "leaderboard_server.py")
+spec = importlib.util.spec_from_file_location("leaderboard_server", SERVER_PATH)
+leaderboard_server = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(leaderboard_server)
+
+class ServerThread:
+    def __init__(self, port=0):
+        # Runs the reference server on its own event loop, recording the status of every request
+        self.store = leaderboard_server.LeaderboardStore()
+        self.server = leaderboard_server.LeaderboardServer(self.store)
+        self.requests = []
+        route = self.server.route
+
+        def recording_route(method, target, headers, body):
+            status, response_headers, payload = route(method, target, headers, body)
+            self.requests.append((method, target, status))
+            return status, response_headers, payload
+        self.server.route = recording_route
+
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        async def start():
+            self.asyncio_server = await asyncio.start_server(self.server.handle_connection, "127.0.0.1", port)
+            started.set()
+
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(start(), self.loop).result(5)
+        started.wait(5)
+        self.port = self.asyncio_server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+
+    def stop(self):
+        """Close the server and its event loop"""
+        async def close():
+            # Kept-alive connections are still being served, end them along with the server
+            self.asyncio_server.close()
+            connections = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in connections:
+                task.cancel()
+            await asyncio.gather(*connections, return_exceptions=True)
+            await self.asyncio_server.wait_closed()
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    def gets(self, status=None):
+        """Get the leaderboard requests served so far, optionally only those answered with status"""
+        return [r for r in self.requests if r[0] == "GET" and (status is None or r[2].startswith(status))]
+
+
+def free_port():
+    """Find a port nothing listens on"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(condition, timeout=5.0):
+    """Run game loop callbacks until condition() holds"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        io_worker.poll()
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Keep the leaderboard files of each test in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(leaderboard_remote, "LEADERBOARD_REMOTE_RETRY", 0.2)
+    yield tmp_path
+    # Background writes use relative paths, finish them before leaving the directory
+    io_worker.wait()
+    io_worker.poll()
+
+
+@pytest.fixture
+def server():
+    server = ServerThread()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def clients():
+    """Close every client a test creates"""
+    created = []
+    yield created
+    for client in created:
+        client.close()
+
+
+def test_submit_and_fetch(workdir, server, clients):
+    client = RemoteLeaderboard(server.url)
+    clients.append(client)
+    client.add_time("level1", 4321, "Ann")
+
+    assert wait_for(lambda: [run['time'] for run in client.remote_runs.get("level1", [])] == [4321])
+    assert wait_for(lambda: not client.unsent)
+    assert client.get_board_times("level1") == [4321]
+    assert [(run['player'], run['time']) for run in server.store.top("level1", 5)] == [("Ann", 4321)]
+
+
+def test_runs_from_other_clients_show_up(workdir, server, clients, monkeypatch):
+    monkeypatch.setattr(leaderboard_remote, "LEADERBOARD_REMOTE_TTL", 0.2)
+    server.store.add({'id': "other", 'level': "level2", 'player': "Bob", 'time': 999, 'timestamp': 0})
+    client = RemoteLeaderboard(server.url)
+    clients.append(client)
+    assert wait_for(lambda: client.get_board_times("level2") == [999])
+
+
+def test_etag_revalidation(workdir, server):
+    pool = HTTPConnectionPool(server.url)
+    path = f"/leaderboard/level1?limit={LEADERBOARD_SIZE}"
+
+    status, headers, data = pool.request("GET", path)
+    assert status == 200
+    etag = headers["ETag"]
+    assert json.loads(data)['runs'] == []
+
+    # Unchanged level: 304 and no body
+    status, headers, data = pool.request("GET", path, headers={"If-None-Match": etag})
+    assert status == 304
+    assert data == b""
+    assert headers["ETag"] == etag
+
+    # A new run changes the ETag
+    pool.request("POST", "/runs", [{'id': "a", 'level': "level1", 'player': "Ann", 'time': 5000, 'timestamp': 0}])
+    status, headers, data = pool.request("GET", path, headers={"If-None-Match": etag})
+    assert status == 200
+    assert headers["ETag"] != etag
+    assert [run['time'] for run in json.loads(data)['runs']] == [5000]
+    pool.close()
+
+
+def test_ttl_cache_skips_requests_until_expired(workdir, server, clients, monkeypatch):
+    monkeypatch.setattr(leaderboard_remote, "LEADERBOARD_REMOTE_TTL", 60.0)
+    client = RemoteLeaderboard(server.url)
+    clients.append(client)
+
+    # One fetch per level, then nothing while the cache is fresh
+    assert wait_for(lambda: len(server.gets()) >= LEVEL_COUNT)
+    time.sleep(0.5)
+    assert len(server.gets()) == LEVEL_COUNT
+
+
+def test_expired_cache_revalidates_with_etag(workdir, server, clients, monkeypatch):
+    monkeypatch.setattr(leaderboard_remote, "LEADERBOARD_REMOTE_TTL", 0.2)
+    client = RemoteLeaderboard(server.url)
+    clients.append(client)
+
+    # Nothing changed on the server, so refreshes after the TTL are answered with 304
+    assert wait_for(lambda: len(server.gets("304")) >= LEVEL_COUNT)
+    assert len(server.gets("200")) == LEVEL_COUNT
+
+
+def test_outbox_replays_after_server_was_down(workdir, clients, monkeypatch):
+    port = free_port()
+
+    # Offline: the run is kept in the outbox and still shown on the board
+    client = RemoteLeaderboard(f"http://127.0.0.1:{port}")
+    client.add_time("level1", 7777)
+    assert wait_for(lambda: os.path.exists(LEADERBOARD_OUTBOX_PATH) and os.path.getsize(LEADERBOARD_OUTBOX_PATH) > 0)
+    assert client.get_board_times("level1") == [7777]
+    assert list(client.unsent.values())[0]['time'] == 7777
+    client.close()
+
+    with open(LEADERBOARD_OUTBOX_PATH, 'r') as f:
+        queued = [json.loads(line) for line in f]
+    assert [run['time'] for run in queued] == [7777]
+
+    # Next session, with the server back: the outbox is sent and emptied
+    server = ServerThread(port)
+    try:
+        client = RemoteLeaderboard(server.url)
+        clients.append(client)
+        assert wait_for(lambda: [run['time'] for run in server.store.top("level1", 5)] == [7777])
+        assert wait_for(lambda: not client.unsent)
+        assert os.path.getsize(LEADERBOARD_OUTBOX_PATH) == 0
+        assert server.store.top("level1", 5)[0]['id'] == queued[0]['id']
+    finally:
+        server.stop()
+
+
+def test_outbox_is_sent_once_the_server_comes_back(workdir, clients):
+    port = free_port()
+    client = RemoteLeaderboard(f"http://127.0.0.1:{port}")
+    clients.append(client)
+    client.add_time("level2", 3333)
+    assert wait_for(lambda: os.path.exists(LEADERBOARD_OUTBOX_PATH) and os.path.getsize(LEADERBOARD_OUTBOX_PATH) > 0)
+
+    # The same session retries after LEADERBOARD_REMOTE_RETRY
+    server = ServerThread(port)
+    try:
+        assert wait_for(lambda: not client.unsent)
+        assert [run['time'] for run in server.store.top("level2", 5)] == [3333]
+    finally:
+        server.stop()
+
+
+def test_torn_outbox_line_is_cut_before_new_runs(workdir):
+    os.makedirs(os.path.dirname(LEADERBOARD_OUTBOX_PATH))
+    with open(LEADERBOARD_OUTBOX_PATH, 'w') as f:
+        f.write(json.dumps({'id': "a", 'level': "level1", 'time': 5000}) + "\n")
+        f.write('{"id": "b", "level": "lev')
+
+    assert [run['id'] for run in RemoteLeaderboard.read_outbox()] == ["a"]
+    RemoteLeaderboard.append_outbox([{'id': "c", 'level': "level1", 'time': 4000}])
+    assert [run['id'] for run in RemoteLeaderboard.read_outbox()] == ["a", "c"]
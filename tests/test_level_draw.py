@@ -0,0 +1,55 @@
+"""
+Tests of the level's terrain and dynamic sprite lists used for drawing.
+"""
+import pygame
+import pytest
+from src.settings import *
+from src import level as level_module
+from src.level import Level
+from src.ghost import Ghost
+from src.io_worker import io_worker
+
+@pytest.fixture
+def level(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    level = Level("level1", screen)
+    yield level
+    io_worker.wait()
+    io_worker.poll()
+
+
+def test_sprites_are_split_once_with_the_player_last(level):
+    assert len(level.terrain_sprites) + len(level.dynamic_sprites) == len(level.all_sprites)
+    assert not any(sprite in level.terrain_sprites for sprite in level.dynamic_sprites)
+    assert level.dynamic_sprites.sprites()[-1] is level.player
+    assert len(level.dynamic_sprites) < len(level.terrain_sprites) // 10
+
+
+def test_dynamic_sprites_follow_creation_and_kills(level):
+    enemy = next(iter(level.enemy_sprites))
+    enemy.kill()
+    assert enemy not in level.dynamic_sprites
+
+    # Ghosts are created after the level is built and still go under the player
+    ghost = Ghost(level.ghosts.groups, GHOST_TINTS[1])
+    assert ghost in level.dynamic_sprites
+    assert level.dynamic_sprites.sprites()[-1] is level.player
+
+
+def test_scroll_render_matches_a_full_redraw(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pygame.time, "get_ticks", lambda: 1000)
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    frames = []
+    for scroll in (False, True):
+        monkeypatch.setattr(level_module, "SCROLL_RENDER", scroll)
+        level = Level("level1", screen)
+        # Whole-pixel camera positions, the full redraw rounds fractional ones differently at the left edge
+        for i in range(30):
+            level.camera_offset.x = -7 * i
+            level.draw()
+        frames.append(pygame.image.tobytes(screen, "RGB"))
+    io_worker.wait()
+    io_worker.poll()
+    assert frames[0] == frames[1]
@@ -0,0 +1,85 @@
+"""
+Tests of the KLL quantile sketch behind the leaderboard percentiles.
+"""
+import json
+import random
+from bisect import bisect_right
+import pytest
+from src.quantile_sketch import KLLSketch, sketches_to_dict, sketches_from_dict
+
+# Rank error allowed at the default k, measured errors stay under half of it
+RANK_ERROR = 0.02
+
+def run_times(count, seed):
+    rng = random.Random(seed)
+    return [rng.randint(20000, 180000) for _ in range(count)]
+
+
+def max_rank_error(sketch, values):
+    """Get the largest rank error of the sketch over the percentiles of values"""
+    values = sorted(values)
+    worst = 0
+    for percent in range(1, 100):
+        value = values[percent * len(values) // 100]
+        worst = max(worst, abs(sketch.rank(value) - bisect_right(values, value) / len(values)))
+    return worst
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    """Make the compaction coin flips repeatable"""
+    state = random.getstate()
+    random.seed(1234)
+    yield
+    random.setstate(state)
+
+
+def test_small_sketches_are_exact():
+    sketch = KLLSketch.from_values([5000, 3000, 4000, 1000, 2000])
+    assert sketch.rank(3000) == 0.6
+    assert sketch.rank(3000, inclusive=False) == 0.4
+    assert sketch.quantile(0.5) == 3000
+    assert KLLSketch().rank(3000) == 0.0
+    assert KLLSketch().quantile(0.5) is None
+
+
+def test_accuracy_bound_in_bounded_memory():
+    values = run_times(40000, 1)
+    sketch = KLLSketch.from_values(values)
+    assert sketch.count == len(values)
+    assert sketch.size() < sketch.max_size() < 4 * sketch.k
+
+    # Compaction keeps the total weight exact
+    sketch.build_table()
+    assert sketch.weights[-1] == len(values)
+    assert max_rank_error(sketch, values) < RANK_ERROR
+
+
+def test_merge_matches_one_sketch_of_all_runs():
+    first, second = run_times(15000, 2), [value // 2 for value in run_times(25000, 3)]
+    sketch = KLLSketch.from_values(first)
+    sketch.merge(KLLSketch.from_values(second))
+    assert sketch.count == len(first) + len(second)
+    assert sketch.size() < sketch.max_size()
+    assert max_rank_error(sketch, first + second) < RANK_ERROR
+
+    # Merging an empty sketch changes nothing
+    ranks = [sketch.rank(value) for value in (30000, 60000, 90000)]
+    sketch.merge(KLLSketch())
+    assert [sketch.rank(value) for value in (30000, 60000, 90000)] == ranks
+
+
+def test_serialisation_round_trip():
+    sketch = KLLSketch.from_values(run_times(20000, 4), k=64)
+    restored = KLLSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert (restored.k, restored.count, restored.compactors) == (sketch.k, sketch.count, sketch.compactors)
+    assert [restored.quantile(q / 10) for q in range(11)] == [sketch.quantile(q / 10) for q in range(11)]
+
+    # The copy is independent and keeps taking runs
+    restored.update(1)
+    assert restored.count == sketch.count + 1
+    assert restored.rank(1) > 0 and sketch.rank(1) == 0
+
+    levels = sketches_from_dict(json.loads(json.dumps(sketches_to_dict({"level1": sketch, "level2": KLLSketch()}))))
+    assert levels["level1"].compactors == sketch.compactors
+    assert levels["level2"].count == 0 and levels["level2"].quantile(0.5) is None
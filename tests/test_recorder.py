@@ -0,0 +1,51 @@
+"""
+Tests of the adaptive keyframe recorder.
+"""
+import random
+from src.recorder import AdaptiveRecorder
+
+def interpolate(recorder, time):
+    """Position of a recording at time, straight between keyframes"""
+    times, xs, ys, flags = recorder.columns()
+    for i in range(1, len(times)):
+        if times[i] >= time:
+            t = (time - times[i - 1]) / (times[i] - times[i - 1])
+            return xs[i - 1] + (xs[i] - xs[i - 1]) * t, ys[i - 1] + (ys[i] - ys[i - 1]) * t
+    return xs[-1], ys[-1]
+
+
+def test_straight_run_needs_only_its_ends():
+    recorder = AdaptiveRecorder(max_gap=10000)
+    for i in range(100):
+        recorder.record(i * 16, i * 5, 300, 1)
+    recorder.flush()
+    assert list(recorder.columns()[0]) == [0, 99 * 16]
+
+
+def test_turns_and_state_changes_are_keyframes():
+    recorder = AdaptiveRecorder(max_gap=10000)
+    for i in range(40):
+        recorder.record(i * 16, i * 5 if i <= 20 else 200 - (i - 20) * 5, 300, 1 if i < 30 else 3)
+    recorder.flush()
+    times = list(recorder.columns()[0])
+    assert 20 * 16 in times
+    assert 30 * 16 in times
+
+
+def test_every_sample_stays_within_tolerance():
+    rng = random.Random(3)
+    recorder = AdaptiveRecorder(tolerance=1.5)
+    samples = []
+    x, y, vx, vy = 0, 300, 4, 0
+    for i in range(2000):
+        if rng.random() < 0.05:
+            vx, vy = rng.randint(-8, 8), rng.randint(-6, 6)
+        x, y = x + vx, y + vy + rng.choice([0, 0, 1, -1])
+        samples.append((i * 16, x, y))
+        recorder.record(i * 16, x, y, 1)
+    recorder.flush()
+
+    assert len(recorder) < len(samples)
+    for time, x, y in samples:
+        ix, iy = interpolate(recorder, time)
+        assert abs(ix - x) <= 1.5 + 1e-9 and abs(iy - y) <= 1.5 + 1e-9
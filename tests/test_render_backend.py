@@ -0,0 +1,118 @@
+"""
+Tests for the render backends, run with SDL's dummy video driver.
+"""
+import gc
+import pygame
+import pytest
+from src.settings import *
+from src import render_backend
+from src.render_backend import create_backend, SoftwareBackend, HardwareBackend
+from src.level import Level
+from src.io_worker import io_worker
+
+def test_software_backend_is_created_by_name():
+    backend = create_backend("software")
+    assert isinstance(backend, SoftwareBackend)
+    assert not backend.hardware
+    assert backend.screen.get_size() == (WIDTH, HEIGHT)
+
+
+def test_unknown_backend_falls_back_to_software():
+    assert isinstance(create_backend("vulkan"), SoftwareBackend)
+
+
+def test_hardware_falls_back_without_sdl2_video(monkeypatch):
+    monkeypatch.setattr(render_backend, "SDL2_VIDEO_AVAILABLE", False)
+    assert isinstance(create_backend("hardware"), SoftwareBackend)
+
+
+def test_hardware_falls_back_when_renderer_fails(monkeypatch):
+    def fail(fullscreen=False):
+        raise pygame.error("no renderer")
+    monkeypatch.setattr(render_backend, "HardwareBackend", fail)
+    assert isinstance(create_backend("hardware"), SoftwareBackend)
+
+
+@pytest.fixture
+def hardware():
+    if not render_backend.SDL2_VIDEO_AVAILABLE:
+        pytest.skip("pygame._sdl2.video not available")
+    backend = create_backend("hardware")
+    if not backend.hardware:
+        pytest.skip("no SDL renderer available")
+    return backend
+
+
+def test_hardware_backend_works_headless(hardware):
+    assert isinstance(hardware, HardwareBackend)
+    image = pygame.Surface((16, 16))
+    image.fill(RED)
+    hardware.begin_frame()
+    hardware.blit(image, (10, 20))
+    hardware.present()
+
+    frame = hardware.snapshot()
+    assert frame.get_size() == (WIDTH, HEIGHT)
+    assert frame.get_at((15, 25))[:3] == RED
+
+
+def test_texture_is_uploaded_once_per_surface(hardware):
+    image = pygame.Surface((8, 8))
+    texture = hardware.texture(image)
+    assert hardware.texture(image) is texture
+    assert len(hardware.textures) == 1
+
+    # A different surface of the same size gets its own texture
+    other = pygame.Surface((8, 8))
+    assert hardware.texture(other) is not texture
+    assert len(hardware.textures) == 2
+
+
+def test_texture_goes_away_with_its_surface(hardware):
+    kept = pygame.Surface((8, 8))
+    hardware.texture(kept)
+
+    # Images made fresh every frame, like a pulsing power-up, must not pile up
+    for _ in range(50):
+        hardware.blit(pygame.Surface((8, 8)), (0, 0))
+    gc.collect()
+    assert len(hardware.textures) == 1
+    assert kept in hardware.textures
+
+
+def test_clear_textures(hardware):
+    image = pygame.Surface((8, 8))
+    hardware.texture(image)
+    hardware.clear_textures()
+    assert len(hardware.textures) == 0
+
+
+def test_present_uploads_only_dirty_rects(hardware):
+    hardware.screen.fill((0, 0, 0, 0))
+    hardware.present()
+
+    # Only the given area reaches the overlay texture
+    hardware.screen.fill((0, 255, 0, 255))
+    hardware.begin_frame()
+    hardware.present([pygame.Rect(0, 0, 100, 50), pygame.Rect(WIDTH - 10, HEIGHT - 10, 50, 50)])
+    frame = hardware.renderer.to_surface()
+    assert frame.get_at((50, 25))[:3] == (0, 255, 0)
+    assert frame.get_at((50, 200))[:3] == (0, 0, 0)
+
+
+def test_level_draws_only_sprites_on_screen(hardware, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    level = Level("level1", hardware.screen, hardware)
+    level.camera_offset.x = -WIDTH * 3
+    drawn = []
+    monkeypatch.setattr(hardware, "blit", lambda image, pos: drawn.append(image))
+    level.draw_textured()
+
+    sprite_images = {sprite.image: sprite for sprite in level.all_sprites}
+    sprites = [sprite_images[image] for image in drawn if image in sprite_images]
+    screen_rect = pygame.Rect(WIDTH * 3, 0, WIDTH, HEIGHT)
+    assert sprites
+    assert all(screen_rect.colliderect(sprite.rect) for sprite in sprites)
+    assert len(sprites) < len(level.all_sprites) // 4
+    io_worker.wait()
+    io_worker.poll()
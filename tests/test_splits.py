@@ -0,0 +1,100 @@
+"""
+Tests of the split tracker comparing runs against the personal best and the best segments.
+"""
+import json
+import pytest
+from src.settings import *
+from src.io_worker import io_worker
+from src.splits import SplitTracker, SPLIT_GOLD, SPLIT_AHEAD, SPLIT_BEHIND
+
+# Checkpoints are given out of level order, splits follow their positions
+CHECKPOINTS = [(900, 300), (300, 300), (600, 300)]
+
+def settle():
+    """Finish queued I/O and run its callbacks"""
+    io_worker.wait()
+    io_worker.poll()
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    """Start from an empty split file in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    tracker = SplitTracker()
+    settle()
+    yield tracker
+    settle()
+
+
+def play(tracker, splits, finish, checkpoints=CHECKPOINTS):
+    """Run the level, reaching the checkpoints at the given times (None skips one), and return each split shown"""
+    tracker.start("level1", checkpoints)
+    shown = []
+    for position, elapsed_time in zip(sorted(checkpoints), splits):
+        if elapsed_time is not None:
+            tracker.checkpoint(position, elapsed_time)
+            shown.append(tracker.current_split(elapsed_time))
+    tracker.finish(finish)
+    shown.append(tracker.current_split(finish))
+    return shown
+
+
+def test_first_run_sets_the_personal_best(tracker):
+    assert play(tracker, [1000, 2000, 3000], 4000) == [None] * 4
+    assert tracker.split_data["level1"] == {'pb': [1000, 2000, 3000, 4000],
+                                            'best_segments': [1000, 1000, 1000, 1000]}
+
+
+def test_splits_compare_to_the_personal_best(tracker):
+    play(tracker, [1000, 2000, 3000], 4000)
+
+    # Behind at the first split, then gold segments win back enough for a new personal best
+    shown = play(tracker, [1200, 2100, 3050], 3900)
+    assert shown == [(200, SPLIT_BEHIND), (100, SPLIT_GOLD), (50, SPLIT_GOLD), (-100, SPLIT_GOLD)]
+    assert tracker.split_data["level1"]['pb'] == [1200, 2100, 3050, 3900]
+    assert tracker.split_data["level1"]['best_segments'] == [1000, 900, 950, 850]
+
+    # A slower finish keeps the personal best but still improves a segment
+    shown = play(tracker, [1100, 1950, 3500], 4500)
+    assert shown == [(-100, SPLIT_AHEAD), (-150, SPLIT_GOLD), (450, SPLIT_BEHIND), (600, SPLIT_BEHIND)]
+    assert tracker.split_data["level1"] == {'pb': [1200, 2100, 3050, 3900], 'best_segments': [1000, 850, 950, 850]}
+
+
+def test_sections_no_run_reached(tracker):
+    # The middle checkpoint was skipped, so neither segment around it has a time
+    play(tracker, [1000, None, 3000], 4000)
+    assert tracker.split_data["level1"] == {'pb': [1000, None, 3000, 4000],
+                                            'best_segments': [1000, None, None, 1000]}
+
+    # Reaching it later has nothing to compare to, the split after it only compares to the personal best
+    shown = play(tracker, [900, 1800, 2700], 3900)
+    assert shown == [(-100, SPLIT_GOLD), None, (-300, SPLIT_AHEAD), (-100, SPLIT_AHEAD)]
+    assert tracker.split_data["level1"] == {'pb': [900, 1800, 2700, 3900],
+                                            'best_segments': [900, 900, 900, 1000]}
+
+
+def test_split_display_expires(tracker):
+    play(tracker, [1000, 2000, 3000], 4000)
+    tracker.start("level1", CHECKPOINTS)
+    tracker.checkpoint((300, 300), 1100)
+    assert tracker.current_split(1100 + SPLIT_DISPLAY_TIME) == (100, SPLIT_BEHIND)
+    assert tracker.current_split(1101 + SPLIT_DISPLAY_TIME) is None
+
+    # Reaching a checkpoint twice keeps the first time
+    tracker.checkpoint((300, 300), 1500)
+    assert tracker.times[0] == 1100
+
+
+def test_splits_are_saved_and_dropped_when_checkpoints_change(tracker):
+    play(tracker, [1000, 2000, 3000], 4000)
+    settle()
+    with open(SPLITS_PATH, 'r') as f:
+        assert json.load(f)["level1"]['pb'] == [1000, 2000, 3000, 4000]
+
+    reloaded = SplitTracker()
+    settle()
+    assert play(reloaded, [900, 2100, 2900], 3900)[0] == (-100, SPLIT_GOLD)
+
+    # A level with another number of checkpoints starts over
+    assert play(reloaded, [500, 1000], 1500, CHECKPOINTS[:2]) == [None] * 3
+    assert reloaded.split_data["level1"]['pb'] == [500, 1000, 1500]
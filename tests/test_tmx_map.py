@@ -0,0 +1,152 @@
+"""
+Tests of the TMX map parser and its binary cache.
+"""
+import base64
+import os
+import struct
+import xml.etree.ElementTree as ET
+import zlib
+import pytest
+from src.settings import *
+from src import tmx_map
+from src.io_worker import io_worker
+from src.tmx_map import parse_tmx, load_tmx_map, cache_path, TILE_SOLID, TILE_HAZARD
+
+MAPS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets", "maps")
+
+# Gid 1 is solid, 2 a hazard and 3 untyped, the second layer is zlib compressed and flips its hazard
+MAP = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.5" orientation="orthogonal" width="4" height="3" tilewidth="32" tileheight="16">
+ <tileset firstgid="1" name="tiles" tilewidth="32" tileheight="16" tilecount="3">
+  <tile id="0" type="solid"/>
+  <tile id="1"><properties><property name="type" value="hazard"/></properties></tile>
+  <tile id="2"/>
+ </tileset>
+ <layer id="1" name="ground" width="4" height="3">
+  <data encoding="csv">
+0,0,0,0,
+0,3,0,0,
+1,1,1,1
+</data>
+ </layer>
+ <layer id="2" name="spikes" width="4" height="3">
+  <data encoding="base64" compression="zlib">{spikes}</data>
+ </layer>
+ <layer id="3" name="hidden" width="4" height="3" visible="0">
+  <data encoding="csv">1,1,1,1,1,1,1,1,1,1,1,1</data>
+ </layer>
+ <objectgroup id="4" name="objects">
+  <object id="1" name="start" x="40" y="8"/>
+  <object id="2" type="checkpoint" gid="3" x="96" y="32" width="32" height="16">
+   <properties>
+    <property name="order" type="int" value="2"/>
+    <property name="speed" type="float" value="1.5"/>
+    <property name="final" type="bool" value="true"/>
+    <property name="label" value="top"/>
+   </properties>
+  </object>
+ </objectgroup>
+</map>
+"""
+
+def spikes_layer():
+    gids = [0] * 12
+    gids[5] = 2 | 0x80000000
+    gids[11] = 2
+    return base64.b64encode(zlib.compress(struct.pack('<12I', *gids))).decode()
+
+
+def write_map(path, text=None):
+    with open(path, 'w') as f:
+        f.write(text if text is not None else MAP.format(spikes=spikes_layer()))
+    return str(path)
+
+
+def settle():
+    """Finish queued I/O and run its callbacks"""
+    io_worker.wait()
+    io_worker.poll()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Keep the map cache in a temporary directory and forget the maps loaded by other tests"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tmx_map, "loaded_maps", {})
+    yield tmp_path
+    settle()
+
+
+def test_map_is_parsed(workdir):
+    parsed = parse_tmx(write_map(workdir / "level.tmx"))
+    assert (parsed.width, parsed.height, parsed.tile_width, parsed.tile_height) == (4, 3, 32, 16)
+
+    # The second layer's hazards replace the ground under them, the hidden layer is skipped
+    assert parsed.tiles == [(0, 2, TILE_SOLID), (1, 1, TILE_HAZARD), (1, 2, TILE_SOLID),
+                            (2, 2, TILE_SOLID), (3, 2, TILE_HAZARD)]
+    assert parsed.objects == [
+        {'type': "start", 'x': 40.0, 'y': 8.0, 'properties': {}},
+        {'type': "checkpoint", 'x': 96.0, 'y': 16.0,
+         'properties': {'order': 2, 'speed': 1.5, 'final': True, 'label': "top"}}]
+
+
+def test_bundled_maps_parse():
+    for name in ("level1.tmx", "level2.tmx"):
+        parsed = parse_tmx(os.path.join(MAPS_DIRECTORY, name))
+        assert parsed.tiles and parsed.objects
+
+
+def test_cache_hit(workdir, monkeypatch):
+    path = write_map(workdir / "level.tmx")
+    parsed = load_tmx_map(path)
+    assert load_tmx_map(path) is parsed
+    settle()
+    assert os.path.exists(cache_path(path))
+
+    # A new session reads the cache instead of parsing the map
+    monkeypatch.setattr(tmx_map, "loaded_maps", {})
+    monkeypatch.setattr(tmx_map, "parse_tmx", lambda path: pytest.fail("the map was parsed again"))
+    cached = load_tmx_map(path)
+    assert cached is not parsed
+    assert vars(cached) == vars(parsed)
+
+
+def test_cache_is_invalidated_when_the_map_changes(workdir):
+    path = write_map(workdir / "level.tmx")
+    load_tmx_map(path)
+    settle()
+
+    # Same size, only the mtime tells the edit apart
+    write_map(path, MAP.format(spikes=spikes_layer()).replace('name="start" x="40"', 'name="start" x="48"'))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_tmx_map(path).objects[0]['x'] == 48.0
+    settle()
+
+    tmx_map.loaded_maps.clear()
+    assert load_tmx_map(path).objects[0]['x'] == 48.0
+
+
+def test_damaged_cache_is_parsed_again(workdir):
+    path = write_map(workdir / "level.tmx")
+    parsed = load_tmx_map(path)
+    settle()
+    with open(cache_path(path), 'r+b') as f:
+        f.truncate(tmx_map.HEADER.size + 3)
+
+    tmx_map.loaded_maps.clear()
+    assert vars(load_tmx_map(path)) == vars(parsed)
+
+
+def test_malformed_maps_raise(workdir):
+    text = MAP.format(spikes=spikes_layer())
+    with pytest.raises(ET.ParseError):
+        load_tmx_map(write_map(workdir / "broken.tmx", text[:len(text) // 2]))
+    with pytest.raises(ValueError):
+        load_tmx_map(write_map(workdir / "lzma.tmx", text.replace('compression="zlib"', 'compression="lzma"')))
+    with pytest.raises(ValueError):
+        load_tmx_map(write_map(workdir / "gid.tmx", text.replace("1,1,1,1\n", "1,1,x,1\n")))
+    settle()
+
+    # Nothing is cached for a map that failed to parse
+    assert not os.path.exists(MAP_CACHE_PATH) or not os.listdir(MAP_CACHE_PATH)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Analytics report for SpeedRunner X.
+Aggregates the recorded attempt events into per-level statistics for level tuning.
+
+    python tools/analytics_report.py --data data/analytics/ --hotspots
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.settings import *
+from src.analytics import load_analytics, summarize, death_hotspots, NUMPY_AVAILABLE
+
+def format_time(milliseconds):
+    """Format time in milliseconds to MM:SS.mmm"""
+    if milliseconds is None:
+        return "--:--.---"
+    return f"{milliseconds // 60000:02d}:{(milliseconds % 60000) // 1000:02d}.{milliseconds % 1000:03d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SpeedRunner X attempt analytics report")
+    parser.add_argument("--data", default=ANALYTICS_PATH, help="directory with the analytics chunks")
+    parser.add_argument("--hotspots", action="store_true", help="also list where players die most per level")
+    args = parser.parse_args()
+
+    if not NUMPY_AVAILABLE:
+        print("The analytics report needs numpy")
+        return 1
+
+    start = time.perf_counter()
+    events = load_analytics(args.data)
+    summary = summarize(events)
+    elapsed = time.perf_counter() - start
+    attempts = sum(stats['attempts'] for stats in summary.values())
+    print(f"{len(events['event'])} events from {attempts} attempts, aggregated in {elapsed:.2f}s\n")
+
+    print(f"{'Level':<12}{'Attempts':>10}{'Finished':>10}{'Deaths/try':>12}{'Game overs':>12}{'Best':>12}{'Median':>12}")
+    for level_name, stats in summary.items():
+        print(f"{level_name:<12}{stats['attempts']:>10}{stats['completion_rate']:>10.1%}"
+              f"{stats['deaths_per_attempt']:>12.2f}{stats['game_overs']:>12}"
+              f"{format_time(stats['best_time']):>12}{format_time(stats['median_time']):>12}")
+
+    if args.hotspots:
+        for level_name in summary:
+            hotspots = death_hotspots(events, level_name)
+            if hotspots:
+                print(f"\n{level_name} deaths by x position:")
+                for x, deaths in hotspots:
+                    print(f"  x {x:>6} - {x + TILE_SIZE * 4:<6} {deaths:>8}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Ghost comparison tool for SpeedRunner X.
+Lines up ghost runs by x position, prints their section splits at the level's checkpoints
+and the sum of best sections, and shows where along the level one run gains on another.
+
+    python tools/compare_ghosts.py --library --level level1
+    python tools/compare_ghosts.py data/ghost_runs/level1_*.ghost
+    python tools/compare_ghosts.py runs/ --level level1 --csv deltas.csv --splits-csv splits.csv
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+import sys
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+from src.settings import *
+from src.heatmap import read_ghost_arrays, decode_ghost_arrays
+from src.ghost_library import GhostLibrary
+from src.ghost_compare import arrival_matrix, split_times, sum_of_best, checkpoint_boundaries, ghost_label
+
+def format_time(milliseconds):
+    """Format time in milliseconds to MM:SS.mmm"""
+    if np.isnan(milliseconds):
+        return "--:--.---"
+    milliseconds = int(round(milliseconds))
+    return f"{milliseconds // 60000:02d}:{(milliseconds % 60000) // 1000:02d}.{milliseconds % 1000:03d}"
+
+
+def format_delta(milliseconds):
+    """Format a time difference as +S.mmm / -S.mmm"""
+    if np.isnan(milliseconds):
+        return "--"
+    return f"{milliseconds / 1000:+.3f}"
+
+
+def expand_paths(sources):
+    """Expand directories and patterns into ghost files"""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths += glob.glob(os.path.join(source, "*.ghost"))
+        else:
+            paths += glob.glob(source)
+    return sorted(set(paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SpeedRunner X ghost runs")
+    parser.add_argument("ghosts", nargs="*", help="ghost files, patterns or directories")
+    parser.add_argument("--library", nargs="?", const=GHOST_LIBRARY_PATH,
+                        help="also compare the level's runs in a ghost library")
+    parser.add_argument("--level", help="level the ghosts are from, read from the file names by default")
+    parser.add_argument("--checkpoints", help="comma separated split x positions instead of the level's checkpoints")
+    parser.add_argument("--step", type=int, default=TILE_SIZE * 8, help="x distance between compared positions")
+    parser.add_argument("--top", type=int, default=20, help="runs listed in the split table")
+    parser.add_argument("--csv", help="write the per-position time deltas to a CSV file")
+    parser.add_argument("--splits-csv", help="write every run's section splits to a CSV file")
+    args = parser.parse_args()
+
+    paths = expand_paths(args.ghosts)
+    ghosts, labels = [], []
+    for path in paths:
+        try:
+            ghost = read_ghost_arrays(path)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        if len(ghost[0]) > 1:
+            ghosts.append(ghost)
+            labels.append(ghost_label(path))
+
+    if args.library:
+        library = GhostLibrary(args.library)
+        library.load_manifest()
+        for entry in library.runs(args.level or "level1"):
+            try:
+                ghost = decode_ghost_arrays(library.read_data(entry))
+            except (OSError, ValueError, zlib.error) as e:
+                print(f"Skipping {entry['id']}: {e}")
+                continue
+            if len(ghost[0]) > 1:
+                ghosts.append(ghost)
+                labels.append(f"{entry['level']}_{entry['time']}")
+    if len(ghosts) < 2:
+        print("Need at least two ghosts to compare")
+        return 1
+
+    # Split points: given positions, or the checkpoints of the ghosts' level
+    if args.checkpoints:
+        boundaries = sorted(float(x) for x in args.checkpoints.split(","))
+    else:
+        level_name = args.level
+        if level_name is None:
+            match = re.match(r"(level\d+)_", labels[0])
+            level_name = match.group(1) if match else "level1"
+        boundaries = checkpoint_boundaries(level_name)
+
+    # Fastest run first, it is the reference the others are compared against
+    finish = np.array([times[-1] for times, xs, ys in ghosts], dtype=np.float64)
+    order = np.argsort(finish)
+    ghosts = [ghosts[i] for i in order]
+    labels = [labels[i] for i in order]
+    finish = finish[order]
+
+    splits = split_times(ghosts, boundaries)
+    best, holders, best_total = sum_of_best(splits)
+
+    sections = [f"S{i + 1}" for i in range(splits.shape[1])]
+    print(f"{len(ghosts)} runs, splits at x = {', '.join(str(int(x)) for x in boundaries) or 'none'}\n")
+    print(f"{'Run':<24}{'Total':>12}{'Delta':>10}" + "".join(f"{name:>12}" for name in sections))
+    for i in range(min(args.top, len(ghosts))):
+        print(f"{labels[i]:<24}{format_time(finish[i]):>12}{format_delta(finish[i] - finish[0]):>10}"
+              + "".join(f"{format_time(split):>12}" for split in splits[i]))
+    if len(ghosts) > args.top:
+        print(f"... {len(ghosts) - args.top} more")
+
+    print(f"\n{'Best sections':<24}{format_time(best_total):>12}{format_delta(best_total - finish[0]):>10}"
+          + "".join(f"{format_time(split):>12}" for split in best))
+    print(f"{'Set by':<46}" + "".join(f"{labels[holder].rsplit('_', 1)[-1][-11:] if holder >= 0 else '--':>12}"
+                                      for holder in holders))
+    unreached = [name for name, holder in zip(sections, holders) if holder < 0]
+    if unreached:
+        print(f"No run reached {', '.join(unreached)}, left out of the sum of best sections")
+
+    # Time each run is behind the fastest at evenly spaced positions along the level
+    furthest = min(int(xs.max()) for times, xs, ys in ghosts)
+    positions = np.arange(args.step, furthest, args.step)
+    arrivals = arrival_matrix(ghosts, positions)
+    deltas = arrivals - arrivals[0]
+
+    if len(ghosts) <= 5:
+        print(f"\n{'x':>8}" + "".join(f"{label.rsplit('_', 1)[-1][-15:]:>16}" for label in labels[1:]))
+        for j, x in enumerate(positions):
+            print(f"{int(x):>8}" + "".join(f"{format_delta(delta):>16}" for delta in deltas[1:, j]))
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["run"] + [int(x) for x in positions])
+            for label, row in zip(labels, deltas):
+                writer.writerow([label] + [round(delta) if not np.isnan(delta) else "" for delta in row])
+        print(f"\nWrote time deltas to {args.csv}")
+
+    if args.splits_csv:
+        with open(args.splits_csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["run", "total"] + sections)
+            for label, total, row in zip(labels, finish, splits):
+                writer.writerow([label, int(total)] + [round(split) if not np.isnan(split) else "" for split in row])
+            writer.writerow(["sum of best", round(best_total)] + [round(split) if not np.isnan(split) else ""
+                                                                  for split in best])
+        print(f"Wrote splits to {args.splits_csv}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
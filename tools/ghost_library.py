@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Ghost library tool for SpeedRunner X.
+Lists, imports, exports and removes archived ghost runs, and compacts the library pack.
+
+    python tools/ghost_library.py list --level level1 --top 10
+    python tools/ghost_library.py import data/ghost_runs/ --source friend
+    python tools/ghost_library.py export 3f2a9c0e5b7d4e1f8a6b2c4d9e0f1a2b level1_best.ghost
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.settings import *
+from src.ghost_library import GhostLibrary
+
+def format_time(milliseconds):
+    """Format time in milliseconds to MM:SS.mmm"""
+    return f"{milliseconds // 60000:02d}:{(milliseconds % 60000) // 1000:02d}.{milliseconds % 1000:03d}"
+
+
+def find_entry(library, entry_id):
+    """Get a run by its ID"""
+    for entry in library.entries:
+        if entry['id'] == entry_id:
+            return entry
+    print(f"No run with ID {entry_id}")
+    return None
+
+
+def list_runs(library, args):
+    """Print the runs matching the filters, fastest first"""
+    runs = library.runs(args.level, args.player, args.source, args.top)
+    print(f"{'ID':<34}{'Level':<10}{'Time':>12}  {'Player':<16}{'Source':<12}Date")
+    for entry in runs:
+        date = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry['date']))
+        print(f"{entry['id']:<34}{entry['level']:<10}{format_time(entry['time']):>12}  "
+              f"{entry['player']:<16}{entry['source']:<12}{date}")
+    print(f"{len(runs)} of {len(library.entries)} runs")
+    return 0
+
+
+def import_runs(library, args):
+    """Add ghost files named {level}_{time}.ghost to the library"""
+    paths = []
+    for source in args.paths:
+        if os.path.isdir(source):
+            paths += glob.glob(os.path.join(source, "*.ghost"))
+        else:
+            paths += glob.glob(source)
+
+    added = 0
+    for path in sorted(set(paths)):
+        match = re.match(r"(.+)_(\d+)\.ghost$", os.path.basename(path))
+        if not match:
+            print(f"Skipping {path}: name is not {{level}}_{{time}}.ghost")
+            continue
+        if library.add_file(path, match.group(1), int(match.group(2)), args.player, args.source):
+            added += 1
+    print(f"Imported {added} runs")
+    return 0
+
+
+def export_run(library, args):
+    """Write one run's ghost data to a standalone ghost file"""
+    entry = find_entry(library, args.id)
+    if entry is None:
+        return 1
+    with open(args.out, 'wb') as f:
+        f.write(library.read_data(entry))
+    print(f"Wrote {entry['level']} {format_time(entry['time'])} to {args.out}")
+    return 0
+
+
+def remove_run(library, args):
+    """Drop one run from the library"""
+    entry = find_entry(library, args.id)
+    if entry is None:
+        return 1
+    library.remove(entry)
+    print(f"Removed {args.id}, compact the library to reclaim its space")
+    return 0
+
+
+def compact_library(library, args):
+    """Rewrite the pack without removed runs"""
+    before = os.path.getsize(library.pack_path) if os.path.exists(library.pack_path) else 0
+    library.compact()
+    after = os.path.getsize(library.pack_path) if os.path.exists(library.pack_path) else 0
+    print(f"Compacted {len(library.entries)} runs from {before} to {after} bytes")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the SpeedRunner X ghost library")
+    parser.add_argument("--library", default=GHOST_LIBRARY_PATH, help="library directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="list runs, fastest first")
+    list_parser.add_argument("--level", help="only runs of this level")
+    list_parser.add_argument("--player", help="only runs by this player")
+    list_parser.add_argument("--source", help="only runs from this source")
+    list_parser.add_argument("--top", type=int, help="number of runs to list")
+    list_parser.set_defaults(handler=list_runs)
+
+    import_parser = commands.add_parser("import", help="add ghost files named {level}_{time}.ghost")
+    import_parser.add_argument("paths", nargs="+", help="ghost files, patterns or directories")
+    import_parser.add_argument("--player", default="Player", help="player the runs are by")
+    import_parser.add_argument("--source", default="import", help="where the runs come from")
+    import_parser.set_defaults(handler=import_runs)
+
+    export_parser = commands.add_parser("export", help="write one run to a ghost file")
+    export_parser.add_argument("id", help="ID of the run")
+    export_parser.add_argument("out", help="ghost file to write")
+    export_parser.set_defaults(handler=export_run)
+
+    remove_parser = commands.add_parser("remove", help="drop a run from the library")
+    remove_parser.add_argument("id", help="ID of the run")
+    remove_parser.set_defaults(handler=remove_run)
+
+    compact_parser = commands.add_parser("compact", help="reclaim the space of removed runs")
+    compact_parser.set_defaults(handler=compact_library)
+
+    args = parser.parse_args()
+    library = GhostLibrary(args.library)
+    library.load_manifest()
+    return args.handler(library, args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Heatmap tool for SpeedRunner X.
+Bins ghost trajectories and recorded deaths of a level into occupancy and death density grids
+and exports them as overlay images. The combined overlay is what the game draws with F3.
+
+    python tools/heatmap.py --level level1
+    python tools/heatmap.py --level level2 --ghosts runs/ --analytics data/analytics/ --cell 8
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+import pygame
+from src.settings import *
+from src.heatmap import (read_ghost_arrays, decode_ghost_arrays, resample_ghosts, bin_positions, grid_to_rgba, composite,
+                         rgba_to_surface, heatmap_path, OCCUPANCY_COLOR, DEATH_COLOR)
+from src.analytics import load_analytics, EVENT_DEATH_ENEMY, EVENT_DEATH_HAZARD
+from src.ghost_library import GhostLibrary
+
+def find_ghost_files(sources, level_name):
+    """Expand directories and patterns into the ghost files of a level"""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths += glob.glob(os.path.join(source, f"{level_name}_*.ghost"))
+            paths += glob.glob(os.path.join(source, f"{level_name}_ghost.json"))
+        else:
+            paths += glob.glob(source)
+    return sorted(set(paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SpeedRunner X level heatmaps")
+    parser.add_argument("--level", default="level1", help="level to build the heatmaps of")
+    parser.add_argument("--ghosts", nargs="*", default=[GHOST_RUNS_PATH], help="ghost files or directories")
+    parser.add_argument("--library", default=GHOST_LIBRARY_PATH, help="ghost library to read the level's runs from")
+    parser.add_argument("--analytics", default=ANALYTICS_PATH, help="directory with the analytics chunks")
+    parser.add_argument("--cell", type=int, default=HEATMAP_CELL_SIZE, help="grid cell size in pixels")
+    parser.add_argument("--out", default=HEATMAP_PATH, help="directory to write the images to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ghosts = []
+    for path in find_ghost_files(args.ghosts, args.level):
+        try:
+            ghosts.append(read_ghost_arrays(path))
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+
+    # Only the level's runs are read from the library pack
+    library = GhostLibrary(args.library)
+    library.load_manifest()
+    for entry in library.runs(args.level):
+        try:
+            ghosts.append(decode_ghost_arrays(library.read_data(entry)))
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"Skipping {entry['id']}: {e}")
+    loaded = time.perf_counter()
+
+    events = load_analytics(args.analytics)
+    death_xs, death_ys = np.zeros(0), np.zeros(0)
+    if events is not None and args.level in events['levels']:
+        died = (events['level'] == events['levels'].index(args.level)) & \
+               ((events['event'] == EVENT_DEATH_ENEMY) | (events['event'] == EVENT_DEATH_HAZARD))
+        death_xs, death_ys = events['x'][died], events['y'][died]
+
+    # The grid spans the furthest position seen, one screen high
+    xs, ys = resample_ghosts(ghosts)
+    width = int(max(xs.max() if len(xs) else 0, death_xs.max() if len(death_xs) else 0)) + args.cell
+    occupancy = bin_positions(xs, ys, width, HEIGHT, args.cell)
+    deaths = bin_positions(death_xs, death_ys, width, HEIGHT, args.cell)
+    occupancy_layer = grid_to_rgba(occupancy, OCCUPANCY_COLOR)
+    death_layer = grid_to_rgba(deaths, DEATH_COLOR, max_alpha=230)
+    overlay = composite(death_layer, occupancy_layer)
+    aggregated = time.perf_counter()
+
+    print(f"{len(ghosts)} ghosts ({len(xs)} positions) and {len(death_xs)} deaths on {args.level}")
+    print(f"Read in {loaded - start:.2f}s, aggregated in {aggregated - loaded:.2f}s")
+
+    os.makedirs(args.out, exist_ok=True)
+    overlay_path = heatmap_path(args.level, args.out)
+    stem = os.path.splitext(overlay_path)[0]
+    pygame.image.save(rgba_to_surface(occupancy_layer, args.cell), f"{stem}_occupancy.png")
+    pygame.image.save(rgba_to_surface(death_layer, args.cell), f"{stem}_deaths.png")
+    pygame.image.save(rgba_to_surface(overlay, args.cell), overlay_path)
+    print(f"Wrote {stem}_occupancy.png, {stem}_deaths.png and {overlay_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
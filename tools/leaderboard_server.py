@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Reference leaderboard server for SpeedRunner X.
+A small asyncio HTTP/1.1 server that speaks the protocol of the remote
+leaderboard backend. Meant for local testing, not for production use.
+
+    python tools/leaderboard_server.py --port 8765 --data data/server_runs.json
+
+POST /runs                    JSON list of runs, runs already stored are ignored
+GET  /leaderboard/<level>     fastest runs of a level (?limit=N), with ETag support
+GET  /health                  liveness check
+"""
+import argparse
+import asyncio
+import json
+import os
+from urllib.parse import urlsplit, parse_qs, unquote
+
+class LeaderboardStore:
+    def __init__(self, path=None):
+        # Runs per level, plus a version per level that changes whenever the level gets a run
+        self.path = path
+        self.runs = {}
+        self.run_ids = set()
+        self.versions = {}
+
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                for run in json.load(f):
+                    self.add(run)
+
+    def add(self, run):
+        """Store a run unless it was stored before, returns True if it is new"""
+        if run['id'] in self.run_ids:
+            return False
+        self.run_ids.add(run['id'])
+        self.runs.setdefault(run['level'], []).append(run)
+        self.runs[run['level']].sort(key=lambda r: r['time'])
+        self.versions[run['level']] = self.versions.get(run['level'], 0) + 1
+        return True
+
+    def save(self):
+        """Write every run to the data file, if there is one"""
+        if not self.path:
+            return
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump([run for runs in self.runs.values() for run in runs], f)
+        os.replace(temp_path, self.path)
+
+    def top(self, level_name, limit):
+        """Get the fastest runs of a level"""
+        return self.runs.get(level_name, [])[:limit]
+
+
+class LeaderboardServer:
+    def __init__(self, store):
+        self.store = store
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, value = line.decode('latin-1').split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, response_headers, payload = self.route(method, target, headers, body)
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                response_headers["Content-Length"] = str(len(payload))
+                response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+                head = f"HTTP/1.1 {status}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in response_headers.items())
+                writer.write(head.encode('latin-1') + b"\r\n" + payload)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def route(self, method, target, headers, body):
+        """Handle one request, returning (status line, headers, body)"""
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+
+        if method == "GET" and parts == ["health"]:
+            return self.json_response({'status': 'ok'})
+
+        if method == "POST" and parts == ["runs"]:
+            try:
+                runs = json.loads(body)
+                accepted = sum(self.store.add(run) for run in runs)
+            except (ValueError, KeyError, TypeError):
+                return "400 Bad Request", {}, b""
+            if accepted:
+                self.store.save()
+            return self.json_response({'accepted': accepted})
+
+        if method == "GET" and len(parts) == 2 and parts[0] == "leaderboard":
+            level_name = parts[1]
+            limit = int(parse_qs(url.query).get("limit", ["10"])[0])
+
+            # The ETag only changes when the level gets a new run
+            etag = f'"{level_name}-{self.store.versions.get(level_name, 0)}-{limit}"'
+            if headers.get("if-none-match") == etag:
+                return "304 Not Modified", {"ETag": etag}, b""
+
+            status, response_headers, payload = self.json_response(
+                {'level': level_name, 'runs': self.store.top(level_name, limit)})
+            response_headers["ETag"] = etag
+            return status, response_headers, payload
+
+        return "404 Not Found", {}, b""
+
+    @staticmethod
+    def json_response(data):
+        """Build a 200 response with a JSON body"""
+        return "200 OK", {"Content-Type": "application/json"}, json.dumps(data).encode()
+
+
+async def start_server(host="127.0.0.1", port=8765, data_path=None):
+    """Start serving in the running event loop, returns the asyncio server"""
+    server = LeaderboardServer(LeaderboardStore(data_path))
+    return await asyncio.start_server(server.handle_connection, host, port)
+
+
+async def serve(host, port, data_path):
+    """Serve until interrupted"""
+    server = await start_server(host, port, data_path)
+    print(f"Leaderboard server listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SpeedRunner X reference leaderboard server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", default=None, help="JSON file to keep runs in between restarts")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.data))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Leaderboard merge tool for SpeedRunner X.
+Merges the leaderboards of many cabinets (snapshots, journals, SQLite databases or server data files)
+into one combined leaderboard file, reading all inputs side by side in a single pass.
+
+    python tools/merge_leaderboards.py cabinets/*/leaderboard.json --out data/leaderboard.json
+    python tools/merge_leaderboards.py a/leaderboard.db b/leaderboard.journal --out merged.json --keep 0
+    python tools/merge_leaderboards.py server.json cabinets/*/leaderboard_outbox.jsonl --out merged.json
+
+Runs with an id (server data files and outboxes) are kept once per id. Runs without one are all kept,
+--dedupe-loose also counts equal runs (same level, time and player) found in several inputs only once.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.settings import *
+from src.leaderboard_merge import open_runs, merge_runs, write_merged
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge SpeedRunner X leaderboards")
+    parser.add_argument("inputs", nargs="+", help="leaderboard files or patterns")
+    parser.add_argument("--out", required=True, help="combined leaderboard file to write")
+    parser.add_argument("--keep", type=int, default=LEADERBOARD_SIZE,
+                        help="times kept per level, 0 keeps every run (memory then grows with the runs)")
+    parser.add_argument("--players", action="store_true", help="write player names along with the times")
+    parser.add_argument("--dedupe-loose", action="store_true",
+                        help="treat equal runs without an id in several inputs as copies of one run")
+    args = parser.parse_args()
+
+    paths = []
+    for pattern in args.inputs:
+        paths += sorted(glob.glob(pattern)) or [pattern]
+    if os.path.abspath(args.out) in map(os.path.abspath, paths):
+        print("The combined leaderboard can't be one of the inputs")
+        return 1
+
+    start = time.perf_counter()
+    sources = []
+    for path in paths:
+        try:
+            sources.append(open_runs(path, args.keep))
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+    if not sources:
+        print("No leaderboards to merge")
+        return 1
+
+    stats = {}
+    counted = {}
+    def count(runs):
+        """Count the merged runs per level on their way to the file"""
+        for run in runs:
+            counted[run[0]] = counted.get(run[0], 0) + 1
+            yield run
+
+    try:
+        write_merged(count(merge_runs(sources, args.keep, stats, args.dedupe_loose)), args.out, args.players)
+    except Exception as e:
+        print(f"Error merging leaderboards: {e}")
+        return 1
+
+    for level, runs in sorted(counted.items()):
+        print(f"{level}: {runs} times")
+    print(f"Merged {len(sources)} leaderboards into {args.out} in {time.perf_counter() - start:.2f}s, "
+          f"{stats.get('duplicates', 0)} duplicate runs dropped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Sketch exchange tool for SpeedRunner X.
+Exports this machine's run time sketches and merges sketches exported on other machines,
+so percentiles in the victory menu cover the runs of every cabinet.
+
+    python tools/merge_sketches.py --export cabinet1.json
+    python tools/merge_sketches.py cabinet2.json cabinet3.json
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.settings import *
+from src.leaderboard import create_leaderboard
+from src.io_worker import io_worker
+
+def main():
+    parser = argparse.ArgumentParser(description="SpeedRunner X run time sketch exchange")
+    parser.add_argument("imports", nargs="*", help="sketch files exported on other machines")
+    parser.add_argument("--export", help="write this machine's sketches to a file")
+    parser.add_argument("--source", help="name to export under, defaults to the host name")
+    parser.add_argument("--backend", default=LEADERBOARD_BACKEND, help="leaderboard backend to use")
+    args = parser.parse_args()
+
+    # Wait for the leaderboard to finish loading before touching its sketches
+    leaderboard = create_leaderboard(args.backend)
+    io_worker.wait()
+    io_worker.poll()
+
+    for path in args.imports:
+        if leaderboard.import_sketches(path):
+            print(f"Merged sketches from {path}")
+    if args.export:
+        leaderboard.export_sketches(args.export, args.source)
+        print(f"Exported sketches to {args.export}")
+
+    for i in range(1, LEVEL_COUNT + 1):
+        level_name = f"level{i}"
+        sketch = leaderboard.get_sketch(level_name)
+        if sketch.count:
+            print(f"{level_name}: {sketch.count} runs, median {leaderboard.get_median(level_name)} ms")
+
+    # The leaderboard writes its final state as the process exits
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())